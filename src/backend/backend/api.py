@@ -1,21 +1,41 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException, Header
-from pydantic import BaseModel
-from typing import Dict, Any, List, Tuple, Optional, Literal
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, List, Tuple, Optional, Literal
+import asyncio
 import uuid
 import os
 import sys
 import json
+import logging
+import gzip
 import hashlib
+import pickle
 import threading
 import math
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+from backend.cache_store import DEFAULT_MAX_BYTES, DEFAULT_TTL_S, CacheStore
+from backend.formats import BINARY_MEDIA_TYPE, SIMPLIFY_FIELDS, to_binary, to_columnar
+from backend.job_registry import DEFAULT_MAX_JOBS, DEFAULT_TTL_S as DEFAULT_JOB_TTL_S, JobRegistry
+from backend.job_scheduler import DEFAULT_MAX_QUEUE, DEFAULT_WORKERS, JobScheduler, QueueFull
+from backend.osm_extract import OsmExtract, bbox_from_point, ingest as ingest_osm_extract
+from backend.osm_tiles import OSM_TILE_ZOOM, merge_and_truncate, split_by_tile, tiles_for_bbox, union_bounds
+
+try:
+    import orjson  # type: ignore
+except Exception:  # opcional: sem ele caímos no json da stdlib
+    orjson = None
+
 AUTH_TOKEN = os.environ.get("SISRUA_AUTH_TOKEN") or ""
 AUTH_HEADER_NAME = "X-SisRua-Token"
 
-# Lock para proteger job_store contra race conditions
+# Lock para o single-flight (consulta + criação de job atômicas); o registro dos jobs tem lock próprio.
 _job_store_lock = threading.Lock()
 
 # Backend principal (produção): JSON → polylines.
@@ -33,15 +53,42 @@ class PrepareOsmRequest(BaseModel):
     latitude: float
     longitude: float
     radius: float
+    simplify_tolerance_m: Optional[float] = None  # Douglas-Peucker nas polylines (metros, em UTM); None/0 = sem simplificação
+    merge_edges: bool = False  # remove mãos duplas e funde trechos contíguos de mesma via (ver `_merge_contiguous_edges`)
 
 
 class PrepareGeoJsonRequest(BaseModel):
     geojson: Any  # pode vir como string JSON ou objeto GeoJSON
+    simplify_tolerance_m: Optional[float] = None
+
+class SisRuaJSONResponse(JSONResponse):
+    """
+    Resposta JSON padrão da API: usa `_json_bytes` (NaN/Inf → null) em vez do JSONResponse do Starlette,
+    que rejeita NaN e geraria 500.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return _json_bytes(content)
 
-app = FastAPI()
 
-# In-memory storage for job statuses and results. In a real application, this would be a database.
-job_store: Dict[str, Dict[str, Any]] = {}
+@asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Encerramento do uvicorn: sem isto, os processos workers (e o Manager) do modo processo ficam órfãos.
+    await run_in_threadpool(shutdown_process_pool)
+
+
+app = FastAPI(default_response_class=SisRuaJSONResponse, lifespan=_lifespan)
+
+# Single-flight: chave do pedido → job em andamento. Pedidos idênticos (duplo clique, paleta + comando)
+# recebem o mesmo job_id em vez de repetir download/projeção. Protegido por _job_store_lock.
+_inflight_jobs: Dict[str, str] = {}
+_inflight_stats: Dict[str, int] = {"coalesced": 0}
+# Quantos pedidos estão ligados a cada job ativo (1 + os que o single-flight juntou); o DELETE só cancela
+# de fato quando o último se desliga. Protegido por _job_store_lock.
+_job_requesters: Dict[str, int] = {}
+# Jobs com cancelamento pedido (DELETE) que ainda estão executando; o callback de progresso os interrompe.
+_cancelled_jobs: set = set()
 
 
 class PrepareJobRequest(BaseModel):
@@ -50,6 +97,38 @@ class PrepareJobRequest(BaseModel):
     longitude: Optional[float] = None
     radius: Optional[float] = None
     geojson: Any | None = None
+    simplify_tolerance_m: Optional[float] = None
+    merge_edges: bool = False  # só kind=osm
+
+
+async def _read_body_digest(request: Request) -> Tuple[bytes, str]:
+    """
+    Lê o corpo bruto da requisição atualizando o sha256 a cada chunk recebido.
+    O hash serve de chave de cache por conteúdo sem re-serializar o JSON já parseado.
+    """
+    h = hashlib.sha256()
+    parts: List[bytes] = []
+    async for chunk in request.stream():
+        h.update(chunk)
+        parts.append(chunk)
+    return b"".join(parts), h.hexdigest()
+
+
+def _parse_body(model: type[BaseModel], body: bytes) -> Any:
+    """
+    Valida o corpo como o FastAPI faria para um parâmetro `model` (422 com os mesmos detalhes).
+    """
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False, include_context=False)]
+        )
+
+
+def _body_schema(model: type[BaseModel]) -> Dict[str, Any]:
+    # Endpoints que leem o corpo bruto declaram o schema no OpenAPI explicitamente.
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
 
 
 class CadFeature(BaseModel):
@@ -74,6 +153,65 @@ class PrepareResponse(BaseModel):
     crs_out: Optional[str] = None
     features: List[CadFeature]
     cache_hit: Optional[bool] = None  # Indica se o resultado veio do cache
+    # Simplificação no backend: tolerância aplicada e vértices das polylines antes/depois.
+    simplify_tolerance_m: Optional[float] = None
+    vertices_before: Optional[int] = None
+    vertices_after: Optional[int] = None
+
+
+def _simplify_tolerance(value: Optional[float]) -> float:
+    """
+    Tolerância efetiva em metros: None, negativa ou não finita → 0 (sem simplificação).
+    """
+    if value is None or not math.isfinite(value) or value <= 0:
+        return 0.0
+    return float(value)
+
+
+# "features" = PrepareResponse (padrão); "columnar" = ColumnarPrepareResponse;
+# "binary" = application/x-sisrua-bin (ver backend.formats). Binário também via header Accept.
+ResponseFormat = Literal["features", "columnar", "binary"]
+
+
+def _cached_prepare_response(key: str, response_format: str, accept: str | None, accept_encoding: str | None) -> Any:
+    """
+    Resposta de cache hit do prepare no formato pedido, ou None se não houver entrada.
+    """
+    if response_format == "features" and not _wants_binary(response_format, accept):
+        return _cached_json_response(key, accept_encoding)
+    cached = _read_cache(key)
+    if cached is None:
+        return None
+    cached["cache_hit"] = True
+    return _format_prepare_result(cached, response_format, accept)
+
+
+def _wants_binary(response_format: str, accept: str | None) -> bool:
+    return response_format == "binary" or (response_format == "features" and bool(accept) and BINARY_MEDIA_TYPE in accept)
+
+
+def _format_prepare_result(result: dict, response_format: str, accept: str | None = None) -> Any:
+    if _wants_binary(response_format, accept):
+        return Response(content=to_binary(result), media_type=BINARY_MEDIA_TYPE)
+    # Devolvemos a Response pronta: um dict passaria pelo jsonable_encoder do FastAPI (lento em payloads grandes).
+    if response_format == "columnar":
+        return SisRuaJSONResponse(to_columnar(result))
+    return SisRuaJSONResponse(result)
+
+
+# Progresso das etapas do pipeline: progress(fração 0..1, mensagem). Nos jobs, atualiza o status
+# (e os eventos SSE); nos endpoints síncronos/streaming, é no-op.
+ProgressFn = Callable[[float, str], None]
+
+def _no_progress(fraction: float, message: str) -> None:
+    return None
+
+class JobCancelled(BaseException):
+    """
+    Levantada pelo callback de progresso de um job cancelado, no próximo ponto de verificação (lote de
+    vias/pontos/projeção, espera do download). Herda de BaseException, como asyncio.CancelledError, para
+    atravessar os `except Exception` de fallback do pipeline sem virar erro/503.
+    """
 
 
 class JobStatusResponse(BaseModel):
@@ -82,39 +220,147 @@ class JobStatusResponse(BaseModel):
     status: str
     progress: float
     message: Optional[str] = None
+    queue_position: Optional[int] = None  # posição na fila enquanto status=queued (1 = próximo)
     result: Optional[PrepareResponse] = None # Change type from Any to PrepareResponse
     error: Optional[str] = None
 
+_job_registry_lock = threading.Lock()
+_job_registry_instance: Optional[JobRegistry] = None
+
+def _job_registry() -> JobRegistry:
+    """
+    Registro dos jobs (metadados em memória, resultados grandes em `cache/jobs`), aberto na 1ª chamada.
+    Retenção via SISRUA_JOB_TTL_S (após o fim do job) e SISRUA_JOB_MAX (quantidade).
+    """
+    global _job_registry_instance
+    with _job_registry_lock:
+        spill_dir = _cache_dir() / "jobs"
+        if _job_registry_instance is None or _job_registry_instance.spill_dir != spill_dir:
+            _job_registry_instance = JobRegistry(
+                spill_dir,
+                ttl_s=_env_number("SISRUA_JOB_TTL_S", DEFAULT_JOB_TTL_S),
+                max_jobs=int(_env_number("SISRUA_JOB_MAX", DEFAULT_MAX_JOBS)),
+            )
+        return _job_registry_instance
+
+
 def _init_job(kind: str) -> str:
     job_id = str(uuid.uuid4())
-    with _job_store_lock:
-        job_store[job_id] = {
-            "job_id": job_id,
-            "kind": kind,
-            "status": "queued",
-            "progress": 0.0,
-            "message": "Aguardando...",
-            "result": None,
-            "error": None,
-        }
+    # O resultado (bytes JSON de PrepareResponse) fica no registro, fora dos metadados.
+    _job_registry().create(job_id, {
+        "job_id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "progress": 0.0,
+        "message": "Aguardando...",
+        "error": None,
+    })
     return job_id
 
 
-def _update_job(job_id: str, *, status: str | None = None, progress: float | None = None, message: str | None = None, result: Dict | None = None, error: str | None = None) -> None:
+def _attach_or_init_job(kind: str, inflight_key: str) -> Tuple[str, bool]:
+    """
+    Devolve (job_id, criado). Se já há job queued/processing para a mesma chave, devolve esse job.
+    """
     with _job_store_lock:
-        job = job_store.get(job_id)
-        if not job:
-            return
-        if status is not None:
-            job["status"] = status
-        if progress is not None:
-            job["progress"] = float(max(0.0, min(1.0, progress)))
-        if message is not None:
-            job["message"] = message
-        if result is not None:
-            job["result"] = result
-        if error is not None:
-            job["error"] = error
+        job_id = _inflight_jobs.get(inflight_key)
+        job = _job_registry().get(job_id) if job_id else None
+        if job is not None and job["status"] in ("queued", "processing"):
+            _inflight_stats["coalesced"] += 1
+            _job_requesters[job_id] = _job_requesters.get(job_id, 1) + 1
+            return job_id, False
+        job_id = _init_job(kind)
+        _inflight_jobs[inflight_key] = job_id
+        _job_requesters[job_id] = 1
+    return job_id, True
+
+
+def _release_inflight_job(inflight_key: str, job_id: str) -> None:
+    with _job_store_lock:
+        if _inflight_jobs.get(inflight_key) == job_id:
+            del _inflight_jobs[inflight_key]
+        _job_requesters.pop(job_id, None)
+
+
+def _detach_job_requester(job_id: str) -> int:
+    """
+    Desliga um dos pedidos ligados ao job (ver `_job_requesters`) e devolve quantos restam.
+    0: ninguém mais espera o job e ele pode ser cancelado.
+    """
+    with _job_store_lock:
+        remaining = _job_requesters.get(job_id, 1) - 1
+        if remaining > 0:
+            _job_requesters[job_id] = remaining
+        return max(0, remaining)
+
+
+def _cancel_job(job_id: str) -> bool:
+    """
+    Pede o cancelamento do job. True se ele ainda estava na fila (já encerrado como cancelled);
+    False se está executando: o worker para no próximo ponto de verificação.
+    """
+    with _job_store_lock:
+        # Um pedido idêntico depois do cancelamento abre job novo em vez de se juntar a este.
+        for key in [k for k, v in _inflight_jobs.items() if v == job_id]:
+            del _inflight_jobs[key]
+        _cancelled_jobs.add(job_id)
+    if _job_scheduler.cancel(job_id):
+        # Saiu da fila sem rodar: o `_run` (que faria `_release_inflight_job`) nunca executa.
+        with _job_store_lock:
+            _job_requesters.pop(job_id, None)
+        _cancelled_jobs.discard(job_id)
+        _finish_job(job_id, "cancelled", "Cancelado.")
+        return True
+    _flag_process_job_cancelled(job_id)
+    if (_job_registry().get(job_id) or {}).get("status") not in ("queued", "processing"):
+        _cancelled_jobs.discard(job_id)  # terminou entre a consulta e o pedido
+    return False
+
+
+def _update_job(job_id: str, *, status: str | None = None, progress: float | None = None, message: str | None = None, error: str | None = None) -> None:
+    fields: Dict[str, Any] = {}
+    if status is not None:
+        fields["status"] = status
+    if progress is not None:
+        fields["progress"] = float(max(0.0, min(1.0, progress)))
+    if message is not None:
+        fields["message"] = message
+    if error is not None:
+        fields["error"] = error
+    _job_registry().update(job_id, **fields)
+    # Mudança de status desloca a fila: avisamos todos os assinantes (posição), senão só os deste job.
+    _notify_job_watchers(None if status is not None else job_id)
+
+
+def _finish_job(job_id: str, status: str, message: str, result_json: bytes | None = None, error: str | None = None) -> None:
+    fields: Dict[str, Any] = {"status": status, "progress": 1.0, "message": message}
+    if error is not None:
+        fields["error"] = error
+    _job_registry().finish(job_id, result_json, **fields)
+    _notify_job_watchers(None)
+
+
+# Assinantes dos eventos de job (SSE): uma asyncio.Queue(maxsize=1) por conexão, sinalizada das threads
+# dos workers via call_soon_threadsafe. A fila só diz "mudou"; o evento enviado é o status atual do job,
+# então atualizações em rajada se fundem numa só.
+_job_watchers_lock = threading.Lock()
+_job_watchers: Dict[str, List[Tuple[Any, "asyncio.Queue[None]"]]] = {}
+
+def _signal_watcher(queue: "asyncio.Queue[None]") -> None:
+    if queue.empty():
+        queue.put_nowait(None)
+
+def _notify_job_watchers(job_id: Optional[str]) -> None:
+    with _job_watchers_lock:
+        if job_id is None:
+            watchers = [w for ws in _job_watchers.values() for w in ws]
+        else:
+            watchers = list(_job_watchers.get(job_id, ()))
+    for loop, queue in watchers:
+        try:
+            loop.call_soon_threadsafe(_signal_watcher, queue)
+        except RuntimeError:
+            pass  # event loop já encerrado (conexão caiu); o finally do stream remove o assinante
 
 
 def _cache_dir() -> Path:
@@ -131,24 +377,115 @@ def _cache_key(parts: list[str]) -> str:
         h.update(b"|")
     return h.hexdigest()
 
+_cache_store_lock = threading.Lock()
+_cache_store_instance: Optional[CacheStore] = None
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+def _cache_store() -> CacheStore:
+    """
+    Store único (SQLite em `cache/cache.sqlite3`), aberto na 1ª chamada.
+    Orçamento/TTL via SISRUA_CACHE_MAX_BYTES e SISRUA_CACHE_TTL_S (0 = sem expiração).
+    """
+    global _cache_store_instance
+    with _cache_store_lock:
+        path = _cache_dir() / "cache.sqlite3"
+        if _cache_store_instance is None or _cache_store_instance.path != path:
+            _cache_store_instance = CacheStore(
+                path,
+                max_bytes=int(_env_number("SISRUA_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                ttl_s=_env_number("SISRUA_CACHE_TTL_S", DEFAULT_TTL_S),
+            )
+            _purge_legacy_cache_files(path.parent)
+        return _cache_store_instance
+
+def _purge_legacy_cache_files(cache_dir: Path) -> None:
+    """
+    Remove os `{sha256}.json` do formato antigo: eram chaveados sem a versão do pipeline, nenhuma chave atual os alcança.
+    """
+    for path in cache_dir.glob("*.json"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+# Versão do pipeline que deriva a saída CAD dos dados brutos (larguras, layers, normalização, blocos).
+# Mudou a saída? Incrementa: os resultados derivados antigos deixam de casar com a chave, enquanto
+# os dados OSM brutos (tiles, ver `_osm_frames_from_tiles`) continuam valendo e são re-derivados sem rede.
+PREPARE_PIPELINE_VERSION = 2
+
+# Entradas do cache: JSON estrito comprimido com gzip. Para o prepare, o JSON já é a resposta de cache hit
+# ("cache_hit": true embutido), servida sem decodificar (ver `_cached_json_response`).
+_GZIP_MAGIC = b"\x1f\x8b"
+_CACHE_GZIP_LEVEL = 6
+
+def _read_cache_raw(key: str) -> Optional[bytes]:
+    """
+    Bytes como estão no store (em geral gzip); None se não houver entrada.
+    """
+    try:
+        return _cache_store().get(key)
+    except Exception:
+        return None
+
+def _cache_json_bytes(data: bytes) -> bytes:
+    return gzip.decompress(data) if data[:2] == _GZIP_MAGIC else data
+
 def _read_cache(key: str) -> Optional[dict]:
+    # O cache só contém JSON estrito (gravado via `_json_bytes`): não precisa sanitizar na leitura.
+    data = _read_cache_raw(key)
+    if data is None:
+        return None
     try:
-        path = _cache_dir() / f"{key}.json"
-        if not path.exists():
-            return None
-        data = json.loads(path.read_text(encoding="utf-8"))
-        return _sanitize_jsonable(data)
+        return _json_loads(_cache_json_bytes(data))
     except Exception:
         return None
 
 def _write_cache(key: str, payload: dict) -> None:
     try:
-        path = _cache_dir() / f"{key}.json"
-        safe = _sanitize_jsonable(payload)
-        path.write_text(json.dumps(safe, ensure_ascii=False), encoding="utf-8")
+        _write_cache_bytes(key, _json_bytes(payload))
     except Exception:
         return
 
+def _cache_store_put(key: str, data: bytes) -> None:
+    try:
+        _cache_store().put(key, data)
+    except Exception:
+        return
+
+def _write_cache_bytes(key: str, data: bytes) -> None:
+    """
+    Grava um payload já serializado (JSON estrito, sem NaN/Inf), comprimido.
+    """
+    try:
+        _cache_store().put(key, gzip.compress(data, compresslevel=_CACHE_GZIP_LEVEL, mtime=0))
+    except Exception:
+        return
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def _cached_json_response(key: str, accept_encoding: str | None) -> Optional[Response]:
+    """
+    Cache hit servido direto dos bytes guardados: com `Content-Encoding: gzip` se o cliente aceitar,
+    senão só descomprimido. Sem json.loads nem re-serialização.
+    """
+    data = _read_cache_raw(key)
+    if data is None:
+        return None
+    headers = {"Vary": "Accept-Encoding"}
+    if data[:2] == _GZIP_MAGIC and _accepts_gzip(accept_encoding):
+        return Response(content=data, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=_cache_json_bytes(data), media_type="application/json", headers=headers)
+
 # Armazenamento simples em memória (jobs). Em produção, isso pode virar persistância.
 
 @app.get("/api/v1/auth/check")
@@ -161,49 +498,442 @@ async def health():
     return {"status": "ok"}
 
 
-def _run_prepare_job_sync(job_id: str, payload: PrepareJobRequest) -> None:
+@app.get("/api/v1/stats")
+async def stats(x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Contadores internos (diagnóstico): cache de Transformers pyproj e cache de resultados.
+    """
+    _require_token(x_sisrua_token)
+    return {"transformers": _transformer_cache_stats(), "cache": _cache_store().stats(), "jobs": {**_job_scheduler.stats(), **_inflight_stats, "executor": _job_executor_mode(), "registry": _job_registry().footprint()}}
+
+
+# Pool de workers dos jobs: SISRUA_JOB_WORKERS executando ao mesmo tempo, até SISRUA_JOB_QUEUE_MAX esperando.
+_job_scheduler = JobScheduler(
+    workers=int(_env_number("SISRUA_JOB_WORKERS", DEFAULT_WORKERS)),
+    max_queue=int(_env_number("SISRUA_JOB_QUEUE_MAX", DEFAULT_MAX_QUEUE)),
+)
+
+# GeoJSON (local, pequeno) passa na frente de OSM (download + GeoDataFrames); menor = antes.
+_JOB_PRIORITY = {"geojson": 0, "osm": 1}
+
+
+def _prepare_job_bytes(payload: PrepareJobRequest, cache_key: Optional[str], progress: ProgressFn) -> bytes:
+    """
+    Executa o job e devolve o resultado já serializado (bytes JSON de PrepareResponse).
+    Roda tanto em thread quanto em processo worker; `progress(fração, mensagem)` informa as etapas.
+    """
+    simplify_m = _simplify_tolerance(payload.simplify_tolerance_m)
+    if payload.kind == "osm":
+        if payload.latitude is None or payload.longitude is None or payload.radius is None:
+            raise ValueError("latitude/longitude/radius são obrigatórios para kind=osm")
+        cached = _read_cache_raw(_osm_cache_key(payload.latitude, payload.longitude, payload.radius, simplify_m=simplify_m, merge_edges=payload.merge_edges))
+        if cached is not None:
+            # Cache hit: os bytes guardados já são o resultado serializado.
+            return _cache_json_bytes(cached)
+        result = _prepare_osm_compute(payload.latitude, payload.longitude, payload.radius, cache_checked=True, progress=progress, simplify_m=simplify_m, merge_edges=payload.merge_edges)
+    elif payload.kind == "geojson":
+        if payload.geojson is None:
+            raise ValueError("geojson é obrigatório para kind=geojson")
+        cached = _read_cache_raw(cache_key) if cache_key else None
+        if cached is not None:
+            return _cache_json_bytes(cached)
+        result = _prepare_geojson_compute(payload.geojson, cache_key, progress=progress, simplify_m=simplify_m)
+    else:
+        raise ValueError("kind inválido. Use 'osm' ou 'geojson'.")
+
+    progress(0.95, f"Serializando {len(result.get('features') or [])} feições...")
+    # As features já saem do pipeline no formato de CadFeature; serializamos uma única vez.
+    return _json_bytes(result)
+
+
+def _run_prepare_job_sync(job_id: str, payload: PrepareJobRequest, cache_key: Optional[str] = None, body: Optional[bytes] = None) -> None:
+    """
+    Corpo do job no worker do agendador. Em modo processo, o trabalho vai para o pool de processos
+    (ver `_process_pool`) e esta thread só espera o resultado.
+    """
+    last: List[Any] = [None]
+
+    def _progress(p: float, msg: str) -> None:
+        if job_id in _cancelled_jobs:
+            raise JobCancelled(job_id)
+        # Chamadas repetidas (espera do download) só verificam o cancelamento, sem notificar ninguém.
+        if last[0] != (p, msg):
+            last[0] = (p, msg)
+            _update_job(job_id, progress=p, message=msg)
+
     try:
         _update_job(job_id, status="processing", progress=0.05, message="Iniciando...")
-
-        if payload.kind == "osm":
-            if payload.latitude is None or payload.longitude is None or payload.radius is None:
-                raise ValueError("latitude/longitude/radius são obrigatórios para kind=osm")
-            _update_job(job_id, progress=0.15, message="Baixando dados do OSM...")
-            result = _prepare_osm_compute(payload.latitude, payload.longitude, payload.radius)
-            _update_job(job_id, progress=0.95, message="Finalizando...")
-        elif payload.kind == "geojson":
-            if payload.geojson is None:
-                raise ValueError("geojson é obrigatório para kind=geojson")
-            _update_job(job_id, progress=0.2, message="Processando GeoJSON...")
-            result = _prepare_geojson_compute(payload.geojson)
-            _update_job(job_id, progress=0.95, message="Finalizando...")
+        _progress(0.05, "Iniciando...")
+        if _job_executor_mode() == "process":
+            result_json = _wait_process_job(job_id, body if body is not None else payload.model_dump_json().encode("utf-8"), cache_key)
         else:
-            raise ValueError("kind inválido. Use 'osm' ou 'geojson'.")
+            result_json = _prepare_job_bytes(payload, cache_key, _progress)
+        _finish_job(job_id, "completed", "Concluído.", result_json=result_json)
+    except JobCancelled:
+        _finish_job(job_id, "cancelled", "Cancelado.")
+    except Exception as e:
+        _finish_job(job_id, "failed", "Falhou.", error=str(e))
+    finally:
+        _cancelled_jobs.discard(job_id)
+
+
+# --- Execução em processos -----------------------------------------------------------------------
+# Projeção e montagem de features são CPU em Python puro: em threads, disputam o GIL com o event loop
+# do uvicorn (health/polling travam). Com SISRUA_JOB_EXECUTOR=process, os jobs rodam num pool de
+# processos já aquecidos (OSMnx/GeoPandas/pyproj importados, Transformers UTM criados).
+# Ida e volta são buffers compactos: o corpo bruto da requisição e os bytes JSON do resultado.
+
+_process_pool_lock = threading.Lock()
+_process_pool_instance: Any = None
+_process_progress_queue: Any = None
+_worker_progress_queue: Any = None  # no processo worker: fila para reportar progresso ao processo da API
+# job_id → True para jobs cancelados, compartilhado com os workers (dict de um Manager).
+_process_cancel_flags: Any = None
+_worker_cancel_flags: Any = None
+_process_manager: Any = None
+# Intervalo de verificação do cancelamento enquanto se espera algo que não reporta progresso.
+_CANCEL_POLL_S = 0.1
+
+def _job_executor_mode() -> str:
+    return "process" if (os.environ.get("SISRUA_JOB_EXECUTOR") or "").strip().lower() == "process" else "thread"
+
+def _process_worker_init(progress_queue: Any, cancel_flags: Any = None) -> None:
+    global _worker_progress_queue, _worker_cancel_flags
+    _worker_progress_queue = progress_queue
+    _worker_cancel_flags = cancel_flags
+    try:
+        import geopandas  # noqa: F401
+        import osmnx  # noqa: F401
+        import pyproj  # noqa: F401
+
+        prewarm_transformers()
+    except Exception:
+        # Sem o aquecimento o worker funciona igual; os imports acontecem no 1º job.
+        pass
+
+def _process_worker_ready() -> int:
+    return os.getpid()
 
-        safe_result = PrepareResponse(**_sanitize_jsonable(result)) # Ensure it's a PrepareResponse object
-        _update_job(job_id, status="completed", progress=1.0, message="Concluído.", result=safe_result.model_dump()) # Use model_dump
+def _process_prepare_job(job_id: str, body: bytes, cache_key: Optional[str]) -> bytes:
+    """
+    Executado no processo worker: valida o corpo bruto e devolve os bytes JSON do resultado.
+    """
+    last: List[Any] = [None]
+
+    def _progress(p: float, msg: str) -> None:
+        if _worker_cancel_flags is not None and job_id in _worker_cancel_flags:
+            raise JobCancelled(job_id)
+        if _worker_progress_queue is not None and last[0] != (p, msg):
+            last[0] = (p, msg)
+            _worker_progress_queue.put((job_id, p, msg))
+
+    try:
+        return _prepare_job_bytes(PrepareJobRequest.model_validate_json(body), cache_key, _progress)
     except Exception as e:
-        _update_job(job_id, status="failed", progress=1.0, message="Falhou.", error=str(e))
+        # Só a mensagem atravessa o processo: exceções como HTTPException nem sempre são re-criáveis pelo pickle.
+        raise RuntimeError(str(e)) from None
+
+def _drain_process_progress(queue: Any) -> None:
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+        job_id, p, msg = item
+        # O progresso chega por outro canal que o resultado: não sobrescreve job já encerrado.
+        if (_job_registry().get(job_id) or {}).get("status") != "processing":
+            continue
+        _update_job(job_id, progress=p, message=msg)
+
+def _wait_process_job(job_id: str, body: bytes, cache_key: Optional[str]) -> bytes:
+    """
+    Submete o job ao pool de processos e espera o resultado, verificando o cancelamento: cancelado, o
+    worker do agendador é liberado na hora e o processo para no seu próximo ponto de verificação.
+    """
+    from concurrent.futures import TimeoutError as FutureTimeout
+
+    future = _process_pool().submit(_process_prepare_job, job_id, body, cache_key)
+    flags = _process_cancel_flags
+    if flags is not None:
+        future.add_done_callback(lambda _f: flags.pop(job_id, None))
+    while True:
+        try:
+            return future.result(timeout=_CANCEL_POLL_S)
+        except FutureTimeout:
+            if job_id in _cancelled_jobs:
+                future.cancel()
+                raise JobCancelled(job_id) from None
+
+def _flag_process_job_cancelled(job_id: str) -> None:
+    flags = _process_cancel_flags
+    if flags is None:
+        return
+    try:
+        flags[job_id] = True
+    except Exception:
+        pass  # manager encerrado: o processo termina o job e o resultado é descartado
 
+def _process_pool() -> Any:
+    """
+    Pool de processos (spawn), criado no 1º uso com um worker por vaga do agendador.
+    """
+    global _process_pool_instance, _process_progress_queue, _process_manager, _process_cancel_flags
+    with _process_pool_lock:
+        if _process_pool_instance is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            ctx = multiprocessing.get_context("spawn")
+            _process_progress_queue = ctx.SimpleQueue()
+            _process_manager = ctx.Manager()
+            _process_cancel_flags = _process_manager.dict()
+            _process_pool_instance = ProcessPoolExecutor(
+                max_workers=_job_scheduler.workers, mp_context=ctx, initializer=_process_worker_init,
+                initargs=(_process_progress_queue, _process_cancel_flags),
+            )
+            threading.Thread(target=_drain_process_progress, args=(_process_progress_queue,), name="sisrua-job-progress", daemon=True).start()
+        return _process_pool_instance
 
-@app.post("/api/v1/jobs/prepare")
-async def create_prepare_job(payload: PrepareJobRequest, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+def prewarm_process_pool(wait: bool = False) -> int:
+    """
+    Sobe os processos workers antes do 1º job (cada um importa o stack GIS no initializer).
+    Sem efeito fora do modo processo. Retorna quantos PIDs distintos responderam (só com wait=True).
+    """
+    if _job_executor_mode() != "process":
+        return 0
+    pool = _process_pool()
+    futures = [pool.submit(_process_worker_ready) for _ in range(_job_scheduler.workers)]
+    return len({f.result() for f in futures}) if wait else 0
+
+def shutdown_process_pool() -> None:
+    global _process_pool_instance, _process_progress_queue, _process_manager, _process_cancel_flags
+    with _process_pool_lock:
+        pool, queue, manager = _process_pool_instance, _process_progress_queue, _process_manager
+        _process_pool_instance = _process_progress_queue = _process_manager = _process_cancel_flags = None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        queue.put(None)
+    if manager is not None:
+        manager.shutdown()
+
+
+@app.post("/api/v1/jobs/prepare", openapi_extra=_body_schema(PrepareJobRequest))
+async def create_prepare_job(request: Request, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Corpo: PrepareJobRequest. Para kind=geojson, o hash do corpo bruto é a chave do cache de resultado.
+    Um pedido idêntico a um job ainda em andamento recebe o mesmo job (single-flight).
+    """
     _require_token(x_sisrua_token)
-    job_id = _init_job(payload.kind)
-    t = threading.Thread(target=_run_prepare_job_sync, args=(job_id, payload), daemon=True)
-    t.start()
-    with _job_store_lock:
-        return job_store[job_id]
+    body, digest = await _read_body_digest(request)
+    payload = _parse_body(PrepareJobRequest, body)
+    cache_key = _geojson_cache_key(digest) if payload.kind == "geojson" else None
+    # OSM: chave pelos parâmetros normalizados como em `_osm_cache_key` (a chave completa exige abrir
+    # regras/extrato, o que fica no job). Parâmetros ausentes/inválidos: o job falha na validação.
+    query = (payload.latitude, payload.longitude, payload.radius)
+    if all(v is not None and math.isfinite(v) for v in query):
+        query_parts = _osm_query_parts(*query, _simplify_tolerance(payload.simplify_tolerance_m), payload.merge_edges)
+    else:
+        query_parts = [str(v) for v in query]
+    inflight_key = cache_key or _cache_key(["job", payload.kind, *query_parts])
+    job_id, created = _attach_or_init_job(payload.kind, inflight_key)
+    if not created:
+        return _job_response(job_id)
+
+    def _run() -> None:
+        try:
+            _run_prepare_job_sync(job_id, payload, cache_key, body)
+        finally:
+            _release_inflight_job(inflight_key, job_id)
+
+    try:
+        _job_scheduler.submit(job_id, _run, priority=_JOB_PRIORITY.get(payload.kind, 1))
+    except QueueFull as e:
+        _release_inflight_job(inflight_key, job_id)
+        _job_registry().remove(job_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_s)})
+    return _job_response(job_id)
+
+
+def _job_status_meta(job_id: str) -> Dict[str, Any]:
+    """
+    Metadados do job (JobStatusResponse sem `result`), com a posição na fila; 404 se não existe.
+    """
+    meta = _job_registry().get(job_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    meta["queue_position"] = _job_scheduler.position(job_id) if meta["status"] == "queued" else None
+    if meta["queue_position"] is not None:
+        meta["message"] = f"Na fila (posição {meta['queue_position']})..."
+    return meta
+
+
+def _job_response(job_id: str) -> Response:
+    """
+    Serializa o job no formato de JobStatusResponse. O `result` (bytes já prontos) é emendado sem re-serializar.
+    """
+    meta = _job_status_meta(job_id)
+    result_json = _job_registry().result(job_id) if meta["status"] == "completed" else None
+    body = b"".join([_json_bytes(meta)[:-1], b', "result": ', result_json or b"null", b"}"])
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/v1/jobs/{job_id}")
 async def get_job(job_id: str, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Job completo, com o `result` quando concluído. Para polling, prefira /status + /result.
+    """
     _require_token(x_sisrua_token)
-    with _job_store_lock:
-        job = job_store.get(job_id)
-    if not job:
+    return _job_response(job_id)
+
+
+def _etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+@app.get("/api/v1/jobs/{job_id}/status")
+async def get_job_status(job_id: str, if_none_match: str | None = Header(default=None), x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Polling leve: JobStatusResponse sem `result`. Com `If-None-Match` igual ao ETag anterior, 304 sem corpo.
+    """
+    _require_token(x_sisrua_token)
+    body = _json_bytes(_job_status_meta(job_id))
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_job(job_id: str, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Cancela o job. Na fila: sai dela e fica `cancelled` na hora (200). Executando: 202, e o worker para
+    no próximo lote (vias, pontos, projeção) ou durante a espera do download; o status vira `cancelled`.
+    Job já concluído/falho → 409.
+    Job compartilhado pelo single-flight: cada DELETE desliga um dos pedidos; enquanto restar algum, o job
+    segue para os demais (200 com o status atual e X-SisRua-Requesters = quantos restam).
+    """
+    _require_token(x_sisrua_token)
+    meta = _job_status_meta(job_id)
+    if meta["status"] == "cancelled":
+        return _job_response(job_id)
+    if meta["status"] not in ("queued", "processing"):
+        raise HTTPException(status_code=409, detail=f"Job já encerrado ({meta['status']}).")
+    remaining = _detach_job_requester(job_id)
+    if remaining:
+        response = _job_response(job_id)
+        response.headers["X-SisRua-Requesters"] = str(remaining)
+        return response
+    cancelled_now = _cancel_job(job_id)
+    response = _job_response(job_id)
+    if not cancelled_now:
+        response.status_code = 202
+    return response
+
+
+_JOB_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+_SSE_KEEPALIVE_S = 15.0
+
+async def _job_event_stream(job_id: str) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    watcher: Tuple[Any, "asyncio.Queue[None]"] = (loop, asyncio.Queue(maxsize=1))
+    with _job_watchers_lock:
+        _job_watchers.setdefault(job_id, []).append(watcher)
+    try:
+        last = None
+        while True:
+            try:
+                meta = _job_status_meta(job_id)
+            except HTTPException as e:
+                yield b"event: error\ndata: " + _json_bytes({"detail": e.detail}) + b"\n\n"
+                return
+            data = _json_bytes(meta)
+            if data != last:
+                last = data
+                yield b"event: status\ndata: " + data + b"\n\n"
+            if meta["status"] in _JOB_TERMINAL_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(watcher[1].get(), timeout=_SSE_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        with _job_watchers_lock:
+            watchers = _job_watchers.get(job_id, [])
+            if watcher in watchers:
+                watchers.remove(watcher)
+            if not watchers:
+                _job_watchers.pop(job_id, None)
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def get_job_events(job_id: str, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Server-Sent Events do job: um evento `status` (JobStatusResponse sem `result`) a cada mudança de
+    etapa/progresso, até completed/failed/cancelled; depois, busque /result. Substitui o polling de /status.
+    """
+    _require_token(x_sisrua_token)
+    _job_status_meta(job_id)  # 404 antes de abrir o stream
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_job_event_stream(job_id), media_type="text/event-stream", headers=headers)
+
+
+# Último resultado decodificado para leituras por faixa (offset/limit): o plugin busca os pedaços de um
+# mesmo job em sequência, então guardar só um evita decodificar o JSON inteiro a cada pedaço.
+_job_result_parsed_lock = threading.Lock()
+_job_result_parsed: Optional[Tuple[str, dict]] = None
+
+def _parsed_job_result(job_id: str) -> Optional[dict]:
+    global _job_result_parsed
+    with _job_result_parsed_lock:
+        if _job_result_parsed is not None and _job_result_parsed[0] == job_id:
+            return _job_result_parsed[1]
+    result_json = _job_registry().result(job_id)
+    if result_json is None:
+        return None
+    result = _json_loads(result_json)
+    with _job_result_parsed_lock:
+        _job_result_parsed = (job_id, result)
+    return result
+
+
+@app.get("/api/v1/jobs/{job_id}/result")
+def get_job_result(job_id: str, response_format: ResponseFormat = Query("features", alias="format"), offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1), accept: str | None = Header(default=None), x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Resultado de um job concluído, no formato pedido (features/columnar/binary).
+    Com `offset`/`limit` (em features), devolve só a faixa pedida; os headers X-SisRua-Total-Features e
+    X-SisRua-Next-Offset (ausente no último pedaço) guiam a leitura em pedaços.
+    Declarado como `def`: leitura do resultado em disco, parse e conversão de formato rodam no threadpool.
+    """
+    _require_token(x_sisrua_token)
+    job = _job_registry().get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
+    status = job["status"]
+    if offset or limit is not None:
+        result = _parsed_job_result(job_id) if status == "completed" else None
+        if result is None:
+            raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status={status}).")
+        features = result.get("features") or []
+        end = len(features) if limit is None else min(len(features), offset + limit)
+        chunk = {
+            "crs_out": result.get("crs_out"), "features": features[offset:end], "cache_hit": result.get("cache_hit"),
+            **{k: result[k] for k in SIMPLIFY_FIELDS if k in result},
+        }
+        response = _format_prepare_result(chunk, response_format, accept)
+        response.headers["X-SisRua-Total-Features"] = str(len(features))
+        if end < len(features):
+            response.headers["X-SisRua-Next-Offset"] = str(end)
+        return response
+
+    result_json = _job_registry().result(job_id) if status == "completed" else None
+    if status != "completed" or result_json is None:
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status={status}).")
+    if response_format == "features" and not (accept and BINARY_MEDIA_TYPE in accept):
+        return Response(content=result_json, media_type="application/json")
+    return _format_prepare_result(_json_loads(result_json), response_format, accept)
 
 
 def _utm_zone(longitude: float) -> int:
@@ -224,61 +954,138 @@ def _sirgas2000_utm_epsg(latitude: float, longitude: float) -> int:
     # Fórmula conhecida para zonas Sul: 31960 + zone.
     return 31960 + zone
 
-def _to_linestrings(geom) -> List[Any]:
-    # Import local para evitar puxar stack GIS pesada na importação do módulo (melhor para CI e startup).
-    from shapely.geometry import LineString, MultiLineString  # type: ignore
+# Zonas UTM (Sul) que cobrem o território brasileiro: 18S..25S → EPSG:31978..31985.
+BRAZIL_UTM_ZONES = tuple(range(18, 26))
 
-    if geom is None:
-        return []
-    if isinstance(geom, LineString):
-        return [geom]
-    if isinstance(geom, MultiLineString):
-        return list(geom.geoms)
-    return []
-
-def _project_lines_to_xy(lines: List[Any], transformer: Any) -> List[List[List[float]]]:
-    """
-    Retorna lista de coordenadas [[x,y],...] por linha.
-    """
-    # Import local: evita custo de import no startup/testes que não precisam de OSM.
-    from shapely.ops import transform as shapely_transform  # type: ignore
-
-    out = []
-    for line in lines:
-        projected = shapely_transform(transformer.transform, line)
-        coords = []
-        for (x, y) in projected.coords:
-            fx = float(x)
-            fy = float(y)
-            # Starlette/JSONResponse rejeita NaN/Inf (gera 500). Sanitizamos aqui.
-            if not math.isfinite(fx) or not math.isfinite(fy):
+# Registro de Transformers por EPSG de saída (entrada sempre EPSG:4326).
+# Criar um Transformer consulta o banco do PROJ; reaproveitamos entre requisições/jobs.
+# pyproj >= 3.1 mantém o contexto PROJ por thread, então a mesma instância pode ser usada por vários jobs.
+_transformer_lock = threading.Lock()
+_transformers: Dict[int, Any] = {}
+_transformer_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+def _get_transformer(epsg_out: int) -> Any:
+    """
+    Retorna (criando na 1ª vez) o Transformer EPSG:4326 → EPSG:<epsg_out> com always_xy=True.
+    """
+    from pyproj import Transformer  # type: ignore
+
+    with _transformer_lock:
+        transformer = _transformers.get(epsg_out)
+        if transformer is not None:
+            _transformer_stats["hits"] += 1
+            return transformer
+        _transformer_stats["misses"] += 1
+        # Criado dentro do lock: evita que jobs concorrentes construam o mesmo Transformer em paralelo.
+        transformer = Transformer.from_crs("EPSG:4326", f"EPSG:{epsg_out}", always_xy=True)
+        _transformers[epsg_out] = transformer
+        return transformer
+
+def prewarm_transformers(zones: Tuple[int, ...] = BRAZIL_UTM_ZONES) -> int:
+    """
+    Pré-carrega os Transformers SIRGAS 2000 / UTM das zonas informadas (usado no startup do standalone).
+    Retorna quantos Transformers foram criados agora.
+    """
+    created = 0
+    for zone in zones:
+        epsg_out = 31960 + zone
+        with _transformer_lock:
+            if epsg_out in _transformers:
                 continue
-            coords.append([fx, fy])
-        if len(coords) >= 2:
-            out.append(coords)
-    return out
+        _get_transformer(epsg_out)
+        created += 1
+    return created
 
-def _estimate_width_m(row: Any, highway: Optional[str]) -> Optional[float]:
+def _transformer_cache_stats() -> Dict[str, Any]:
+    with _transformer_lock:
+        return {**_transformer_stats, "size": len(_transformers), "epsg": sorted(_transformers)}
+
+def _project_vertices(lonlat: Any, offsets: Any, transformer: Any, simplify_m: float = 0.0, stats: Optional[Dict[str, int]] = None) -> List[List[List[float]]]:
     """
-    Estima a largura em metros baseado no tipo de highway.
-    Retorna None se não conseguir estimar.
+    Kernel de projeção em lote: todos os vértices de uma requisição numa única chamada ao Transformer.
+    - `lonlat`: array (N, 2) com lon/lat de todas as partes concatenadas
+    - `offsets`: array (P+1,) com o início de cada parte em `lonlat` (último = N)
+    - `simplify_m` > 0: simplifica as linhas (partes com 2+ vértices) já em UTM (ver `_simplify_projected`)
+    - `stats`: acumula "vertices_before"/"vertices_after" das linhas
+    Retorna, por parte, a lista [[x,y],...] projetada, já sem vértices NaN/Inf
+    (Starlette/JSONResponse rejeita NaN/Inf e geraria 500). Quem chama decide o mínimo de vértices.
     """
-    if not highway:
-        return None
-    
-    # Mapeamento básico de tipos de highway para larguras (em metros)
-    width_map = {
-        "residential": 5.0,
-        "tertiary": 8.0,
-        "secondary": 10.0,
-        "primary": 12.0,
-        "motorway": 20.0,
-        "footway": 2.0,
-        "cycleway": 3.0,
-        "service": 4.0,
-    }
-    
-    return width_map.get(highway, 6.0)  # Default 6.0m
+    import numpy as np  # type: ignore
+
+    lonlat = np.asarray(lonlat, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_parts = len(offsets) - 1
+    if n_parts <= 0:
+        return []
+    if lonlat.shape[0] == 0:
+        return [[] for _ in range(n_parts)]
+
+    xs, ys = transformer.transform(lonlat[:, 0], lonlat[:, 1])
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    ok = np.isfinite(xs) & np.isfinite(ys)
+
+    part_of = np.repeat(np.arange(n_parts), np.diff(offsets))[ok]
+    xy = np.column_stack((xs[ok], ys[ok]))
+    counts = np.bincount(part_of, minlength=n_parts)
+    vertices_before = int(counts[counts >= 2].sum())
+    if simplify_m > 0:
+        xy, part_of = _simplify_projected(xy, part_of, counts >= 2, simplify_m)
+        counts = np.bincount(part_of, minlength=n_parts)
+    if stats is not None:
+        stats["vertices_before"] = stats.get("vertices_before", 0) + vertices_before
+        stats["vertices_after"] = stats.get("vertices_after", 0) + int(counts[counts >= 2].sum())
+    bounds = np.concatenate(([0], np.cumsum(counts))).tolist()
+    coords = xy.tolist()
+    return [coords[bounds[i]:bounds[i + 1]] for i in range(n_parts)]
+
+def _simplify_projected(xy: Any, part_of: Any, is_line: Any, tolerance_m: float) -> Tuple[Any, Any]:
+    """
+    Douglas-Peucker com preservação de topologia (shapely 2 `simplify(preserve_topology=True)`), em lote,
+    sobre as linhas já projetadas (UTM, tolerância em metros). Pontos/partes de 1 vértice passam intactos.
+    Recebe e devolve os vértices (N, 2) e a parte de cada vértice, em ordem de parte.
+    """
+    import numpy as np  # type: ignore
+    import shapely  # type: ignore
+
+    line_ids = np.flatnonzero(is_line)
+    if line_ids.size == 0:
+        return xy, part_of
+    dense = np.full(is_line.shape[0], -1, dtype=np.int64)
+    dense[line_ids] = np.arange(line_ids.size)
+    in_line = is_line[part_of]
+    lines = shapely.linestrings(xy[in_line], indices=dense[part_of[in_line]])
+    out_xy, out_idx = shapely.get_coordinates(shapely.simplify(lines, tolerance_m, preserve_topology=True), return_index=True)
+    # Junta as linhas simplificadas com as partes não simplificadas, de volta à ordem por parte.
+    merged_xy = np.concatenate((xy[~in_line], out_xy))
+    merged_part = np.concatenate((part_of[~in_line], line_ids[out_idx]))
+    order = np.argsort(merged_part, kind="stable")
+    return merged_xy[order], merged_part[order]
+
+def _project_geometries(geoms: Any, transformer: Any, simplify_m: float = 0.0, stats: Optional[Dict[str, int]] = None) -> List[List[List[float]]]:
+    """
+    Projeta um array de geometrias shapely (LineString/Point) via `_project_vertices`.
+    """
+    import numpy as np  # type: ignore
+    import shapely  # type: ignore
+
+    geoms = np.asarray(geoms, dtype=object)
+    lonlat, index = shapely.get_coordinates(geoms, return_index=True)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(index, minlength=len(geoms)))))
+    return _project_vertices(lonlat, offsets, transformer, simplify_m, stats)
+
+# Mapeamento básico de tipos de highway para larguras (em metros)
+_HIGHWAY_WIDTH_M: Dict[str, float] = {
+    "residential": 5.0,
+    "tertiary": 8.0,
+    "secondary": 10.0,
+    "primary": 12.0,
+    "motorway": 20.0,
+    "footway": 2.0,
+    "cycleway": 3.0,
+    "service": 4.0,
+}
+_DEFAULT_WIDTH_M = 6.0
 
 def _norm_optional_str(v: Any) -> Optional[str]:
     """
@@ -329,24 +1136,601 @@ def _sanitize_jsonable(obj: Any) -> Any:
     except Exception:
         return None
 
-def _prepare_osm_compute(latitude: float, longitude: float, radius: float) -> dict:
+def _json_default(obj: Any) -> Any:
+    """
+    Tipos fora do JSON nativo: modelos pydantic viram dict; o resto vira string (mesmo fallback do sanitize).
+    """
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+def _json_bytes(obj: Any) -> bytes:
+    """
+    Serializa em JSON estrito numa única passada, sem copiar o payload:
+    - com orjson: NaN/Inf viram null durante a codificação
+    - sem orjson: json.dumps(allow_nan=False); só se aparecer NaN/Inf pagamos o `_sanitize_jsonable` recursivo
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # ex.: int > 64 bits; segue pelo caminho da stdlib
+    try:
+        return json.dumps(obj, ensure_ascii=False, allow_nan=False, default=_json_default).encode("utf-8")
+    except ValueError:
+        return json.dumps(_sanitize_jsonable(obj), ensure_ascii=False).encode("utf-8")
+
+def _json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Registros de feature: dicts com exatamente o formato de `CadFeature.model_dump()`.
+# São montados direto pelo pipeline, que já garante os tipos (validação na borda):
+# strings/None nos textos e floats finitos nas coordenadas. Assim cada feature não paga
+# construção + dump de um modelo pydantic; `CadFeature` continua sendo o schema de referência.
+
+def _polyline_record(*, layer: Optional[str], name: Optional[str], highway: Optional[str], width_m: Optional[float], coords_xy: List[List[float]]) -> Dict[str, Any]:
+    return {
+        "feature_type": "Polyline",
+        "layer": layer,
+        "name": name,
+        "highway": highway,
+        "width_m": width_m,
+        "coords_xy": coords_xy,
+        "insertion_point_xy": None,
+        "block_name": None,
+        "block_filepath": None,
+        "rotation": None,
+        "scale": None,
+    }
+
+def _point_record(*, layer: Optional[str], name: Optional[str], block_name: Optional[str], block_filepath: Optional[str], insertion_point_xy: List[float], rotation: Optional[float], scale: Optional[float]) -> Dict[str, Any]:
+    return {
+        "feature_type": "Point",
+        "layer": layer,
+        "name": name,
+        "highway": None,
+        "width_m": None,
+        "coords_xy": None,
+        "insertion_point_xy": insertion_point_xy,
+        "block_name": block_name,
+        "block_filepath": block_filepath,
+        "rotation": rotation,
+        "scale": scale,
+    }
+
+def _optional_finite_float(v: Any, field: str) -> Optional[float]:
+    """
+    Valida um número vindo da entrada (ex.: properties do GeoJSON). NaN/Inf viram None; texto não numérico → 400.
+    """
+    if v is None:
+        return None
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"GeoJSON inválido: '{field}' deve ser numérico.")
+    return f if math.isfinite(f) else None
+
+def _column_or_none(frame: Any, column: str) -> Any:
+    """
+    Equivalente colunar de `row.get(column)`: retorna a coluna como object (ou uma coluna de None se não existir).
+    """
+    import pandas as pd  # type: ignore
+
+    if column in frame.columns:
+        return frame[column].astype(object)
+    return pd.Series([None] * len(frame), index=frame.index, dtype=object)
+
+def _norm_optional_str_column(values: Any, *, unwrap_lists: bool = False) -> Any:
+    """
+    Versão colunar de `_norm_optional_str`: normaliza uma coluna inteira e devolve um array numpy (object).
+    - `unwrap_lists=True` reproduz o "highway = highway[0]" do OSMnx (listas não vazias viram o 1º elemento)
+    - listas restantes viram string (como `str(v)` faria), pois não são hasheáveis no factorize
+    - `_norm_optional_str` roda uma vez por valor distinto, não por linha
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    def _scalar(v: Any) -> Any:
+        if isinstance(v, list):
+            if unwrap_lists and v:
+                v = v[0]
+            if isinstance(v, list):
+                return str(v)
+        return v
+
+    s = pd.Series(values, dtype=object)
+    is_list = s.map(lambda v: isinstance(v, list)).to_numpy(dtype=bool)
+    if is_list.any():
+        s = s.copy()
+        s[is_list] = s[is_list].map(_scalar)
+
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    table = np.array([_norm_optional_str(u) for u in uniques] + [None], dtype=object)
+    return table[codes]
+
+def _edges_to_features(edges: Any, transformer: Any, simplify_m: float = 0.0, stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Converte o GeoDataFrame de edges do OSMnx em features Polyline sem `iterrows()`.
+    Atributos (highway/name/width_m) são resolvidos por coluna, a geometria é "explodida"
+    em lote com shapely 2 e projetada numa única chamada; a ordem e o conteúdo são os mesmos
+    do loop linha a linha. `simplify_m`/`stats`: ver `_project_vertices`.
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+    import shapely  # type: ignore
+
+    if len(edges) == 0:
+        return []
+
+    highways = _norm_optional_str_column(_column_or_none(edges, "highway"), unwrap_lists=True)
+    names = _norm_optional_str_column(_column_or_none(edges, "name"))
+    highway_s = pd.Series(highways, dtype=object)
+    widths = highway_s.map(_HIGHWAY_WIDTH_M).fillna(_DEFAULT_WIDTH_M).to_numpy(dtype=object)
+    widths[~highway_s.astype(bool).to_numpy()] = None  # sem highway → sem largura
+
+    # Só LineString (1) e MultiLineString (5) geram polylines; demais tipos são ignorados.
+    geoms = np.asarray(edges.geometry, dtype=object)
+    type_ids = shapely.get_type_id(geoms)
+    rows = np.flatnonzero((type_ids == 1) | (type_ids == 5))
+    if rows.size == 0:
+        return []
+    parts, part_idx = shapely.get_parts(geoms[rows], return_index=True)
+    part_rows = rows[part_idx]
+
+    features: List[Dict[str, Any]] = []
+    for coords_xy, r in zip(_project_geometries(parts, transformer, simplify_m, stats), part_rows.tolist()):
+        if len(coords_xy) < 2:
+            continue
+        features.append(
+            _polyline_record(
+                layer="SISRUA_OSM_VIAS",
+                name=names[r],
+                highway=highways[r],
+                width_m=widths[r],
+                coords_xy=coords_xy,
+            )
+        )
+    return features
+
+def _drop_reverse_edges(edges: Any) -> Any:
+    """
+    Remove as duplicatas de mão dupla: o OSMnx devolve (u, v, key) e (v, u, key) para a mesma via.
+    Só é duplicata a edge do mesmo par não ordenado {u, v} + key que seja a mesma via desenhada ao contrário:
+    - geometria exatamente invertida (comparada já orientada de min(u, v) para max(u, v)), ou
+    - mesmo `osmid` com `reversed` verdadeiro (a cópia que o OSMnx gera para vias de mão dupla)
+    Vias distintas entre os mesmos nós (ex.: rotatória em dois arcos de mão única) ficam todas.
+    Sem índice (u, v, key) (frames de outra origem), devolve `edges` como está.
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+    import shapely  # type: ignore
+
+    names = list(edges.index.names or [])
+    if len(edges) == 0 or "u" not in names or "v" not in names:
+        return edges
+    u = edges.index.get_level_values("u").to_numpy()
+    v = edges.index.get_level_values("v").to_numpy()
+    key = edges.index.get_level_values("key").to_numpy() if "key" in names else np.zeros(len(edges), dtype=np.int64)
+    swap = u > v
+    lo, hi = np.where(swap, v, u), np.where(swap, u, v)
+
+    geoms = np.asarray(edges.geometry, dtype=object)
+    oriented = geoms.copy()
+    oriented[swap] = shapely.reverse(geoms[swap])
+    wkb = shapely.to_wkb(oriented)
+    duplicate = pd.MultiIndex.from_arrays([lo, hi, key, wkb]).duplicated()
+
+    if "osmid" in edges.columns and "reversed" in edges.columns:
+        osmid = edges["osmid"].astype(str).to_numpy()  # osmid pode ser lista (vias simplificadas)
+        # bool, ou lista de bools em edges simplificadas; ausente (NaN/None) não conta como invertida
+        is_reversed = edges["reversed"].map(lambda r: any(r) if isinstance(r, list) else isinstance(r, (bool, np.bool_)) and bool(r)).to_numpy(dtype=bool)
+        ids = pd.MultiIndex.from_arrays([lo, hi, key, osmid])
+        duplicate |= is_reversed & ids.isin(ids[~is_reversed])
+    return edges[~duplicate]
+
+def _merge_contiguous_edges(edges: Any, progress: ProgressFn = _no_progress) -> Any:
+    """
+    Funde trechos LineString contíguos com o mesmo (name, highway) numa única linha, em tempo ~linear:
+    um índice hash extremidade → trechos (por grupo) liga cada trecho ao vizinho. Só se atravessa uma
+    extremidade compartilhada por exatamente 2 trechos do grupo (em bifurcações da mesma via, ou laços,
+    as linhas ficam separadas). Os trechos invertidos para encadear têm as coordenadas revertidas.
+    Demais geometrias (MultiLineString etc.) passam intactas. Devolve um GeoDataFrame com
+    highway/name/geometry, na ordem do 1º trecho de cada linha.
+    """
+    import geopandas as gpd  # type: ignore
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+    import shapely  # type: ignore
+
+    if len(edges) == 0:
+        return edges
+    highways = _norm_optional_str_column(_column_or_none(edges, "highway"), unwrap_lists=True)
+    names = _norm_optional_str_column(_column_or_none(edges, "name"))
+    geoms = np.asarray(edges.geometry, dtype=object)
+    lines = np.flatnonzero(shapely.get_type_id(geoms) == 1)
+    xy, part = shapely.get_coordinates(geoms[lines], return_index=True)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(part, minlength=len(lines)))))
+    first = xy[offsets[:-1]].tolist()
+    last = xy[np.maximum(offsets[1:] - 1, 0)].tolist()
+    groups = list(zip(names[lines].tolist(), highways[lines].tolist()))
+
+    # (grupo, x, y) da extremidade → trechos (posições em `lines`) que terminam nela.
+    index: Dict[Tuple[Any, float, float], List[int]] = {}
+    start_key, end_key = [], []
+    for i, g in enumerate(groups):
+        a, b = (g, *first[i]), (g, *last[i])
+        start_key.append(a)
+        end_key.append(b)
+        index.setdefault(a, []).append(i)
+        index.setdefault(b, []).append(i)
+
+    visited = bytearray(len(lines))
+
+    def _through(i: int, key: Tuple[Any, float, float]) -> Optional[int]:
+        segs = index[key]
+        if len(segs) != 2 or segs[0] == segs[1]:
+            return None
+        j = segs[1] if segs[0] == i else segs[0]
+        return None if visited[j] else j
+
+    chains: List[List[Tuple[int, bool]]] = []
+    for seed in range(len(lines)):
+        if visited[seed]:
+            continue
+        if len(chains) % _FEATURE_CHUNK == 0:
+            progress(0.4, f"Fundindo vias contíguas ({len(lines)} trechos)...")
+        visited[seed] = 1
+        forward: List[Tuple[int, bool]] = [(seed, False)]
+        cur, key = seed, end_key[seed]
+        while (j := _through(cur, key)) is not None:
+            visited[j] = 1
+            rev = end_key[j] == key
+            forward.append((j, rev))
+            cur, key = j, start_key[j] if rev else end_key[j]
+        backward: List[Tuple[int, bool]] = []
+        cur, key = seed, start_key[seed]
+        while (j := _through(cur, key)) is not None:
+            visited[j] = 1
+            rev = start_key[j] == key
+            backward.append((j, rev))
+            cur, key = j, end_key[j] if rev else start_key[j]
+        chains.append(backward[::-1] + forward)
+
+    # Coordenadas das linhas fundidas, concatenadas; cada trecho após o 1º perde o ponto repetido.
+    pieces, sizes = [], []
+    for chain in chains:
+        size = 0
+        for n, (i, rev) in enumerate(chain):
+            coords = xy[offsets[i] + (0 if rev or n == 0 else 1):offsets[i + 1] - (1 if rev and n else 0)]
+            pieces.append(coords[::-1] if rev else coords)
+            size += len(coords)
+        sizes.append(size)
+    merged = shapely.linestrings(np.concatenate(pieces), indices=np.repeat(np.arange(len(chains)), sizes)) if chains else np.empty(0, dtype=object)
+
+    # Linha fundida na posição do seu 1º trecho; as outras geometrias na posição original.
+    rows = np.concatenate((lines[[chain[0][0] for chain in chains]], np.setdiff1d(np.arange(len(geoms)), lines))).astype(np.int64)
+    out_geoms = np.concatenate((np.asarray(merged, dtype=object), geoms[rows[len(chains):]]))
+    order = np.argsort(rows, kind="stable")
+    return gpd.GeoDataFrame(
+        pd.DataFrame({"highway": highways[rows[order]], "name": names[rows[order]]}, dtype=object),  # dtype: None não vira NaN
+        geometry=out_geoms[order],
+        crs=edges.crs,
+    )
+
+# Regras padrão OSM tag → bloco (usadas se não houver osm_point_rules.json).
+# Ordem = prioridade: o primeiro rule que casar define o bloco do nó.
+_DEFAULT_OSM_POINT_RULES: Dict[str, Any] = {
+    "layer": "SISRUA_OSM_PONTOS",
+    "rules": [
+        {"block_name": "POSTE", "tags": {"highway": ["street_light"]}},
+        {"block_name": "POSTE", "tags": {"power": ["pole"]}},
+        {"block_name": "BANCO", "tags": {"amenity": ["bench"]}},
+    ],
+}
+
+def _contents_dir() -> Path:
+    """
+    Pasta "Contents" do bundle (no EXE: Contents/backend/sisrua_backend.exe; em dev: src/).
+    """
+    # Quando empacotado (ex.: PyInstaller), __file__ pode apontar para uma pasta temporária (MEIPASS).
+    # Preferimos resolver o caminho do bundle via executável.
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).resolve().parent.parent
+    return Path(__file__).resolve().parent.parent
+
+def _load_osm_point_rules() -> Dict[str, Any]:
+    """
+    Carrega as regras OSM tag → bloco de SISRUA_OSM_POINT_RULES ou Contents/Resources/osm_point_rules.json.
+    Formato:
+        {"layer": "...", "rules": [{"block_name": "POSTE", "tags": {"power": ["pole"]}, "layer": "...", "rotation": 0.0, "scale": 1.0}]}
+    Dentro de um rule, todas as tags precisam casar (E); os valores de uma tag são alternativas (OU).
+    Arquivo ausente ou inválido → regras padrão (o import OSM não deve quebrar por causa do config).
+    """
+    env_path = os.environ.get("SISRUA_OSM_POINT_RULES")
+    path = Path(env_path) if env_path else _contents_dir() / "Resources" / "osm_point_rules.json"
+    try:
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            rules = [
+                {
+                    "block_name": str(r["block_name"]),
+                    "tags": {str(k): [str(v) for v in (vs if isinstance(vs, list) else [vs])] for k, vs in r["tags"].items()},
+                    "layer": r.get("layer"),
+                    "rotation": float(r.get("rotation", 0.0)),
+                    "scale": float(r.get("scale", 1.0)),
+                }
+                for r in data["rules"]
+                if r.get("tags")
+            ]
+            return {"layer": data.get("layer") or _DEFAULT_OSM_POINT_RULES["layer"], "rules": rules}
+    except Exception:
+        pass
+    return _DEFAULT_OSM_POINT_RULES
+
+def _ensure_osm_node_tags(ox: Any, point_rules: Dict[str, Any]) -> None:
+    """
+    O OSMnx só mantém nos nós as tags de `settings.useful_tags_node`; incluímos as tags usadas nas regras.
+    """
+    try:
+        current = list(ox.settings.useful_tags_node)
+        wanted = [tag for rule in point_rules["rules"] for tag in rule["tags"]]
+        missing = [tag for tag in dict.fromkeys(wanted) if tag not in current]
+        if missing:
+            ox.settings.useful_tags_node = current + missing
+    except Exception:
+        return
+
+def _match_point_rules(nodes: Any, point_rules: Dict[str, Any]) -> Any:
+    """
+    Compila as regras em máscaras booleanas por coluna: devolve, por nó, o índice do rule que casou (-1 = nenhum).
+    """
+    import numpy as np  # type: ignore
+
+    matched = np.full(len(nodes), -1, dtype=np.int64)
+    for i, rule in enumerate(point_rules["rules"]):
+        mask = (matched < 0)
+        for tag, values in rule["tags"].items():
+            if tag not in nodes.columns:
+                mask[:] = False
+                break
+            column = nodes[tag]
+            try:
+                mask &= column.isin(values).to_numpy(dtype=bool)
+            except TypeError:
+                # Valores não hasheáveis (ex.: listas) nunca casam, como na comparação escalar.
+                mask &= column.map(lambda v: isinstance(v, str) and v in values).to_numpy(dtype=bool)
+            if not mask.any():
+                break
+        matched[mask] = i
+    return matched
+
+def _nodes_to_features(nodes: Any, transformer: Any, point_rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Converte os nós do OSMnx em features Point (blocos) a partir das regras tag → bloco.
+    Só os nós que casam são normalizados e projetados (em lote); os demais custam apenas as máscaras.
+    """
+    import numpy as np  # type: ignore
+    import shapely  # type: ignore
+
+    if len(nodes) == 0 or not point_rules["rules"]:
+        return []
+
+    rule_idx = _match_point_rules(nodes, point_rules)
+    geoms = np.asarray(nodes.geometry, dtype=object)
+    rows = np.flatnonzero((rule_idx >= 0) & (shapely.get_type_id(geoms) == 0))
+    if rows.size == 0:
+        return []
+
+    names = _norm_optional_str_column(_column_or_none(nodes.iloc[rows], "name"))
+    rules = point_rules["rules"]
+    features: List[Dict[str, Any]] = []
+    for coords, name, i in zip(_project_geometries(geoms[rows], transformer), names, rule_idx[rows].tolist()):
+        if not coords:
+            continue
+        rule = rules[i]
+        features.append(
+            _point_record(
+                layer=rule.get("layer") or point_rules["layer"],
+                name=name,
+                block_name=rule["block_name"],
+                # block_filepath will be resolved by C# plugin using blocks_mapping.json
+                block_filepath=None,
+                insertion_point_xy=coords[0],
+                rotation=rule.get("rotation", 0.0),
+                scale=rule.get("scale", 1.0),
+            )
+        )
+    return features
+
+# Tamanho dos lotes (edges/partes) processados por vez no modo streaming.
+_FEATURE_CHUNK = 5000
+
+_osm_extract_lock = threading.Lock()
+_osm_extract_instance: Optional[Tuple[str, OsmExtract]] = None
+
+def _osm_extract() -> Optional[OsmExtract]:
+    """
+    Extrato OSM offline configurado em SISRUA_OSM_EXTRACT (ver `backend.osm_extract`):
+    um store já ingerido (.sqlite3) ou um .osm/.osm.pbf, ingerido uma única vez em `cache/extracts/`.
+    Sem configuração (ou com erro) → None, e o OSM vem do Overpass/tiles.
+    """
+    global _osm_extract_instance
+    configured = os.environ.get("SISRUA_OSM_EXTRACT") or ""
+    if not configured:
+        return None
+    with _osm_extract_lock:
+        if _osm_extract_instance is not None and _osm_extract_instance[0] == configured:
+            return _osm_extract_instance[1]
+        try:
+            path = Path(configured)
+            if path.suffix != ".sqlite3":
+                st = path.stat()
+                digest = _cache_key([str(path.resolve()), str(st.st_size), str(st.st_mtime_ns)])[:16]
+                target = _cache_dir() / "extracts" / f"{path.name.split('.')[0]}-{digest}.sqlite3"
+                if not target.exists():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    ingest_osm_extract(path, target)
+                path = target
+            extract = OsmExtract(path)
+        except Exception as e:
+            # Sem extrato o prepare cai no Overpass; o motivo vai para o log do backend (standalone.py).
+            logging.getLogger("sisrua").warning("Extrato OSM indisponível (%s): %s", configured, e)
+            return None
+        _osm_extract_instance = (configured, extract)
+        return extract
+
+def _osm_extract_for(latitude: float, longitude: float, radius: float) -> Optional[OsmExtract]:
+    extract = _osm_extract()
+    if extract is None or not extract.covers(bbox_from_point(latitude, longitude, radius)):
+        return None
+    return extract
+
+def _osm_cache_key(latitude: float, longitude: float, radius: float, point_rules: Optional[Dict[str, Any]] = None, simplify_m: float = 0.0, merge_edges: bool = False) -> str:
+    """
+    Chave do resultado derivado: consulta + origem dos dados (extrato offline ou Overpass)
+    + versão do pipeline + regras de blocos em vigor (+ tolerância de simplificação e fusão de vias, se houver).
+    Trocar as regras (ou a versão) invalida só o resultado; os tiles brutos continuam no cache.
+    """
+    rules = point_rules if point_rules is not None else _load_osm_point_rules()
+    rules_digest = _cache_key([json.dumps(rules, sort_keys=True)])
+    extract = _osm_extract_for(latitude, longitude, radius)
+    source = f"extract:{extract.path.name}" if extract is not None else "overpass"
+    parts = ["prepare_osm", f"v{PREPARE_PIPELINE_VERSION}", rules_digest, source]
+    return _cache_key(parts + _osm_query_parts(latitude, longitude, radius, simplify_m, merge_edges))
+
+def _osm_query_parts(latitude: float, longitude: float, radius: float, simplify_m: float = 0.0, merge_edges: bool = False) -> List[str]:
+    """
+    Parâmetros da consulta OSM normalizados (lat/lon em 6 casas, raio inteiro), comuns à chave do
+    resultado e à do single-flight: pedidos que dariam o mesmo resultado caem no mesmo job.
+    """
+    parts = [f"{latitude:.6f}", f"{longitude:.6f}", str(int(radius))]
+    if simplify_m > 0:
+        parts.append(f"simplify:{simplify_m!r}")
+    if merge_edges:
+        parts.append("merge")
+    return parts
+
+def _osm_tile_key(ox: Any, tile: Tuple[int, int, int]) -> str:
+    # As tags mantidas nos nós fazem parte da chave: tiles baixados sem uma tag nova não servem.
+    tags = ",".join(sorted(ox.settings.useful_tags_node))
+    return _cache_key(["osm_tile", *map(str, tile), "all", tags])
+
+def _encode_osm_frames(nodes: Any, edges: Any) -> bytes:
+    # Pickle de GeoDataFrames (o cache é local e só o próprio backend o grava).
+    return gzip.compress(pickle.dumps((nodes, edges), protocol=pickle.HIGHEST_PROTOCOL), compresslevel=1, mtime=0)
+
+def _decode_osm_frames(data: bytes) -> Tuple[Any, Any]:
+    return pickle.loads(gzip.decompress(data))
+
+def _empty_osm_frames() -> Tuple[Any, Any]:
+    import geopandas as gpd  # type: ignore
+
+    return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"), gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+
+def _wait_cancellable(fn: Callable[[], Any], progress: ProgressFn, fraction: float, message: str) -> Any:
+    """
+    Executa `fn` (bloqueante e sem pontos de verificação, como o download do Overpass) numa thread auxiliar,
+    repetindo `progress(fraction, message)` a cada _CANCEL_POLL_S: se o job for cancelado, JobCancelled sai na hora e
+    o resultado do download, quando chegar, é descartado. Sem job (progress no-op), chama direto.
+    """
+    if progress is _no_progress:
+        return fn()
+    box: Dict[str, Any] = {}
+    done = threading.Event()
+
+    def _target() -> None:
+        try:
+            box["value"] = fn()
+        except BaseException as e:
+            box["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=_target, name="sisrua-osm-download", daemon=True).start()
+    while not done.wait(_CANCEL_POLL_S):
+        progress(fraction, message)
+    if "error" in box:
+        raise box["error"]
+    return box["value"]
+
+def _osm_frames_from_tiles(ox: Any, latitude: float, longitude: float, radius: float, progress: ProgressFn = _no_progress) -> Tuple[Any, Any]:
+    """
+    (nodes, edges) do OSMnx para o bbox de `graph_from_point(dist=radius)`, montados a partir do cache por tile
+    (ver `backend.osm_tiles`): só os tiles que faltam são baixados, num único `graph_from_bbox`.
+    """
+    bbox = tuple(float(v) for v in ox.utils_geo.bbox_from_point((latitude, longitude), dist=radius))
+    tiles = tiles_for_bbox(bbox, OSM_TILE_ZOOM)
+    frames: Dict[Tuple[int, int, int], Tuple[Any, Any]] = {}
+    missing = []
+    for tile in tiles:
+        data = _read_cache_raw(_osm_tile_key(ox, tile))
+        try:
+            frames[tile] = _decode_osm_frames(data) if data is not None else None
+        except Exception:
+            frames[tile] = None
+        if frames[tile] is None:
+            missing.append(tile)
+
+    if missing:
+        insufficient = getattr(getattr(ox, "_errors", None), "InsufficientResponseError", ())
+        message = f"Baixando dados do OSM ({len(missing)} de {len(tiles)} tiles)..."
+        progress(0.1, message)
+        try:
+            # retain_all: o conteúdo de um tile não pode depender de qual componente era o maior no download;
+            # truncate_by_edge: edges que cruzam a borda do download ficam (com o nó de fora), senão se perderiam
+            # entre dois downloads vizinhos.
+            graph = _wait_cancellable(
+                lambda: ox.graph_from_bbox(union_bounds(missing), network_type="all", retain_all=True, truncate_by_edge=True),
+                progress, 0.1, message,
+            )
+            progress(0.3, "Convertendo grafo em GeoDataFrames...")
+            nodes, edges = ox.graph_to_gdfs(graph)
+        except insufficient:
+            nodes, edges = _empty_osm_frames()  # área sem vias: tiles vazios também vão para o cache
+        for tile, tile_frames in split_by_tile(nodes, edges, missing).items():
+            frames[tile] = tile_frames
+            _cache_store_put(_osm_tile_key(ox, tile), _encode_osm_frames(*tile_frames))
+
+    progress(0.35, "Recortando a área pedida...")
+    return merge_and_truncate(frames.values(), bbox)
+
+def _start_osm_prepare(latitude: float, longitude: float, radius: float, cache_checked: bool = False, progress: ProgressFn = _no_progress, simplify_m: float = 0.0, merge_edges: bool = False) -> Tuple[Dict[str, Any], Iterator[List[Dict[str, Any]]]]:
+    """
+    Etapa bloqueante do prepare OSM (cache + download + GeoDataFrames).
+    Retorna (meta, chunks):
+    - cache hit: meta é o payload em cache (com "features") e chunks é vazio
+    - senão: meta = {"crs_out", "cache_key"} e chunks gera lotes de features (registros CadFeature)
+    Levanta HTTPException(503) se o download falhar sem cache local.
+    `cache_checked=True`: quem chama já consultou o cache (miss), não repetimos a leitura.
+    `progress` recebe as etapas (download, GeoDataFrames, vias N/M, pontos) conforme os lotes são consumidos.
+    `simplify_m` > 0 simplifica as vias já projetadas; meta acumula vertices_before/vertices_after durante os lotes.
+    `merge_edges=True` remove as mãos duplas e funde os trechos contíguos de mesma via antes dos lotes.
+    """
     # Import local: OSMnx/GeoPandas podem ser pesados; só precisamos disso ao executar OSM.
     import osmnx as ox  # type: ignore
-    from pyproj import Transformer  # type: ignore
 
-    key = _cache_key(["prepare_osm", f"{latitude:.6f}", f"{longitude:.6f}", str(int(radius))])
-    cached = _read_cache(key)
+    point_rules = _load_osm_point_rules()
+    key = _osm_cache_key(latitude, longitude, radius, point_rules, simplify_m, merge_edges)
+    cached = None if cache_checked else _read_cache(key)
     if cached is not None:
         # Retorna o cache com cache_hit marcado
         cached["cache_hit"] = True
-        return cached
+        return cached, iter(())
 
     epsg_out = _sirgas2000_utm_epsg(latitude, longitude)
-    transformer = Transformer.from_crs("EPSG:4326", f"EPSG:{epsg_out}", always_xy=True)
+    transformer = _get_transformer(epsg_out)
+    _ensure_osm_node_tags(ox, point_rules)
+    extract = _osm_extract_for(latitude, longitude, radius)
 
     try:
-        graph = ox.graph_from_point((latitude, longitude), dist=radius, network_type="all")
-        nodes, edges = ox.graph_to_gdfs(graph) # Get nodes as well
+        if extract is not None:
+            progress(0.1, "Consultando extrato OSM local...")
+            nodes, edges = extract.query(latitude, longitude, radius)  # offline: índice espacial local, sem rede
+        else:
+            nodes, edges = _osm_frames_from_tiles(ox, latitude, longitude, radius, progress)
         edges = edges[edges.geometry.notna()]
     except Exception as e:
         # Tenta usar cache como fallback em caso de erro
@@ -354,107 +1738,134 @@ def _prepare_osm_compute(latitude: float, longitude: float, radius: float) -> di
         if cached is not None:
             cached["cache_hit"] = True
             cached["cache_fallback_reason"] = str(e)
-            return cached
+            return cached, iter(())
         raise HTTPException(status_code=503, detail=f"Falha ao obter dados do OSM (sem cache local disponível). Detalhes: {e}")
 
-    features: List[CadFeature] = [] # Changed type to CadFeature
-
-    # Process Edges (Polylines) - existing logic
-    for _, row in edges.iterrows():
-        geom = row.geometry
-        highway = row.get("highway")
-        if isinstance(highway, list) and highway:
-            highway = highway[0]
-        name = row.get("name") if row.get("name") is not None else None
-        highway = _norm_optional_str(highway)
-        name = _norm_optional_str(name)
-        width_m = _estimate_width_m(row, highway)
-
-        lines = _to_linestrings(geom)
-        for coords_xy in _project_lines_to_xy(lines, transformer):
-            features.append(
-                CadFeature(
-                    feature_type="Polyline",
-                    layer="SISRUA_OSM_VIAS",
-                    name=name,
-                    highway=highway,
-                    width_m=width_m,
-                    coords_xy=coords_xy,
-                )
-            )
-
-    # Process Nodes (Points / Blocks) - new logic for FASE 1.5
-    point_features_query = {
-        "highway": ["street_light", "traffic_signals"],
-        "power": ["pole", "tower"],
-        "amenity": ["bench", "parking", "bus_stop"]
+    meta: Dict[str, Any] = {
+        "crs_out": f"EPSG:{epsg_out}", "cache_key": key,
+        "simplify_tolerance_m": simplify_m or None, "vertices_before": 0, "vertices_after": 0,
     }
-    
-    # Filter nodes based on tags that usually represent point features
-    # Convert node geometries (points) to projected coordinates
-    for _, node_row in nodes.iterrows():
-        point_geom = node_row.geometry
-        
-        # Ensure it's a point and valid
-        if point_geom is None or point_geom.geom_type != "Point":
-            continue
-
-        tags = node_row.to_dict() # Get all tags from the node
-        
-        block_name = None
-        # Basic mapping logic from OSM tags to block types
-        if tags.get("highway") == "street_light":
-            block_name = "POSTE"
-        elif tags.get("power") == "pole":
-            block_name = "POSTE"
-        elif tags.get("amenity") == "bench":
-            block_name = "BANCO" # Example, would need BANCO_GENERICO.dxf
-        # Add more mappings as needed for FASE 1.5
-
-        if block_name:
-            # Project the point coordinates
-            x_proj, y_proj = transformer.transform(point_geom.x, point_geom.y)
-            if math.isfinite(x_proj) and math.isfinite(y_proj):
-                features.append(
-                    CadFeature(
-                        feature_type="Point",
-                        layer="SISRUA_OSM_PONTOS", # Specific layer for OSM points/blocks
-                        name=_norm_optional_str(tags.get("name")),
-                        block_name=block_name,
-                        # block_filepath will be resolved by C# plugin using blocks_mapping.json
-                        insertion_point_xy=[x_proj, y_proj],
-                        rotation=0.0, # Default rotation
-                        scale=1.0 # Default scale
-                    )
-                )
 
-    epsg_out = _sirgas2000_utm_epsg(latitude, longitude)
-    payload = PrepareResponse(crs_out=f"EPSG:{epsg_out}", features=features)
-    
-    # Cache por conteúdo
+    def _chunks() -> Iterator[List[Dict[str, Any]]]:
+        # Edges (Polylines) em lotes colunares (ver `_edges_to_features`); vias: 0.4 → 0.85 do progresso
+        ways = edges
+        if merge_edges:
+            progress(0.4, f"Fundindo vias contíguas ({len(edges)} trechos)...")
+            ways = _merge_contiguous_edges(_drop_reverse_edges(edges), progress)
+        total = len(ways)
+        for start in range(0, total, _FEATURE_CHUNK):
+            progress(0.4 + 0.45 * start / total, f"Processando vias {start}/{total}...")
+            yield _edges_to_features(ways.iloc[start:start + _FEATURE_CHUNK], transformer, simplify_m, meta)
+        # Nodes (Points / Blocks) - regras declarativas (ver `_nodes_to_features`); pontos: 0.85 → 0.9
+        for start in range(0, len(nodes), _FEATURE_CHUNK):
+            progress(0.85 + 0.05 * start / len(nodes), f"Processando pontos {start}/{len(nodes)}...")
+            yield _nodes_to_features(nodes.iloc[start:start + _FEATURE_CHUNK], transformer, point_rules)
+
+    return meta, _chunks()
+
+def _finish_prepare(meta: Dict[str, Any], features: List[Dict[str, Any]]) -> dict:
+    """
+    Monta o payload final (formato PrepareResponse) e grava no cache por conteúdo.
+    """
+    payload: Dict[str, Any] = {"crs_out": meta["crs_out"], "features": features, "cache_hit": None}
+    payload.update((k, meta[k]) for k in SIMPLIFY_FIELDS if k in meta)
+    if meta.get("cache_key") is None:
+        return payload
     try:
-        key = _cache_key(["prepare_osm", f"{latitude:.6f}", f"{longitude:.6f}", str(int(radius))])
-        _write_cache(key, payload.model_dump())
-        payload.cache_hit = False
+        _write_cache(meta["cache_key"], {**payload, "cache_hit": True})
+        payload["cache_hit"] = False
     except Exception:
         pass
-    
-    return payload.model_dump()
+    return payload
+
+def _prepare_osm_compute(latitude: float, longitude: float, radius: float, cache_checked: bool = False, progress: ProgressFn = _no_progress, simplify_m: float = 0.0, merge_edges: bool = False) -> dict:
+    meta, chunks = _start_osm_prepare(latitude, longitude, radius, cache_checked, progress, simplify_m, merge_edges)
+    if "features" in meta:
+        return meta
+    return _finish_prepare(meta, [f for chunk in chunks for f in chunk])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _ndjson_records(meta: Dict[str, Any], chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """
+    Gera o corpo NDJSON: uma feature (registro CadFeature) por linha, enviadas lote a lote à medida que ficam prontas,
+    e um registro final {"type": "trailer", ...} com crs_out/cache_hit/count (e os campos de simplificação).
+    Erros depois do 1º byte não viram status HTTP; saem como {"type": "error", "detail": ...}.
+    Para o cache guardamos só as linhas já codificadas (não os dicts), e o JSON do cache é montado a partir delas.
+    """
+    _encode = _json_bytes
+
+    def _block(lines: List[bytes]) -> bytes:
+        return b"\n".join(lines) + b"\n"
+
+    if "features" in meta:
+        features = meta["features"]
+        for start in range(0, len(features), _FEATURE_CHUNK):
+            yield _block([_encode(f) for f in features[start:start + _FEATURE_CHUNK]])
+        trailer = {k: v for k, v in meta.items() if k != "features"}
+        yield _block([_encode({"type": "trailer", **trailer, "count": len(features)})])
+        return
+
+    encoded: List[bytes] = []
+    try:
+        for chunk in chunks:
+            lines = [_encode(f) for f in chunk]
+            encoded.extend(lines)
+            if lines:
+                yield _block(lines)
+    except Exception as e:
+        yield _block([_encode({"type": "error", "detail": str(e)})])
+        return
+
+    summary = {"crs_out": meta["crs_out"], **{k: meta[k] for k in SIMPLIFY_FIELDS if k in meta}}
+    cache_hit = None
+    if meta.get("cache_key") is not None:
+        head = _json_bytes(summary)[:-1]
+        _write_cache_bytes(meta["cache_key"], head + b', "features": [' + b", ".join(encoded) + b'], "cache_hit": true}')
+        cache_hit = False
+    yield _block([_encode({"type": "trailer", **summary, "cache_hit": cache_hit, "count": len(encoded)})])
 
 
 @app.post("/api/v1/prepare/osm")
-async def prepare_osm(req: PrepareOsmRequest, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+def prepare_osm(req: PrepareOsmRequest, response_format: ResponseFormat = Query("features", alias="format"), accept: str | None = Header(default=None), accept_encoding: str | None = Header(default=None), x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
     """
     MVP (Fase 1): pega OSM em lat/lon (EPSG:4326), projeta para SIRGAS2000/UTM (zona automática)
     e devolve linhas prontas para o C# desenhar como Polyline.
+    `?format=columnar|binary` (ou Accept: application/x-sisrua-bin) devolve o mesmo conteúdo em arrays planos (ver `backend.formats`).
+    Cache hit no formato padrão: servido direto dos bytes comprimidos do cache (gzip, se o cliente aceitar).
+    Declarado como `def`: download, projeção e serialização rodam no threadpool, fora do event loop.
     """
     _require_token(x_sisrua_token)
-    return _prepare_osm_compute(req.latitude, req.longitude, req.radius)
+    simplify_m = _simplify_tolerance(req.simplify_tolerance_m)
+    hit = _cached_prepare_response(_osm_cache_key(req.latitude, req.longitude, req.radius, simplify_m=simplify_m, merge_edges=req.merge_edges), response_format, accept, accept_encoding)
+    if hit is not None:
+        return hit
+    result = _prepare_osm_compute(req.latitude, req.longitude, req.radius, cache_checked=True, simplify_m=simplify_m, merge_edges=req.merge_edges)
+    return _format_prepare_result(result, response_format, accept)
 
-def _prepare_geojson_compute(geo: Any) -> dict:
-    from pyproj import Transformer  # type: ignore
-    from shapely.geometry import LineString  # type: ignore
 
+@app.post("/api/v1/prepare/osm/stream")
+def prepare_osm_stream(req: PrepareOsmRequest, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Variante streaming do prepare OSM: NDJSON com uma feature por linha, enviada à medida que os lotes
+    de edges/nodes são processados, e um registro final {"type": "trailer", "crs_out", "cache_hit", "count"}.
+    Declarado como `def`: o download/processamento roda no threadpool, fora do event loop.
+    """
+    _require_token(x_sisrua_token)
+    meta, chunks = _start_osm_prepare(req.latitude, req.longitude, req.radius, simplify_m=_simplify_tolerance(req.simplify_tolerance_m), merge_edges=req.merge_edges)
+    return StreamingResponse(_ndjson_records(meta, chunks), media_type=NDJSON_MEDIA_TYPE)
+
+def _geojson_cache_key(body_digest: str) -> str:
+    return _cache_key(["prepare_geojson", f"v{PREPARE_PIPELINE_VERSION}", body_digest])
+
+def _start_geojson_prepare(geo: Any, cache_key: Optional[str] = None, progress: ProgressFn = _no_progress, simplify_m: float = 0.0) -> Tuple[Dict[str, Any], Iterator[List[Dict[str, Any]]]]:
+    """
+    Lê o GeoJSON e coleta as partes (linhas/pontos); a projeção acontece nos lotes de `chunks`.
+    Retorna (meta, chunks) como `_start_osm_prepare`. GeoJSON inválido → HTTPException(400).
+    `cache_key` (ver `_geojson_cache_key`): onde gravar o resultado; None = não grava.
+    `simplify_m`: como em `_start_osm_prepare` (a tolerância faz parte do corpo, logo da chave).
+    """
+    progress(0.1, "Lendo GeoJSON...")
     if isinstance(geo, str):
         geo = json.loads(geo)
 
@@ -488,124 +1899,151 @@ def _prepare_geojson_compute(geo: Any) -> dict:
         raise HTTPException(status_code=400, detail="GeoJSON inválido: não foi possível extrair coordenadas.")
 
     epsg_out = _sirgas2000_utm_epsg(lat0, lon0)
-    transformer = Transformer.from_crs("EPSG:4326", f"EPSG:{epsg_out}", always_xy=True)
-
-    features: List[CadFeature] = [] # Changed type to CadFeature
-
-    def _emit_feature(layer: Optional[str], name: Optional[str], highway: Optional[str], coords_lonlat):
-        if not coords_lonlat or len(coords_lonlat) < 2:
-            return
-        line = LineString([(float(x), float(y)) for (x, y) in coords_lonlat])
-        coords_xy_list = _project_lines_to_xy([line], transformer)
-        for coords_xy in coords_xy_list:
-            features.append(
-                CadFeature(
-                    feature_type="Polyline", # Explicitly set feature_type
-                    layer=layer or "SISRUA_GEOJSON",
-                    name=name,
-                    highway=highway,
-                    coords_xy=coords_xy,
-                )
-            )
-
-    t = geo.get("type")
-    if t == "FeatureCollection":
-        for f in geo.get("features") or []:
-            props = f.get("properties") or {}
-            geom = f.get("geometry") or {}
-            gtype = geom.get("type")
-            coords = geom.get("coordinates")
-            layer = props.get("layer") or props.get("Layer")
-            name = props.get("name")
-            highway = props.get("highway")
-
-            if gtype == "LineString":
-                _emit_feature(layer, name, highway, coords)
-            elif gtype == "MultiLineString":
-                for part in coords or []:
-                    _emit_feature(layer, name, highway, part)
-            elif gtype == "Point": # Handle Point features from GeoJSON
-                point_lonlat = coords
-                if point_lonlat and len(point_lonlat) >= 2:
-                    lon, lat = point_lonlat[0], point_lonlat[1]
-                    # Project point
-                    x_proj, y_proj = transformer.transform(lon, lat)
-                    if math.isfinite(x_proj) and math.isfinite(y_proj):
-                        block_name = props.get("block_name") or props.get("BlockName")
-                        block_filepath = props.get("block_filepath") or props.get("BlockFilePath")
-                        features.append(
-                            CadFeature(
-                                feature_type="Point",
-                                layer=layer or "SISRUA_GEOJSON_POINT",
-                                name=name,
-                                block_name=_norm_optional_str(block_name),
-                                block_filepath=_norm_optional_str(block_filepath),
-                                insertion_point_xy=[x_proj, y_proj],
-                                rotation=props.get("rotation"),
-                                scale=props.get("scale"),
-                            )
-                        )
-
-    elif t == "Feature":
-        props = geo.get("properties") or {}
-        geom = geo.get("geometry") or {}
+    transformer = _get_transformer(epsg_out)
+
+    # Primeiro coletamos todas as partes (linhas e pontos) na ordem do documento; depois
+    # projetamos os vértices em lotes de `_FEATURE_CHUNK` partes, uma chamada por lote (`_project_vertices`).
+    vertices: List[Tuple[float, float]] = []
+    offsets: List[int] = [0]
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+
+    def _add_part(kind: str, coords_lonlat, attrs: Dict[str, Any]) -> None:
+        vertices.extend((float(c[0]), float(c[1])) for c in coords_lonlat)
+        offsets.append(len(vertices))
+        pending.append((kind, attrs))
+
+    def _collect_feature(f: Dict[str, Any]) -> None:
+        props = f.get("properties") or {}
+        geom = f.get("geometry") or {}
         gtype = geom.get("type")
         coords = geom.get("coordinates")
         layer = props.get("layer") or props.get("Layer")
         name = props.get("name")
         highway = props.get("highway")
 
-        if gtype == "LineString":
-            _emit_feature(layer, name, highway, coords)
-        elif gtype == "MultiLineString":
-            for part in coords or []:
-                _emit_feature(layer, name, highway, part)
+        if gtype in ("LineString", "MultiLineString"):
+            parts = [coords] if gtype == "LineString" else (coords or [])
+            for part in parts:
+                if not part or len(part) < 2:
+                    continue
+                _add_part("line", part, {"layer": layer, "name": name, "highway": highway})
         elif gtype == "Point": # Handle Point features from GeoJSON
             point_lonlat = coords
             if point_lonlat and len(point_lonlat) >= 2:
-                lon, lat = point_lonlat[0], point_lonlat[1]
-                # Project point
-                x_proj, y_proj = transformer.transform(lon, lat)
-                if math.isfinite(x_proj) and math.isfinite(y_proj):
-                    block_name = props.get("block_name") or props.get("BlockName")
-                    block_filepath = props.get("block_filepath") or props.get("BlockFilePath")
-                    features.append(
-                        CadFeature(
-                            feature_type="Point",
-                            layer=layer or "SISRUA_GEOJSON_POINT",
-                            name=name,
-                            block_name=_norm_optional_str(block_name),
-                            block_filepath=_norm_optional_str(block_filepath),
-                            insertion_point_xy=[x_proj, y_proj],
-                            rotation=props.get("rotation"),
-                            scale=props.get("scale"),
-                        )
-                    )
+                _add_part("point", [point_lonlat], {"layer": layer, "name": name, "props": props})
+
+    t = geo.get("type")
+    if t == "FeatureCollection":
+        for f in geo.get("features") or []:
+            _collect_feature(f)
+    elif t == "Feature":
+        _collect_feature(geo)
     else:
         raise HTTPException(status_code=400, detail="GeoJSON não suportado. Use Feature/FeatureCollection com LineString/MultiLineString/Point.")
 
-    payload = PrepareResponse(crs_out=f"EPSG:{epsg_out}", features=features)
+    meta: Dict[str, Any] = {
+        "crs_out": f"EPSG:{epsg_out}", "cache_key": cache_key,
+        "simplify_tolerance_m": simplify_m or None, "vertices_before": 0, "vertices_after": 0,
+    }
 
-    # Cache por conteúdo (ajuda em reimportações repetidas)
-    try:
-        raw = json.dumps(geo, sort_keys=True, ensure_ascii=False)
-        key = _cache_key(["prepare_geojson", raw])
-        _write_cache(key, payload.model_dump())
-        payload.cache_hit = False # Add cache_hit attribute
-    except Exception:
-        pass
+    def _chunks() -> Iterator[List[Dict[str, Any]]]:
+        import numpy as np  # type: ignore
+
+        lonlat = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        # Projeção em lotes: 0.3 → 0.9 do progresso
+        for start in range(0, len(pending), _FEATURE_CHUNK):
+            progress(0.3 + 0.6 * start / len(pending), f"Projetando feições {start}/{len(pending)}...")
+            stop = min(start + _FEATURE_CHUNK, len(pending))
+            part_offsets = np.asarray(offsets[start:stop + 1]) - offsets[start]
+            projected = _project_vertices(lonlat[offsets[start]:offsets[stop]], part_offsets, transformer, simplify_m, meta)
+            yield _geojson_features(projected, pending[start:stop])
+
+    return meta, _chunks()
+
+def _geojson_features(projected: List[List[List[float]]], pending: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    features: List[Dict[str, Any]] = []
+    for coords_xy, (kind, attrs) in zip(projected, pending):
+        if kind == "line":
+            if len(coords_xy) < 2:
+                continue
+            features.append(
+                _polyline_record(
+                    layer=_norm_optional_str(attrs["layer"]) or "SISRUA_GEOJSON",
+                    name=_norm_optional_str(attrs["name"]),
+                    highway=_norm_optional_str(attrs["highway"]),
+                    width_m=None,
+                    coords_xy=coords_xy,
+                )
+            )
+        else:
+            if not coords_xy:
+                continue
+            props = attrs["props"]
+            block_name = props.get("block_name") or props.get("BlockName")
+            block_filepath = props.get("block_filepath") or props.get("BlockFilePath")
+            features.append(
+                _point_record(
+                    layer=_norm_optional_str(attrs["layer"]) or "SISRUA_GEOJSON_POINT",
+                    name=_norm_optional_str(attrs["name"]),
+                    block_name=_norm_optional_str(block_name),
+                    block_filepath=_norm_optional_str(block_filepath),
+                    insertion_point_xy=coords_xy[0],
+                    rotation=_optional_finite_float(props.get("rotation"), "rotation"),
+                    scale=_optional_finite_float(props.get("scale"), "scale"),
+                )
+            )
+    return features
 
-    return payload.model_dump()
+def _prepare_geojson_compute(geo: Any, cache_key: Optional[str] = None, progress: ProgressFn = _no_progress, simplify_m: float = 0.0) -> dict:
+    meta, chunks = _start_geojson_prepare(geo, cache_key, progress, simplify_m)
+    return _finish_prepare(meta, [f for chunk in chunks for f in chunk])
 
 
-@app.post("/api/v1/prepare/geojson")
-async def prepare_geojson(req: PrepareGeoJsonRequest, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+def _prepare_geojson_response(body: bytes, key: str, response_format: str, accept: str | None, accept_encoding: str | None) -> Any:
+    """
+    Corpo síncrono de /api/v1/prepare/geojson (roda no threadpool): cache hit, parse, projeção e serialização.
+    """
+    hit = _cached_prepare_response(key, response_format, accept, accept_encoding)
+    if hit is not None:
+        return hit
+    req = _parse_body(PrepareGeoJsonRequest, body)
+    result = _prepare_geojson_compute(req.geojson, key, simplify_m=_simplify_tolerance(req.simplify_tolerance_m))
+    return _format_prepare_result(result, response_format, accept)
+
+
+@app.post("/api/v1/prepare/geojson", openapi_extra=_body_schema(PrepareGeoJsonRequest))
+async def prepare_geojson(request: Request, response_format: ResponseFormat = Query("features", alias="format"), accept: str | None = Header(default=None), accept_encoding: str | None = Header(default=None), x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
     """
     MVP (Fase 1): recebe GeoJSON (EPSG:4326), projeta para SIRGAS2000/UTM (zona automática)
     e devolve linhas prontas para o C# desenhar como Polyline.
+    `?format=columnar|binary` (ou Accept: application/x-sisrua-bin) devolve o mesmo conteúdo em arrays planos (ver `backend.formats`).
+    Corpo: PrepareGeoJsonRequest. O cache é por hash do corpo bruto: uma reimportação idêntica nem faz o parse do JSON.
+    """
+    _require_token(x_sisrua_token)
+    body, digest = await _read_body_digest(request)
+    # Só a leitura do corpo fica no event loop; parse, projeção e serialização vão para o threadpool.
+    return await run_in_threadpool(_prepare_geojson_response, body, _geojson_cache_key(digest), response_format, accept, accept_encoding)
+
+
+def _start_geojson_stream(body: bytes, key: str) -> Tuple[Dict[str, Any], Iterator[List[Dict[str, Any]]]]:
+    cached = _read_cache(key)
+    if cached is not None:
+        cached["cache_hit"] = True
+        return cached, iter(())
+    req = _parse_body(PrepareGeoJsonRequest, body)
+    return _start_geojson_prepare(req.geojson, key, simplify_m=_simplify_tolerance(req.simplify_tolerance_m))
+
+
+@app.post("/api/v1/prepare/geojson/stream", openapi_extra=_body_schema(PrepareGeoJsonRequest))
+async def prepare_geojson_stream(request: Request, x_sisrua_token: str | None = Header(default=None, alias=AUTH_HEADER_NAME)):
+    """
+    Variante streaming (NDJSON) do prepare GeoJSON; mesmo protocolo de `/api/v1/prepare/osm/stream`.
+    Cache, parse e leitura do GeoJSON rodam no threadpool; os lotes são gerados pelo StreamingResponse (também fora do event loop).
     """
     _require_token(x_sisrua_token)
-    return _prepare_geojson_compute(req.geojson)
+    body, digest = await _read_body_digest(request)
+    meta, chunks = await run_in_threadpool(_start_geojson_stream, body, _geojson_cache_key(digest))
+    return StreamingResponse(_ndjson_records(meta, chunks), media_type=NDJSON_MEDIA_TYPE)
 
 def _maybe_mount_frontend():
     """
@@ -615,13 +2053,7 @@ def _maybe_mount_frontend():
     from fastapi.responses import HTMLResponse
     from fastapi.staticfiles import StaticFiles
 
-    # Quando empacotado (ex.: PyInstaller), __file__ pode apontar para uma pasta temporária (MEIPASS).
-    # Preferimos resolver o caminho do bundle via executável.
-    if getattr(sys, "frozen", False):
-        contents_dir = Path(sys.executable).resolve().parent.parent
-    else:
-        contents_dir = Path(__file__).resolve().parent.parent
-    dist_dir = contents_dir / "frontend" / "dist"
+    dist_dir = _contents_dir() / "frontend" / "dist"
 
     if dist_dir.exists() and (dist_dir / "index.html").exists():
         # Importante: montar após as rotas de API, para não interceptar /api/v1/*
@@ -0,0 +1,150 @@
+"""
+Cache local dos resultados de prepare: um único arquivo SQLite (modo WAL) em vez de um `{sha256}.json` por chave.
+
+- orçamento de bytes (`max_bytes`) com despejo LRU pelo último acesso
+- TTL por entrada (`ttl_s`; None/0 = sem expiração)
+- gravações atômicas (uma transação por entrada) e serializadas por lock: jobs em threads
+  diferentes não corrompem entradas
+- vários processos podem abrir o mesmo arquivo (workers do modo processo): o uso em bytes é
+  recalculado do SQLite dentro da transação de cada gravação, então o orçamento vale para todos
+- contadores de hit/miss/bytes para o /api/v1/stats
+
+O valor é opaco (bytes); quem chama decide a codificação.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL_S = 30 * 24 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class CacheStore:
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, ttl_s: Optional[float] = DEFAULT_TTL_S) -> None:
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._refresh_usage()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0, "bytes_read": 0, "bytes_written": 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires = row
+            if expires is not None and expires <= now:
+                self._delete(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._stats["hits"] += 1
+            self._stats["bytes_read"] += len(value)
+            return bytes(value)
+
+    def put(self, key: str, value: bytes, ttl_s: Optional[float] = None) -> bool:
+        """
+        Grava (ou substitui) a entrada. Retorna False se ela sozinha não cabe no orçamento.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        ttl = ttl_s if ttl_s is not None else self.ttl_s
+        expires = now + ttl if ttl else None
+        with self._lock:
+            # BEGIN IMMEDIATE trava a escrita no arquivo também para os outros processos: o uso lido
+            # aqui e o despejo valem para o cache inteiro, não só para o que este processo gravou.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed, expires) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, sqlite3.Binary(value), size, now, now, expires),
+                )
+                self._refresh_usage()
+                self._evict_locked(keep=key)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._refresh_usage()
+                raise
+            self._stats["writes"] += 1
+            self._stats["bytes_written"] += size
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_usage()  # inclui o que outros processos gravaram
+            return {**self._stats, "entries": self._entries, "bytes": self._bytes, "max_bytes": self.max_bytes, "ttl_s": self.ttl_s}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _refresh_usage(self) -> None:
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries").fetchone()
+        self._bytes, self._entries = int(row[0]), int(row[1])
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._bytes -= int(row[0])
+            self._entries -= 1
+
+    def _evict_locked(self, keep: str) -> None:
+        """
+        Remove expirados e, se ainda acima do orçamento, os menos acessados recentemente (nunca `keep`).
+        Roda dentro da transação de `put`.
+        """
+        if self._bytes <= self.max_bytes:
+            return
+        now = time.time()
+        expired = self._conn.execute(
+            "SELECT key, size FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        ).fetchall()
+        victims = [(k, int(size)) for k, size in expired]
+        excess = self._bytes - self.max_bytes - sum(size for _, size in victims)
+        if excess > 0:
+            for k, size in self._conn.execute(
+                "SELECT key, size FROM entries WHERE key != ? AND (expires IS NULL OR expires > ?) ORDER BY accessed",
+                (keep, now),
+            ).fetchall():
+                victims.append((k, int(size)))
+                excess -= int(size)
+                if excess <= 0:
+                    break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+        for i, (_, size) in enumerate(victims):
+            self._bytes -= size
+            self._entries -= 1
+            self._stats["expired" if i < len(expired) else "evictions"] += 1
@@ -0,0 +1,306 @@
+"""
+Formatos alternativos de resposta para os endpoints de prepare.
+
+O formato padrão ("features") é a lista de `CadFeature` de `PrepareResponse`. Aqui ficam as
+representações opcionais do mesmo conteúdo lógico, pensadas para resultados grandes:
+
+- "columnar": JSON com arrays planos (coordenadas + offsets) e tabelas de strings
+  dicionarizadas (layer/highway/name/...) referenciadas por índice inteiro (-1 = null).
+- "binary" (`application/x-sisrua-bin`): o mesmo layout colunar, mas com os arrays numéricos
+  como buffers little-endian crus, legíveis sem parse (ex.: np.frombuffer / MemoryMarshal.Cast).
+
+Layout binário (little-endian):
+    0   4s   magic b"SRB1"
+    4   u16  versão (1)
+    6   u16  reservado (0)
+    8   u32  tamanho do cabeçalho JSON (bytes)
+    12  ...  cabeçalho JSON UTF-8: crs_out, cache_hit, strings, counts, "buffers"
+             [{"name", "dtype", "offset", "count"}] (offset relativo ao início da área de dados)
+             e os campos de simplificação (simplify_tolerance_m, vertices_before, vertices_after)
+    ... padding até múltiplo de 8; depois a área de dados, com cada buffer alinhado em 8 bytes.
+Nos buffers float64, null é NaN; nos índices int32, null é -1.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+# Campos de string dicionarizados em cada grupo de colunas.
+POLYLINE_STRING_FIELDS = ("layer", "highway", "name")
+POINT_STRING_FIELDS = ("layer", "name", "block_name", "block_filepath")
+
+
+class ColumnarPolylines(BaseModel):
+    count: int
+    # Vértices da polyline i: coords[2*offsets[i] : 2*offsets[i+1]] (x0, y0, x1, y1, ...)
+    offsets: List[int]
+    coords: List[float]
+    layer: List[int]
+    highway: List[int]
+    name: List[int]
+    width_m: List[Optional[float]]
+
+
+class ColumnarPoints(BaseModel):
+    count: int
+    xy: List[float]
+    layer: List[int]
+    name: List[int]
+    block_name: List[int]
+    block_filepath: List[int]
+    rotation: List[Optional[float]]
+    scale: List[Optional[float]]
+
+
+# Metadados da simplificação (ver PrepareResponse), repassados sem alteração em todos os formatos.
+SIMPLIFY_FIELDS = ("simplify_tolerance_m", "vertices_before", "vertices_after")
+
+
+class ColumnarPrepareResponse(BaseModel):
+    format: Literal["columnar"] = "columnar"
+    crs_out: Optional[str] = None
+    cache_hit: Optional[bool] = None
+    simplify_tolerance_m: Optional[float] = None
+    vertices_before: Optional[int] = None
+    vertices_after: Optional[int] = None
+    # Tabela de strings por campo (ex.: strings["layer"][polylines.layer[i]])
+    strings: Dict[str, List[str]]
+    polylines: ColumnarPolylines
+    points: ColumnarPoints
+
+
+class _StringTable:
+    """
+    Dicionário string → índice, na ordem da 1ª ocorrência. None vira -1.
+    """
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self._index[value] = idx
+            self.values.append(value)
+        return idx
+
+
+def to_columnar(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte um `PrepareResponse` (dict) para o formato colunar.
+    Polylines e pontos ficam em grupos separados; a ordem relativa dentro de cada grupo é preservada.
+    """
+    tables = {f: _StringTable() for f in (*POLYLINE_STRING_FIELDS, *POINT_STRING_FIELDS)}
+    layer_t, highway_t, name_t = tables["layer"], tables["highway"], tables["name"]
+    block_t, filepath_t = tables["block_name"], tables["block_filepath"]
+
+    offsets: List[int] = [0]
+    coords: List[float] = []
+    pl_layer: List[int] = []
+    pl_highway: List[int] = []
+    pl_name: List[int] = []
+    pl_width: List[Optional[float]] = []
+
+    pt_xy: List[float] = []
+    pt_layer: List[int] = []
+    pt_name: List[int] = []
+    pt_block: List[int] = []
+    pt_filepath: List[int] = []
+    pt_rotation: List[Optional[float]] = []
+    pt_scale: List[Optional[float]] = []
+
+    for f in payload.get("features") or []:
+        if f.get("feature_type") == "Point":
+            xy = f.get("insertion_point_xy")
+            if not xy or len(xy) < 2:
+                continue
+            pt_xy.append(xy[0])
+            pt_xy.append(xy[1])
+            pt_layer.append(layer_t.add(f.get("layer")))
+            pt_name.append(name_t.add(f.get("name")))
+            pt_block.append(block_t.add(f.get("block_name")))
+            pt_filepath.append(filepath_t.add(f.get("block_filepath")))
+            pt_rotation.append(f.get("rotation"))
+            pt_scale.append(f.get("scale"))
+        else:
+            line = f.get("coords_xy")
+            if not line:
+                continue
+            for x, y in line:
+                coords.append(x)
+                coords.append(y)
+            offsets.append(offsets[-1] + len(line))
+            pl_layer.append(layer_t.add(f.get("layer")))
+            pl_highway.append(highway_t.add(f.get("highway")))
+            pl_name.append(name_t.add(f.get("name")))
+            pl_width.append(f.get("width_m"))
+
+    return {
+        "format": "columnar",
+        "crs_out": payload.get("crs_out"),
+        "cache_hit": payload.get("cache_hit"),
+        **{k: payload.get(k) for k in SIMPLIFY_FIELDS},
+        "strings": {field: table.values for field, table in tables.items()},
+        "polylines": {
+            "count": len(pl_layer),
+            "offsets": offsets,
+            "coords": coords,
+            "layer": pl_layer,
+            "highway": pl_highway,
+            "name": pl_name,
+            "width_m": pl_width,
+        },
+        "points": {
+            "count": len(pt_layer),
+            "xy": pt_xy,
+            "layer": pt_layer,
+            "name": pt_name,
+            "block_name": pt_block,
+            "block_filepath": pt_filepath,
+            "rotation": pt_rotation,
+            "scale": pt_scale,
+        },
+    }
+
+
+def from_columnar(columnar: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverso de `to_columnar` (polylines primeiro, depois pontos). Útil para clientes/testes.
+    """
+    strings = columnar["strings"]
+
+    def _s(field: str, idx: int) -> Optional[str]:
+        return strings[field][idx] if idx >= 0 else None
+
+    features: List[Dict[str, Any]] = []
+    pl = columnar["polylines"]
+    coords, offsets = pl["coords"], pl["offsets"]
+    for i in range(pl["count"]):
+        a, b = offsets[i], offsets[i + 1]
+        features.append({
+            "feature_type": "Polyline",
+            "layer": _s("layer", pl["layer"][i]),
+            "name": _s("name", pl["name"][i]),
+            "highway": _s("highway", pl["highway"][i]),
+            "width_m": pl["width_m"][i],
+            "coords_xy": [[coords[2 * k], coords[2 * k + 1]] for k in range(a, b)],
+            "insertion_point_xy": None,
+            "block_name": None,
+            "block_filepath": None,
+            "rotation": None,
+            "scale": None,
+        })
+    pt = columnar["points"]
+    for i in range(pt["count"]):
+        features.append({
+            "feature_type": "Point",
+            "layer": _s("layer", pt["layer"][i]),
+            "name": _s("name", pt["name"][i]),
+            "highway": None,
+            "width_m": None,
+            "coords_xy": None,
+            "insertion_point_xy": [pt["xy"][2 * i], pt["xy"][2 * i + 1]],
+            "block_name": _s("block_name", pt["block_name"][i]),
+            "block_filepath": _s("block_filepath", pt["block_filepath"][i]),
+            "rotation": pt["rotation"][i],
+            "scale": pt["scale"][i],
+        })
+    return {"crs_out": columnar.get("crs_out"), "features": features, "cache_hit": columnar.get("cache_hit"),
+            **{k: columnar.get(k) for k in SIMPLIFY_FIELDS}}
+
+
+BINARY_MEDIA_TYPE = "application/x-sisrua-bin"
+BINARY_MAGIC = b"SRB1"
+BINARY_VERSION = 1
+_PREAMBLE = struct.Struct("<4sHHI")
+
+# (grupo, coluna, dtype) na ordem em que os buffers são gravados.
+_BINARY_BUFFERS = (
+    ("polylines", "offsets", "<i8"),
+    ("polylines", "coords", "<f8"),
+    ("polylines", "layer", "<i4"),
+    ("polylines", "highway", "<i4"),
+    ("polylines", "name", "<i4"),
+    ("polylines", "width_m", "<f8"),
+    ("points", "xy", "<f8"),
+    ("points", "layer", "<i4"),
+    ("points", "name", "<i4"),
+    ("points", "block_name", "<i4"),
+    ("points", "block_filepath", "<i4"),
+    ("points", "rotation", "<f8"),
+    ("points", "scale", "<f8"),
+)
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def to_binary(payload: Dict[str, Any]) -> bytes:
+    """
+    Codifica um `PrepareResponse` (dict) no formato binário descrito no topo do módulo.
+    """
+    import numpy as np  # type: ignore
+
+    columnar = to_columnar(payload)
+    chunks: List[bytes] = []
+    descriptors: List[Dict[str, Any]] = []
+    offset = 0
+    for group, column, dtype in _BINARY_BUFFERS:
+        values = columnar[group][column]
+        if dtype == "<f8":
+            values = [float("nan") if v is None else v for v in values]
+        raw = np.asarray(values, dtype=dtype).tobytes()
+        descriptors.append({"name": f"{group}.{column}", "dtype": dtype, "offset": offset, "count": len(values)})
+        chunks.append(raw)
+        chunks.append(b"\0" * _pad8(len(raw)))
+        offset += len(raw) + _pad8(len(raw))
+
+    header = json.dumps({
+        "crs_out": columnar["crs_out"],
+        "cache_hit": columnar["cache_hit"],
+        **{k: columnar.get(k) for k in SIMPLIFY_FIELDS},
+        "strings": columnar["strings"],
+        "counts": {"polylines": columnar["polylines"]["count"], "points": columnar["points"]["count"]},
+        "buffers": descriptors,
+    }, ensure_ascii=False).encode("utf-8")
+    preamble = _PREAMBLE.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(header))
+    head = preamble + header
+    return b"".join([head, b"\0" * _pad8(len(head)), *chunks])
+
+
+def decode_binary(data: bytes) -> Dict[str, Any]:
+    """
+    Lê o formato binário devolvendo um dict no layout colunar, com os buffers como arrays numpy
+    que apontam para `data` (sem cópia).
+    """
+    import numpy as np  # type: ignore
+
+    magic, version, _, header_len = _PREAMBLE.unpack_from(data, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Payload binário sisRUA inválido ou de versão não suportada.")
+    head_end = _PREAMBLE.size + header_len
+    header = json.loads(bytes(data[_PREAMBLE.size:head_end]).decode("utf-8"))
+    base = head_end + _pad8(head_end)
+
+    out: Dict[str, Any] = {
+        "format": "binary",
+        "crs_out": header.get("crs_out"),
+        "cache_hit": header.get("cache_hit"),
+        **{k: header.get(k) for k in SIMPLIFY_FIELDS},
+        "strings": header["strings"],
+        "polylines": {"count": header["counts"]["polylines"]},
+        "points": {"count": header["counts"]["points"]},
+    }
+    for desc in header["buffers"]:
+        group, column = desc["name"].split(".", 1)
+        out[group][column] = np.frombuffer(data, dtype=desc["dtype"], count=desc["count"], offset=base + desc["offset"])
+    return out
@@ -0,0 +1,153 @@
+"""
+Registro dos jobs de prepare: metadados pequenos em memória, resultados grandes em disco.
+
+- resultado (bytes JSON) até `inline_max_bytes` fica em memória; acima disso vai para `{spill_dir}/{job_id}.json`
+- jobs encerrados expiram `ttl_s` segundos após o fim; acima de `max_jobs`, os encerrados mais antigos
+  saem primeiro (jobs queued/processing nunca são despejados)
+- `footprint()` estima a memória ocupada, para o /api/v1/stats
+
+Os job_ids não sobrevivem a um restart do backend: arquivos que sobraram em `spill_dir` são apagados na abertura.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL_S = 3600.0
+DEFAULT_MAX_JOBS = 200
+DEFAULT_INLINE_MAX_BYTES = 64 * 1024
+
+ACTIVE_STATUSES = ("queued", "processing")
+
+
+def _shallow_size(meta: Dict[str, Any]) -> int:
+    return sys.getsizeof(meta) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in meta.items())
+
+
+class JobRegistry:
+    def __init__(self, spill_dir: Path, ttl_s: Optional[float] = DEFAULT_TTL_S, max_jobs: int = DEFAULT_MAX_JOBS, inline_max_bytes: int = DEFAULT_INLINE_MAX_BYTES) -> None:
+        self.spill_dir = Path(spill_dir)
+        self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self.max_jobs = max(1, int(max_jobs))
+        self.inline_max_bytes = int(inline_max_bytes)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._inline: Dict[str, bytes] = {}
+        self._spilled: Dict[str, int] = {}
+        # job_id → instante do fim, na ordem em que terminaram (candidatos a despejo).
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._stats = {"evicted": 0, "spills": 0}
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        for leftover in self.spill_dir.glob("*.json"):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+
+    def create(self, job_id: str, meta: Dict[str, Any]) -> None:
+        with self._lock:
+            self._evict_locked(reserve=1)
+            self._jobs[job_id] = dict(meta)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cópia dos metadados do job (sem o resultado), ou None se não existe/expirou.
+        """
+        with self._lock:
+            self._evict_locked()
+            meta = self._jobs.get(job_id)
+            return dict(meta) if meta is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        with self._lock:
+            meta = self._jobs.get(job_id)
+            if meta is None:
+                return False
+            meta.update(fields)
+            return True
+
+    def finish(self, job_id: str, result: Optional[bytes] = None, **fields: Any) -> None:
+        """
+        Encerra o job (status/mensagem em `fields`) e guarda o resultado: em memória se pequeno, senão em disco.
+        """
+        path = None
+        if result is not None and len(result) > self.inline_max_bytes:
+            path = self._spill_path(job_id)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(result)
+            tmp.replace(path)
+        with self._lock:
+            meta = self._jobs.get(job_id)
+            if meta is None:
+                if path is not None:
+                    path.unlink(missing_ok=True)
+                return
+            meta.update(fields)
+            if path is not None:
+                self._spilled[job_id] = len(result or b"")
+                self._stats["spills"] += 1
+            elif result is not None:
+                self._inline[job_id] = result
+            self._finished[job_id] = time.time()
+            self._finished.move_to_end(job_id)
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            if job_id in self._inline:
+                return self._inline[job_id]
+            if job_id not in self._spilled:
+                return None
+        try:
+            return self._spill_path(job_id).read_bytes()
+        except OSError:
+            return None  # despejado entre o lock e a leitura
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._remove_locked(job_id)
+
+    def footprint(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_locked()
+            meta_bytes = sys.getsizeof(self._jobs) + sum(_shallow_size(m) for m in self._jobs.values())
+            inline_bytes = sum(len(r) for r in self._inline.values())
+            return {
+                **self._stats,
+                "jobs": len(self._jobs),
+                "active": sum(1 for m in self._jobs.values() if m.get("status") in ACTIVE_STATUSES),
+                "memory_bytes": meta_bytes + inline_bytes,
+                "inline_results": len(self._inline),
+                "inline_bytes": inline_bytes,
+                "spilled_results": len(self._spilled),
+                "spilled_bytes": sum(self._spilled.values()),
+                "ttl_s": self.ttl_s,
+                "max_jobs": self.max_jobs,
+            }
+
+    def _spill_path(self, job_id: str) -> Path:
+        return self.spill_dir / f"{job_id}.json"
+
+    def _remove_locked(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._inline.pop(job_id, None)
+        self._finished.pop(job_id, None)
+        if self._spilled.pop(job_id, None) is not None:
+            try:
+                self._spill_path(job_id).unlink()
+            except OSError:
+                pass
+
+    def _evict_locked(self, reserve: int = 0) -> None:
+        now = time.time()
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            expired = self.ttl_s is not None and finished + self.ttl_s <= now
+            if not expired and len(self._jobs) + reserve <= self.max_jobs:
+                break
+            self._remove_locked(job_id)
+            self._stats["evicted"] += 1
@@ -0,0 +1,141 @@
+"""
+Agendador dos jobs de prepare: fila limitada + pool fixo de workers (threads).
+
+- no máximo `workers` jobs executando ao mesmo tempo (antes: uma thread por requisição, sem limite)
+- fila por prioridade (menor primeiro) e FIFO dentro da mesma prioridade; a API põe GeoJSON
+  (pequeno, local) na frente de OSM (download + montagem de GeoDataFrames)
+- fila cheia → `QueueFull` com a estimativa de espera (vira HTTP 429 + Retry-After)
+- workers sobem sob demanda e encerram após `idle_timeout_s` sem trabalho
+- `cancel(job_id)` tira da fila um job que ainda não começou (o que já executa é cancelado pela própria função)
+
+A função submetida é responsável pelos próprios erros (o job registra "failed"); exceções
+que escaparem são descartadas para não derrubar o worker.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+DEFAULT_MAX_QUEUE = 32
+
+# Estimativa de duração enquanto nenhum job terminou (segundos).
+_DEFAULT_JOB_S = 5.0
+_MAX_RETRY_AFTER_S = 120
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after_s: int) -> None:
+        super().__init__(f"Fila de jobs cheia; tente novamente em {retry_after_s}s.")
+        self.retry_after_s = retry_after_s
+
+
+class JobScheduler:
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE, idle_timeout_s: float = 30.0) -> None:
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.idle_timeout_s = idle_timeout_s
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int, str, Callable[[], Any]]] = []
+        self._queued: Dict[str, Tuple[int, int]] = {}
+        self._seq = itertools.count()
+        self._threads = 0
+        self._idle = 0
+        self._running = 0
+        self._avg_job_s: Optional[float] = None
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "cancelled": 0}
+
+    def submit(self, job_id: str, fn: Callable[[], Any], priority: int = 0) -> int:
+        """
+        Enfileira `fn` e devolve a posição do job na fila (1 = próximo a executar).
+        """
+        with self._cond:
+            if len(self._heap) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise QueueFull(self._retry_after_locked())
+            entry = (int(priority), next(self._seq))
+            heapq.heappush(self._heap, (*entry, job_id, fn))
+            self._queued[job_id] = entry
+            self._stats["submitted"] += 1
+            self._cond.notify()
+            if self._threads < self.workers and self._idle < len(self._heap):
+                self._threads += 1
+                threading.Thread(target=self._worker, name="sisrua-job-worker", daemon=True).start()
+            return self._position_locked(entry)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """
+        Posição do job na fila (1 = próximo), ou None se ele não está esperando.
+        """
+        with self._cond:
+            entry = self._queued.get(job_id)
+            return self._position_locked(entry) if entry is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove o job da fila. False se ele não está esperando (já executando, encerrado ou desconhecido).
+        """
+        with self._cond:
+            if self._queued.pop(job_id, None) is None:
+                return False
+            self._heap = [item for item in self._heap if item[2] != job_id]
+            heapq.heapify(self._heap)
+            self._stats["cancelled"] += 1
+            return True
+
+    def retry_after_s(self) -> int:
+        with self._cond:
+            return self._retry_after_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "threads": self._threads,
+                "running": self._running,
+                "queued": len(self._heap),
+                "avg_job_s": self._avg_job_s,
+            }
+
+    def _position_locked(self, entry: Tuple[int, int]) -> int:
+        return 1 + sum(1 for other in self._queued.values() if other < entry)
+
+    def _retry_after_locked(self) -> int:
+        # Tempo para a fila atual (mais os que estão rodando) escoar pelos workers.
+        avg = self._avg_job_s if self._avg_job_s is not None else _DEFAULT_JOB_S
+        wait = avg * (len(self._heap) + self._running) / self.workers
+        return int(min(_MAX_RETRY_AFTER_S, max(1, math.ceil(wait))))
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._idle += 1
+                    notified = self._cond.wait(self.idle_timeout_s)
+                    self._idle -= 1
+                    if not notified and not self._heap:
+                        self._threads -= 1
+                        return
+                _, _, job_id, fn = heapq.heappop(self._heap)
+                self._queued.pop(job_id, None)
+                self._running += 1
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception:
+                pass
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._cond:
+                    self._running -= 1
+                    self._stats["completed"] += 1
+                    # Média móvel exponencial: acompanha a carga recente sem guardar histórico.
+                    self._avg_job_s = elapsed if self._avg_job_s is None else 0.8 * self._avg_job_s + 0.2 * elapsed
@@ -0,0 +1,315 @@
+"""
+Motor offline de extratos OSM: ingere um `.osm` (XML) ou `.osm.pbf` uma única vez num SQLite com índice
+espacial (R*Tree) e responde consultas por lat/lon/raio sem rede.
+
+- vias: ways com `highway` (mesmo filtro do network_type="all" do OSMnx), geometria lon/lat já resolvida
+- pontos: nós com tags (postes, bancos, ...), para as regras de blocos
+- `query(lat, lon, radius)` devolve (nodes, edges) GeoDataFrames no formato do `ox.graph_to_gdfs`
+  (edges indexadas por (u, v, key), nodes por osmid), recortados no mesmo bbox do `graph_from_point`.
+
+`.osm` usa só a stdlib (iterparse em streaming); `.osm.pbf` precisa do pyosmium (`pip install osmium`).
+
+Uso (a partir de src/backend):
+    python -m backend.osm_extract ingest rio-de-janeiro.osm.pbf rj.sqlite3
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+EXTRACT_FORMAT_VERSION = 1
+
+# Raio da Terra usado pelo OSMnx (`utils_geo.bbox_from_point`).
+_EARTH_RADIUS_M = 6_371_009.0
+
+# Filtro de ways do network_type="all" do OSMnx.
+_EXCLUDED_HIGHWAYS = {"abandoned", "construction", "no", "planned", "platform", "proposed", "raceway", "razed"}
+
+# Tags sem valor para o CAD: nós só com elas não viram pontos.
+_IGNORED_NODE_TAGS = {"created_by", "source", "fixme", "FIXME", "note"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS ways (id INTEGER PRIMARY KEY, u INTEGER NOT NULL, v INTEGER NOT NULL, tags TEXT NOT NULL, coords BLOB NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS ways_idx USING rtree(id, min_x, max_x, min_y, max_y);
+CREATE TABLE IF NOT EXISTS points (id INTEGER PRIMARY KEY, lon REAL NOT NULL, lat REAL NOT NULL, tags TEXT NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS points_idx USING rtree(id, min_x, max_x, min_y, max_y);
+"""
+
+_BATCH = 20_000
+
+
+def bbox_from_point(latitude: float, longitude: float, dist: float) -> Tuple[float, float, float, float]:
+    """
+    (left, bottom, right, top), igual ao `ox.utils_geo.bbox_from_point`.
+    """
+    delta_lat = (dist / _EARTH_RADIUS_M) * (180.0 / math.pi)
+    delta_lon = delta_lat / math.cos(math.radians(latitude))
+    return (longitude - delta_lon, latitude - delta_lat, longitude + delta_lon, latitude + delta_lat)
+
+
+def _is_road(tags: Dict[str, str]) -> bool:
+    highway = tags.get("highway")
+    return bool(highway) and highway not in _EXCLUDED_HIGHWAYS and tags.get("area") != "yes"
+
+
+def _is_point(tags: Dict[str, str]) -> bool:
+    return any(k not in _IGNORED_NODE_TAGS for k in tags)
+
+
+class _Writer:
+    """
+    Grava ways/pontos em lotes. As coordenadas de todos os nós ficam numa tabela temporária
+    (as ways do XML só trazem ids), descartada no fim da ingestão.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.nodes: List[Tuple[int, float, float]] = []
+        self.points: List[Tuple[int, float, float, str]] = []
+        self.ways: List[Tuple[int, List[int], Dict[str, str]]] = []
+        self.located_ways: List[Tuple[int, List[int], List[float], Dict[str, str]]] = []
+        self.bounds = [math.inf, math.inf, -math.inf, -math.inf]
+        self.declared_bounds: List[float] | None = None  # <bounds> do arquivo, se houver (área do recorte)
+        self.counts = {"ways": 0, "points": 0}
+        conn.execute("CREATE TEMP TABLE node_coords (id INTEGER PRIMARY KEY, lon REAL NOT NULL, lat REAL NOT NULL)")
+
+    def node(self, osmid: int, lon: float, lat: float, tags: Dict[str, str]) -> None:
+        self.nodes.append((osmid, lon, lat))
+        b = self.bounds
+        b[0], b[1], b[2], b[3] = min(b[0], lon), min(b[1], lat), max(b[2], lon), max(b[3], lat)
+        if tags and _is_point(tags):
+            self.points.append((osmid, lon, lat, json.dumps(tags, ensure_ascii=False)))
+        if len(self.nodes) >= _BATCH:
+            self.flush_nodes()
+
+    def way(self, osmid: int, refs: List[int], tags: Dict[str, str]) -> None:
+        if len(refs) >= 2 and _is_road(tags):
+            self.ways.append((osmid, refs, tags))
+            if len(self.ways) >= _BATCH:
+                self.flush_ways()
+
+    def way_with_coords(self, osmid: int, refs: List[int], coords: List[float], tags: Dict[str, str]) -> None:
+        """
+        Caminho do pyosmium (locations=True): a way já vem com as coordenadas.
+        """
+        if len(refs) >= 2 and _is_road(tags):
+            self.located_ways.append((osmid, refs, coords, tags))
+            if len(self.located_ways) >= _BATCH:
+                self._insert_ways(self.located_ways)
+                self.located_ways = []
+
+    def flush_nodes(self) -> None:
+        self.conn.executemany("INSERT OR REPLACE INTO node_coords VALUES (?, ?, ?)", self.nodes)
+        self.conn.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)", self.points)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO points_idx VALUES (?, ?, ?, ?, ?)", [(i, x, x, y, y) for i, x, y, _ in self.points]
+        )
+        self.counts["points"] += len(self.points)
+        self.nodes, self.points = [], []
+
+    def flush_ways(self) -> None:
+        if not self.ways:
+            return
+        self.flush_nodes()
+        ids = sorted({r for _, refs, _ in self.ways for r in refs})
+        coords: Dict[int, Tuple[float, float]] = {}
+        for start in range(0, len(ids), 900):  # limite de parâmetros do SQLite
+            chunk = ids[start:start + 900]
+            q = f"SELECT id, lon, lat FROM node_coords WHERE id IN ({','.join('?' * len(chunk))})"
+            coords.update((i, (x, y)) for i, x, y in self.conn.execute(q, chunk))
+        resolved = []
+        for osmid, refs, tags in self.ways:
+            refs = [r for r in refs if r in coords]  # extratos recortados: ways com nós fora do arquivo
+            if len(refs) < 2:
+                continue
+            resolved.append((osmid, refs, [c for r in refs for c in coords[r]], tags))
+        self._insert_ways(resolved)
+        self.ways = []
+
+    def _insert_ways(self, ways: List[Tuple[int, List[int], List[float], Dict[str, str]]]) -> None:
+        rows, idx = [], []
+        for osmid, refs, flat, tags in ways:
+            xs, ys = flat[0::2], flat[1::2]
+            rows.append((osmid, refs[0], refs[-1], json.dumps(tags, ensure_ascii=False), array("d", flat).tobytes()))
+            idx.append((osmid, min(xs), max(xs), min(ys), max(ys)))
+        self.conn.executemany("INSERT OR REPLACE INTO ways VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.executemany("INSERT OR REPLACE INTO ways_idx VALUES (?, ?, ?, ?, ?)", idx)
+        self.counts["ways"] += len(rows)
+
+    def finish(self, source: Path) -> Dict[str, Any]:
+        self.flush_ways()
+        self.flush_nodes()
+        self._insert_ways(self.located_ways)
+        self.located_ways = []
+        self.conn.execute("DROP TABLE node_coords")
+        meta = {
+            "version": EXTRACT_FORMAT_VERSION,
+            "source": source.name,
+            "bounds": self.declared_bounds or (self.bounds if math.isfinite(self.bounds[0]) else None),
+            **self.counts,
+        }
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        return meta
+
+
+def _parse_osm_xml(path: Path, writer: _Writer) -> None:
+    import xml.etree.ElementTree as ET
+
+    context = ET.iterparse(str(path), events=("start", "end"))
+    _, root = next(context)
+    depth = 0  # profundidade abaixo de <osm>: 1 = node/way/relation/bounds
+    for event, elem in context:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth > 0:
+            continue  # <tag>/<nd>/<member>: lidos no fim do elemento pai
+        tag = elem.tag
+        if tag == "bounds":
+            writer.declared_bounds = [float(elem.get(k)) for k in ("minlon", "minlat", "maxlon", "maxlat")]
+        elif tag == "node":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            writer.node(int(elem.get("id")), float(elem.get("lon")), float(elem.get("lat")), tags)
+        elif tag == "way":
+            refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            writer.way(int(elem.get("id")), refs, tags)
+        # Todo elemento de 1º nível (inclusive relation, ignorada) é liberado ao terminar:
+        # arquivos estaduais têm milhões de nós e centenas de milhares de relações.
+        elem.clear()
+        root.clear()
+
+
+def _parse_osm_pbf(path: Path, writer: _Writer) -> None:
+    try:
+        import osmium  # type: ignore
+    except Exception as e:  # pragma: no cover - depende do pyosmium instalado
+        raise RuntimeError("Ingestão de .osm.pbf requer o pyosmium (pip install osmium).") from e
+
+    class _Handler(osmium.SimpleHandler):  # pragma: no cover - depende do pyosmium instalado
+        def node(self, n: Any) -> None:
+            writer.node(n.id, n.location.lon, n.location.lat, {t.k: t.v for t in n.tags})
+
+        def way(self, w: Any) -> None:
+            try:
+                coords = [c for nd in w.nodes for c in (nd.lon, nd.lat)]
+            except osmium.InvalidLocationError:
+                return
+            writer.way_with_coords(w.id, [nd.ref for nd in w.nodes], coords, {t.k: t.v for t in w.tags})
+
+    box = osmium.io.Reader(str(path)).header().box()
+    if box.valid():
+        writer.declared_bounds = [box.bottom_left.lon, box.bottom_left.lat, box.top_right.lon, box.top_right.lat]
+    _Handler().apply_file(str(path), locations=True)
+
+
+def ingest(source: Path, target: Path) -> Dict[str, Any]:
+    """
+    Ingere `source` (.osm/.osm.pbf) em `target` (SQLite). Grava num arquivo temporário e só então
+    substitui o destino: uma ingestão interrompida não deixa um store pela metade.
+    """
+    source, target = Path(source), Path(target)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp), isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(_SCHEMA)
+        conn.execute("BEGIN")
+        writer = _Writer(conn)
+        if source.name.endswith(".pbf"):
+            _parse_osm_pbf(source, writer)
+        else:
+            _parse_osm_xml(source, writer)
+        meta = writer.finish(source)
+        conn.execute("COMMIT")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    tmp.replace(target)
+    return meta
+
+
+class OsmExtract:
+    """
+    Store ingerido (somente leitura). Seguro para uso em várias threads (uma conexão por consulta).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with self._connect() as conn:
+            self.meta = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+        if self.meta.get("version") != EXTRACT_FORMAT_VERSION:
+            raise ValueError(f"Extrato OSM de versão não suportada: {self.path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def covers(self, bbox: Tuple[float, float, float, float]) -> bool:
+        b = self.meta.get("bounds")
+        return bool(b) and b[0] <= bbox[0] and b[1] <= bbox[1] and b[2] >= bbox[2] and b[3] >= bbox[3]
+
+    def query(self, latitude: float, longitude: float, radius: float) -> Tuple[Any, Any]:
+        """
+        (nodes, edges) no bbox de `graph_from_point(dist=radius)`. Vias que cruzam a borda são recortadas nela.
+        """
+        import geopandas as gpd  # type: ignore
+        import numpy as np  # type: ignore
+        import pandas as pd  # type: ignore
+        import shapely  # type: ignore
+
+        left, bottom, right, top = bbox_from_point(latitude, longitude, radius)
+        with self._connect() as conn:
+            way_rows = conn.execute(
+                "SELECT w.id, w.u, w.v, w.tags, w.coords FROM ways_idx i JOIN ways w ON w.id = i.id "
+                "WHERE i.max_x >= ? AND i.min_x <= ? AND i.max_y >= ? AND i.min_y <= ? ORDER BY w.id",
+                (left, right, bottom, top),
+            ).fetchall()
+            point_rows = conn.execute(
+                "SELECT p.id, p.lon, p.lat, p.tags FROM points_idx i JOIN points p ON p.id = i.id "
+                "WHERE i.min_x >= ? AND i.max_x <= ? AND i.min_y >= ? AND i.max_y <= ? ORDER BY p.id",
+                (left, right, bottom, top),
+            ).fetchall()
+
+        lines = [shapely.linestrings(np.frombuffer(blob, dtype=np.float64).reshape(-1, 2)) for *_, blob in way_rows]
+        clipped = shapely.clip_by_rect(np.asarray(lines, dtype=object), left, bottom, right, top) if lines else []
+        way_tags = [json.loads(t) for _, _, _, t, _ in way_rows]
+        edges = gpd.GeoDataFrame(
+            {"osmid": [r[0] for r in way_rows], "highway": [t.get("highway") for t in way_tags], "name": [t.get("name") for t in way_tags]},
+            geometry=list(clipped),
+            index=pd.MultiIndex.from_tuples([(r[1], r[2], r[0]) for r in way_rows], names=["u", "v", "key"]),
+            crs="EPSG:4326",
+        )
+        edges = edges[~edges.geometry.is_empty]
+
+        point_tags = [json.loads(r[3]) for r in point_rows]
+        columns = sorted({k for t in point_tags for k in t} - {"geometry"})
+        nodes = gpd.GeoDataFrame(
+            {c: [t.get(c) for t in point_tags] for c in columns},
+            geometry=gpd.points_from_xy([r[1] for r in point_rows], [r[2] for r in point_rows]),
+            index=pd.Index([r[0] for r in point_rows], name="osmid"),
+            crs="EPSG:4326",
+        )
+        return nodes, edges
+
+
+def _main(argv: List[str]) -> int:
+    if len(argv) != 3 or argv[0] != "ingest":
+        print("uso: python -m backend.osm_extract ingest <arquivo.osm|.osm.pbf> <destino.sqlite3>")
+        return 2
+    meta = ingest(Path(argv[1]), Path(argv[2]))
+    print(json.dumps(meta, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main(sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""
+Grade fixa de tiles (slippy map, Web Mercator) para o cache OSM.
+
+Em vez de baixar/cachear por (lat, lon, raio) exatos, os dados brutos do OSMnx (nodes/edges) são guardados
+por tile z15 (~1 km no Brasil). Uma consulta por raio vira: tiles que cobrem o bbox → carrega os que já estão
+no cache → um único download para o retângulo dos que faltam → recorte no bbox da consulta.
+
+Convenções:
+- bbox no formato do OSMnx 2: (left, bottom, right, top) = (lon_min, lat_min, lon_max, lat_max)
+- tile = (z, x, y)
+- edges com MultiIndex (u, v, key) e nodes indexados por osmid, como em `ox.graph_to_gdfs`
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Tuple
+
+OSM_TILE_ZOOM = 15
+
+Tile = Tuple[int, int, int]
+BBox = Tuple[float, float, float, float]
+
+
+def _lonlat_to_tile_xy(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(tile: Tile) -> BBox:
+    z, x, y = tile
+    n = 2 ** z
+
+    def _lat(yy: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * yy / n))))
+
+    return (x / n * 360.0 - 180.0, _lat(y + 1), (x + 1) / n * 360.0 - 180.0, _lat(y))
+
+
+def tiles_for_bbox(bbox: BBox, z: int = OSM_TILE_ZOOM) -> List[Tile]:
+    left, bottom, right, top = bbox
+    x0, y0 = _lonlat_to_tile_xy(left, top, z)
+    x1, y1 = _lonlat_to_tile_xy(right, bottom, z)
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def union_bounds(tiles: Iterable[Tile]) -> BBox:
+    bounds = [tile_bounds(t) for t in tiles]
+    return (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
+    )
+
+
+def _node_ids_of_edges(edges: Any) -> Any:
+    """
+    Ids dos nós nas pontas das edges (níveis u/v do índice), ou None se o índice não os tiver.
+    """
+    names = list(edges.index.names or [])
+    if "u" not in names or "v" not in names:
+        return None
+    return edges.index.get_level_values("u").union(edges.index.get_level_values("v"))
+
+
+def _nodes_in_bbox(nodes: Any, bbox: BBox) -> Any:
+    left, bottom, right, top = bbox
+    x, y = nodes.geometry.x, nodes.geometry.y
+    return (x >= left) & (x <= right) & (y >= bottom) & (y <= top)
+
+
+def _edges_intersecting(edges: Any, bbox: BBox) -> Any:
+    import numpy as np  # type: ignore
+    from shapely.geometry import box  # type: ignore
+
+    if not len(edges):
+        return edges
+    # `sindex.query` devolve posições sem ordem garantida; ordenamos para preservar a ordem original.
+    return edges.iloc[np.sort(edges.sindex.query(box(*bbox), predicate="intersects"))]
+
+
+def split_by_tile(nodes: Any, edges: Any, tiles: Iterable[Tile]) -> Dict[Tile, Tuple[Any, Any]]:
+    """
+    Reparte um download (nodes, edges) pelos tiles pedidos.
+    - edge vai para todo tile que ela intersecta (pode repetir entre tiles; o merge deduplica pelo índice)
+    - node vai para o tile onde está e também para os tiles das edges que o usam como ponta,
+      para que cada tile seja autossuficiente (edges sempre com u/v presentes)
+    """
+    out: Dict[Tile, Tuple[Any, Any]] = {}
+    for tile in tiles:
+        bounds = tile_bounds(tile)
+        tile_edges = _edges_intersecting(edges, bounds)
+        node_mask = _nodes_in_bbox(nodes, bounds)
+        endpoint_ids = _node_ids_of_edges(tile_edges)
+        if endpoint_ids is not None:
+            node_mask = node_mask | nodes.index.isin(endpoint_ids)
+        out[tile] = (nodes[node_mask], tile_edges)
+    return out
+
+
+def merge_and_truncate(frames: Iterable[Tuple[Any, Any]], bbox: BBox) -> Tuple[Any, Any]:
+    """
+    Junta os (nodes, edges) de vários tiles, remove repetidos (mesmo índice) e recorta no bbox como o
+    `truncate_graph_bbox` do OSMnx: mantém os nós dentro do bbox e as edges entre nós mantidos
+    (sem índice u/v, mantém as edges que intersectam o bbox).
+    """
+    import pandas as pd  # type: ignore
+
+    frames = list(frames)
+    nodes = pd.concat([n for n, _ in frames])
+    edges = pd.concat([e for _, e in frames])
+    nodes = nodes[~nodes.index.duplicated()]
+    edges = edges[~edges.index.duplicated()]
+
+    if len(nodes):
+        nodes = nodes[_nodes_in_bbox(nodes, bbox)]
+    if len(edges):
+        names = list(edges.index.names or [])
+        if "u" in names and "v" in names:
+            keep = nodes.index
+            edges = edges[edges.index.get_level_values("u").isin(keep) & edges.index.get_level_values("v").isin(keep)]
+        else:
+            edges = _edges_intersecting(edges, bbox)
+    return nodes, edges
@@ -0,0 +1,62 @@
+"""
+Benchmark: latência de um cache hit do prepare OSM e espaço em disco.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_cache_hit.py            # ~20 MB de resultado
+    python benchmarks/bench_cache_hit.py 50000
+
+Compara o caminho antigo (read_text → json.loads → _sanitize_jsonable → re-serialização) com o atual
+(bytes gzip do cache enviados como estão, com Content-Encoding: gzip).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+for p in (_ROOT, Path(__file__).resolve().parent):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from bench_response_formats import synthetic_payload  # noqa: E402
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 40_000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LOCALAPPDATA"] = tmp
+        from backend import api
+
+        payload = {**synthetic_payload(n), "cache_hit": True}
+        legacy_path = Path(tmp) / "legacy.json"
+        legacy_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        api._write_cache("k", payload)
+        stored = api._cache_store().get("k")
+
+        t0 = time.perf_counter()
+        data = api._sanitize_jsonable(json.loads(legacy_path.read_text(encoding="utf-8")))
+        json.dumps(api.PrepareResponse(**data).model_dump()).encode("utf-8")
+        t_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        gz = api._cached_json_response("k", "gzip")
+        t_gzip = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        api._cached_json_response("k", None)
+        t_plain = time.perf_counter() - t0
+
+        print(f"{n} features; JSON {legacy_path.stat().st_size / 1e6:.1f} MB, cache gzip {len(stored) / 1e6:.1f} MB")
+        print(f"antigo (loads + sanitize + dumps): {t_legacy * 1000:>9.1f} ms")
+        print(f"hit gzip (bytes como estão):       {t_gzip * 1000:>9.1f} ms  ({len(gz.body) / 1e6:.1f} MB enviados)")
+        print(f"hit sem gzip (só descomprime):     {t_plain * 1000:>9.1f} ms")
+        api._cache_store().close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
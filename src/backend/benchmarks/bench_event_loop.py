@@ -0,0 +1,88 @@
+"""
+Benchmark: latência do event loop (GET /api/v1/health) enquanto um prepare síncrono roda.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_event_loop.py            # prepare/osm com download de 1 s; prepare/geojson 20k linhas
+    python benchmarks/bench_event_loop.py 50000
+
+Os endpoints de prepare são `def` (threadpool): o health deve responder em poucos ms durante o prepare,
+não esperar o prepare inteiro. Imprime p50/p99/máx do health e quantas chamadas couberam no prepare.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+def _geojson(n: int) -> dict:
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "LOTES"},
+                "geometry": {"type": "LineString", "coordinates": [[-43.2 + i * 1e-5 + k * 1e-6, -22.9 + k * 1e-6] for k in range(20)]},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def _measure(client, path: str, body: dict) -> tuple[list[float], float]:
+    # Corpo já serializado: o json.dumps do cliente segura a GIL e entraria na latência medida.
+    content = json.dumps(body).encode()
+    results = {}
+    t_start = time.perf_counter()
+    worker = threading.Thread(target=lambda: results.update(r=client.post(path, content=content, headers={"Content-Type": "application/json"})))
+    worker.start()
+    health = []
+    while worker.is_alive():
+        t0 = time.perf_counter()
+        client.get("/api/v1/health")
+        health.append(time.perf_counter() - t0)
+        time.sleep(0.002)
+    worker.join()
+    assert results["r"].status_code == 200, results["r"].text
+    return sorted(health), time.perf_counter() - t_start
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 20_000
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-loop-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+
+    from fastapi.testclient import TestClient
+
+    from backend import api
+
+    def _slow_osm(latitude, longitude, radius, **kwargs):
+        time.sleep(1.0)  # download do Overpass
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    api._prepare_osm_compute = _slow_osm
+
+    print(f"\n{'prepare':<28} {'duração (s)':>11} {'chamadas':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9}")
+    # `with`: um único event loop (portal) para todas as requisições, como no uvicorn.
+    with TestClient(api.app) as client:
+        for label, path, body in (
+            ("osm (download 1 s)", "/api/v1/prepare/osm", {"latitude": -22.9, "longitude": -43.2, "radius": 100}),
+            (f"geojson ({n} linhas)", "/api/v1/prepare/geojson", {"geojson": _geojson(n)}),
+        ):
+            health, elapsed = _measure(client, path, body)
+            p = lambda q: health[min(len(health) - 1, int(len(health) * q))] * 1000  # noqa: E731
+            print(f"{label:<28} {elapsed:>11.2f} {len(health):>9} {p(0.5):>9.1f} {p(0.99):>9.1f} {health[-1] * 1000:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,90 @@
+"""
+Benchmark: rajada de POST /api/v1/jobs/prepare contra a fila limitada de jobs.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_job_burst.py            # 40 POSTs, job de 50 ms, 2 workers, fila 6
+    python benchmarks/bench_job_burst.py 200 0.02
+
+Com o pool fixo e a fila limitada, o excedente recebe 429 + Retry-After em vez de abrir uma thread
+por pedido: a latência do POST e do health deve ficar em poucos ms durante toda a rajada.
+Imprime aceitos/429, p50/p99 do POST e do health e o máximo de jobs simultâneos.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000  # noqa: E731
+    return p(0.5), p(0.99)
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 40
+    job_s = float(argv[1]) if len(argv) > 1 else 0.05
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-burst-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+    os.environ.setdefault("SISRUA_JOB_WORKERS", "2")
+    os.environ.setdefault("SISRUA_JOB_QUEUE_MAX", "6")
+
+    from fastapi.testclient import TestClient
+
+    from backend import api
+
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def _compute(latitude, longitude, radius, **kwargs):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(job_s)
+        with lock:
+            active["now"] -= 1
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    api._prepare_osm_compute = _compute
+
+    with TestClient(api.app) as client:
+        accepted, rejected, posts = [], 0, []
+        for i in range(n):
+            t0 = time.perf_counter()
+            r = client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9 + i * 1e-3, "longitude": -43.2, "radius": 100})
+            posts.append(time.perf_counter() - t0)
+            if r.status_code == 429:
+                rejected += 1
+            else:
+                accepted.append(r.json()["job_id"])
+
+        health = []
+        for job_id in accepted:
+            while True:
+                t0 = time.perf_counter()
+                client.get("/api/v1/health")
+                health.append(time.perf_counter() - t0)
+                if client.get(f"/api/v1/jobs/{job_id}/status").json()["status"] == "completed":
+                    break
+                time.sleep(0.01)
+
+    post_p50, post_p99 = _percentiles(posts)
+    health_p50, health_p99 = _percentiles(health)
+    print(f"\n{n} POSTs, job de {job_s * 1000:.0f} ms: {len(accepted)} aceitos, {rejected} com 429, máx simultâneos {active['max']}")
+    print(f"{'':<8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    print(f"{'POST':<8} {post_p50:>9.1f} {post_p99:>9.1f}")
+    print(f"{'health':<8} {health_p50:>9.1f} {health_p99:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
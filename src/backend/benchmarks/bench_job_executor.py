@@ -0,0 +1,78 @@
+"""
+Benchmark: latência do health enquanto um job de prepare roda, executor em thread x em processo.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_job_executor.py            # job GeoJSON de 20k linhas
+    python benchmarks/bench_job_executor.py 50000
+
+Em thread, a projeção disputa o GIL com o event loop; com SISRUA_JOB_EXECUTOR=process, o job roda num
+worker já aquecido e o health deve ficar em poucos ms. Imprime duração do job e p50/p99/máx do health.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+def _geojson(n: int, salt: int) -> dict:
+    # `salt` muda as coordenadas: cada rodada é um cache miss.
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "LOTES"},
+                "geometry": {"type": "LineString", "coordinates": [[-43.2 + i * 1e-5 + k * 1e-6, -22.9 + salt * 1e-7 + k * 1e-6] for k in range(20)]},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 20_000
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-executor-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+
+    from fastapi.testclient import TestClient
+
+    from backend import api
+
+    print(f"\n{n} linhas por job")
+    print(f"{'executor':<10} {'job (s)':>8} {'chamadas':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9}")
+    with TestClient(api.app) as client:
+        for salt, mode in enumerate(("thread", "process")):
+            os.environ["SISRUA_JOB_EXECUTOR"] = mode
+            api.prewarm_process_pool(wait=True)
+            # Corpo já serializado: o json.dumps do cliente segura o GIL e entraria na latência medida.
+            content = json.dumps({"kind": "geojson", "geojson": _geojson(n, salt)}).encode()
+            t_start = time.perf_counter()
+            job = client.post("/api/v1/jobs/prepare", content=content, headers={"Content-Type": "application/json"}).json()
+            health = []
+            while job["status"] in ("queued", "processing"):
+                t0 = time.perf_counter()
+                client.get("/api/v1/health")
+                health.append(time.perf_counter() - t0)
+                time.sleep(0.005)
+                job = client.get(f"/api/v1/jobs/{job['job_id']}/status").json()
+            elapsed = time.perf_counter() - t_start
+            if job["status"] != "completed":
+                print(f"{mode}: job {job['status']}: {job.get('error')}")
+                return 1
+            health.sort()
+            p = lambda q: health[min(len(health) - 1, int(len(health) * q))] * 1000  # noqa: E731
+            print(f"{mode:<10} {elapsed:>8.2f} {len(health):>9} {p(0.5):>9.1f} {p(0.99):>9.1f} {health[-1] * 1000:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
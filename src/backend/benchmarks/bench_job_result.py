@@ -0,0 +1,69 @@
+"""
+Benchmark: custo por feature do resultado dos jobs (serialização).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_job_result.py            # 100k features
+    python benchmarks/bench_job_result.py 300000
+
+Compara o caminho antigo (CadFeature → model_dump → _sanitize_jsonable → PrepareResponse(**...) →
+model_dump → json.dumps) com o atual (registros prontos do pipeline serializados uma vez por
+`_json_bytes`). A equivalência do conteúdo é coberta por tests/test_job_result_serialization.py.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+def _coords(i: int) -> list:
+    x, y = 680_000.0 + i, 7_460_000.0 + i
+    return [[x, y], [x + 10.5, y + 3.25], [x + 21.0, y + 6.5]]
+
+
+def legacy_result_bytes(api, n: int) -> bytes:
+    features = [
+        api.CadFeature(feature_type="Polyline", layer="SISRUA_OSM_VIAS", name=f"Rua {i % 500}",
+                       highway="residential", width_m=5.0, coords_xy=_coords(i))
+        for i in range(n)
+    ]
+    result = api.PrepareResponse(crs_out="EPSG:31983", features=features).model_dump()
+    safe = api.PrepareResponse(**api._sanitize_jsonable(result)).model_dump()
+    return json.dumps(safe).encode("utf-8")
+
+
+def fast_result_bytes(api, n: int) -> bytes:
+    features = [
+        api._polyline_record(layer="SISRUA_OSM_VIAS", name=f"Rua {i % 500}",
+                             highway="residential", width_m=5.0, coords_xy=_coords(i))
+        for i in range(n)
+    ]
+    return api._json_bytes({"crs_out": "EPSG:31983", "features": features, "cache_hit": None})
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 100_000
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-result-")
+
+    from backend import api
+
+    print(f"\n{n} features")
+    print(f"{'caminho':<10} {'total (s)':>10} {'µs/feature':>11} {'bytes':>14}")
+    for label, build in (("antes", legacy_result_bytes), ("agora", fast_result_bytes)):
+        t0 = time.perf_counter()
+        data = build(api, n)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<10} {elapsed:>10.3f} {elapsed / n * 1e6:>11.2f} {len(data):>14,}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
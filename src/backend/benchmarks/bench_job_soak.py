@@ -0,0 +1,74 @@
+"""
+Soak do registro de jobs: submete um job GeoJSON a cada `intervalo` segundos e imprime, periodicamente,
+a memória alocada pelo Python (tracemalloc) e o footprint do registro (/api/v1/stats).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_job_soak.py                 # 200 jobs sem pausa
+    python benchmarks/bench_job_soak.py 17280 5         # ~24 h, um job a cada 5 s
+
+Com SISRUA_JOB_TTL_S / SISRUA_JOB_MAX a memória deve estabilizar depois dos primeiros jobs.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+def _geojson(i: int) -> dict:
+    # ~2000 linhas por job; a coordenada varia com `i` para não cair no cache de resultado.
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "LOTES"},
+                "geometry": {"type": "LineString", "coordinates": [[-43.2 + k * 1e-5, -22.9 + i * 1e-7 + j * 1e-6] for k in range(10)]},
+            }
+            for j in range(2000)
+        ],
+    }
+
+
+def main(argv: list[str]) -> int:
+    n_jobs = int(argv[0]) if argv else 200
+    interval = float(argv[1]) if len(argv) > 1 else 0.0
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-soak-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+
+    from fastapi.testclient import TestClient
+
+    from backend.api import app
+
+    client = TestClient(app)
+    tracemalloc.start()
+    for i in range(n_jobs):
+        job = client.post("/api/v1/jobs/prepare", json={"kind": "geojson", "geojson": _geojson(i)}).json()
+        while job["status"] in ("queued", "processing"):
+            time.sleep(0.01)
+            job = client.get(f"/api/v1/jobs/{job['job_id']}").json()
+        if job["status"] != "completed":
+            print(f"job {i} falhou: {job['error']}")
+            return 1
+        del job
+        if (i + 1) % max(1, n_jobs // 20) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            reg = client.get("/api/v1/stats").json()["jobs"]["registry"]
+            print(f"{i + 1:>6} jobs: python {current / 1e6:7.1f} MB; registro {reg['jobs']} jobs, "
+                  f"{reg['memory_bytes'] / 1e3:.0f} kB em memória, {reg['spilled_bytes'] / 1e6:.0f} MB em disco, "
+                  f"{reg['evicted']} despejados")
+        if interval:
+            time.sleep(interval)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
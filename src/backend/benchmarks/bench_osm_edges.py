@@ -0,0 +1,124 @@
+"""
+Benchmark: extração de edges OSM (loop `iterrows()` legado vs pipeline colunar).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_osm_edges.py            # 10k e 100k edges
+    python benchmarks/bench_osm_edges.py 5000 50000
+
+Gera edges sintéticos parecidos com os do OSMnx (highway às vezes em lista, name com NaN,
+algumas MultiLineString) e confere que as duas implementações produzem o mesmo resultado.
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+import time
+import warnings
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import geopandas as gpd  # noqa: E402
+import numpy as np  # noqa: E402
+from pyproj import Transformer  # noqa: E402
+from shapely.geometry import LineString, MultiLineString  # noqa: E402
+
+from backend import api  # noqa: E402
+
+_HIGHWAYS = ["residential", "tertiary", "secondary", "primary", "footway", "service", "living_street"]
+
+
+def _synthetic_edges(n: int, seed: int = 42) -> gpd.GeoDataFrame:
+    rng = np.random.default_rng(seed)
+    lon0, lat0 = -43.18, -22.90  # centro do Rio de Janeiro
+    highway, name, geometry = [], [], []
+    for i in range(n):
+        hw = _HIGHWAYS[i % len(_HIGHWAYS)]
+        highway.append([hw, "service"] if i % 17 == 0 else hw)
+        name.append(float("nan") if i % 3 == 0 else f"Rua {i % 500}")
+        pts = np.column_stack([
+            lon0 + rng.uniform(-0.02, 0.02) + np.cumsum(rng.uniform(-2e-4, 2e-4, 5)),
+            lat0 + rng.uniform(-0.02, 0.02) + np.cumsum(rng.uniform(-2e-4, 2e-4, 5)),
+        ])
+        line = LineString(pts)
+        geometry.append(MultiLineString([line, LineString(pts[::-1])]) if i % 50 == 0 else line)
+    return gpd.GeoDataFrame({"highway": highway, "name": name}, geometry=geometry, crs="EPSG:4326")
+
+
+def _legacy_project_lines_to_xy(lines, transformer):
+    """Cópia da projeção original (uma chamada `shapely.ops.transform` por linha)."""
+    from shapely.ops import transform as shapely_transform
+
+    out = []
+    for line in lines:
+        projected = shapely_transform(transformer.transform, line)
+        coords = [[float(x), float(y)] for (x, y) in projected.coords if math.isfinite(x) and math.isfinite(y)]
+        if len(coords) >= 2:
+            out.append(coords)
+    return out
+
+
+def _legacy_estimate_width_m(row, highway):
+    """Cópia da estimativa original (por linha), com a mesma tabela de larguras do backend."""
+    if not highway:
+        return None
+    return api._HIGHWAY_WIDTH_M.get(highway, api._DEFAULT_WIDTH_M)
+
+
+def _legacy_edges_to_features(edges, transformer):
+    """Cópia do loop original (por linha) de `_prepare_osm_compute`, usada como referência."""
+    features = []
+    for _, row in edges.iterrows():
+        geom = row.geometry
+        highway = row.get("highway")
+        if isinstance(highway, list) and highway:
+            highway = highway[0]
+        name = row.get("name") if row.get("name") is not None else None
+        highway = api._norm_optional_str(highway)
+        name = api._norm_optional_str(name)
+        width_m = _legacy_estimate_width_m(row, highway)
+        if geom.geom_type == "LineString":
+            lines = [geom]
+        elif geom.geom_type == "MultiLineString":
+            lines = list(geom.geoms)
+        else:
+            lines = []
+        for coords_xy in _legacy_project_lines_to_xy(lines, transformer):
+            features.append(
+                api.CadFeature(
+                    feature_type="Polyline",
+                    layer="SISRUA_OSM_VIAS",
+                    name=name,
+                    highway=highway,
+                    width_m=width_m,
+                    coords_xy=coords_xy,
+                )
+            )
+    return features
+
+
+def _timeit(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(a) for a in argv] or [10_000, 100_000]
+    warnings.simplefilter("ignore", DeprecationWarning)  # shapely.ops.transform (só na referência)
+    transformer = Transformer.from_crs("EPSG:4326", "EPSG:31983", always_xy=True)
+    print(f"{'edges':>8} {'legado (s)':>12} {'colunar (s)':>12} {'speedup':>8}")
+    for n in sizes:
+        edges = _synthetic_edges(n)
+        legacy, t_legacy = _timeit(_legacy_edges_to_features, edges, transformer)
+        columnar, t_columnar = _timeit(api._edges_to_features, edges, transformer)
+        assert [f.model_dump() for f in legacy] == columnar, "saídas divergentes"
+        print(f"{n:>8} {t_legacy:>12.3f} {t_columnar:>12.3f} {t_legacy / t_columnar:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
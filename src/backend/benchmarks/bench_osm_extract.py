@@ -0,0 +1,77 @@
+"""
+Benchmark: motor offline de extratos OSM (ingestão única + consultas por raio no índice espacial).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_osm_extract.py            # grade 400x400 (~160k nós, ~320k ways)
+    python benchmarks/bench_osm_extract.py 800
+
+Gera um `.osm` sintético (grade de ruas a cada ~100 m, um poste a cada 7 nós), ingere e mede
+consultas de 500 m e 2 km em pontos aleatórios.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from backend.osm_extract import OsmExtract, ingest  # noqa: E402
+
+_LON0, _LAT0, _STEP = -43.40, -23.00, 0.001
+
+
+def _write_grid(path: Path, n: int) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for i in range(n):
+            for j in range(n):
+                nid = i * n + j + 1
+                tag = '><tag k="highway" v="street_light"/></node>' if nid % 7 == 0 else "/>"
+                f.write(f'<node id="{nid}" lat="{_LAT0 + i * _STEP:.7f}" lon="{_LON0 + j * _STEP:.7f}"{tag}\n')
+        wid = 1
+        for i in range(n):
+            for j in range(n):
+                a = i * n + j + 1
+                for b in ([a + 1] if j + 1 < n else []) + ([a + n] if i + 1 < n else []):
+                    f.write(f'<way id="{wid}"><nd ref="{a}"/><nd ref="{b}"/><tag k="highway" v="residential"/>'
+                            f'<tag k="name" v="Rua {wid % 900}"/></way>\n')
+                    wid += 1
+        f.write("</osm>\n")
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 400
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = Path(tmp) / "grid.osm", Path(tmp) / "grid.sqlite3"
+        _write_grid(src, n)
+        t0 = time.perf_counter()
+        meta = ingest(src, dst)
+        t_ingest = time.perf_counter() - t0
+        print(f"grade {n}x{n}: {meta['ways']:,} ways, {meta['points']:,} pontos; .osm {src.stat().st_size / 1e6:.0f} MB "
+              f"→ store {dst.stat().st_size / 1e6:.0f} MB; ingestão {t_ingest:.1f}s")
+
+        extract = OsmExtract(dst)
+        span = (n - 1) * _STEP
+        for radius in (500, 2000):
+            times, sizes = [], []
+            for _ in range(10):
+                lat = _LAT0 + span * rng.uniform(0.3, 0.7)
+                lon = _LON0 + span * rng.uniform(0.3, 0.7)
+                t0 = time.perf_counter()
+                nodes, edges = extract.query(lat, lon, radius)
+                times.append(time.perf_counter() - t0)
+                sizes.append(len(edges))
+            times.sort()
+            print(f"raio {radius:>5} m: ~{sum(sizes) // len(sizes):,} edges; mediana {times[5] * 1000:.0f} ms, máx {times[-1] * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+"""
+Benchmark: fusão de vias OSM no backend (`merge_edges`).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_osm_merge.py            # malha de 150 x 150 quadras
+    python benchmarks/bench_osm_merge.py 300
+
+Gera uma malha urbana sintética no formato do OSMnx (índice u, v, key; cada quadra nas duas mãos,
+ruas com nome por linha/coluna e alguns trechos sem nome) e mede:
+- `_drop_reverse_edges` + `_merge_contiguous_edges` isolados, em malhas de 1/4, 1/2 e do tamanho pedido
+  (o tempo deve crescer ~linearmente com o número de trechos: µs/edge ~constante);
+- o /api/v1/prepare/osm completo com e sem `merge_edges`: feições, bytes e tempo do backend.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import geopandas as gpd  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import shapely  # noqa: E402
+
+_HIGHWAYS = ["residential", "tertiary", "secondary", "primary"]
+_BLOCK_DEG = 9e-4  # ~100 m
+
+
+def grid_osm_frames(n: int):
+    lon0, lat0 = -43.18 - n * _BLOCK_DEG / 2, -22.90 - n * _BLOCK_DEG / 2
+    node_id = lambda i, j: i * (n + 1) + j  # noqa: E731
+    us, vs, coords, highway, name = [], [], [], [], []
+    for horizontal in (True, False):
+        for i in range(n + 1):
+            for j in range(n):
+                a, b = ((i, j), (i, j + 1)) if horizontal else ((j, i), (j + 1, i))
+                street = f"{'Rua' if horizontal else 'Avenida'} {i}" if j % 17 else None  # alguns trechos sem nome
+                for (ua, ub), (va, vb) in ((a, b), (b, a)):
+                    us.append(node_id(ua, ub))
+                    vs.append(node_id(va, vb))
+                    coords.append([(lon0 + ub * _BLOCK_DEG, lat0 + ua * _BLOCK_DEG), (lon0 + vb * _BLOCK_DEG, lat0 + va * _BLOCK_DEG)])
+                    highway.append(_HIGHWAYS[i % len(_HIGHWAYS)])
+                    name.append(street)
+    edges = gpd.GeoDataFrame(
+        {"highway": highway, "name": name},
+        geometry=shapely.linestrings(np.array(coords)),
+        index=pd.MultiIndex.from_arrays([us, vs, np.zeros(len(us), dtype=np.int64)], names=["u", "v", "key"]),
+        crs="EPSG:4326",
+    )
+    ii, jj = np.divmod(np.arange((n + 1) ** 2), n + 1)
+    nodes = gpd.GeoDataFrame(
+        {"highway": [None] * len(ii)},
+        geometry=shapely.points(lon0 + jj * _BLOCK_DEG, lat0 + ii * _BLOCK_DEG),
+        index=pd.Index(np.arange(len(ii)), name="osmid"),
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 150
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-merge-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    from backend import api
+
+    print(f"\n{'malha':<10} {'edges':>10} {'sem mão dupla':>14} {'fundidas':>10} {'fusão (s)':>10} {'µs/edge':>8}")
+    for size in (n // 4, n // 2, n):
+        _, edges = grid_osm_frames(size)
+        elapsed = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            unique = api._drop_reverse_edges(edges)
+            merged = api._merge_contiguous_edges(unique)
+            elapsed = min(elapsed, time.perf_counter() - t0)
+        # µs/edge ~constante entre as malhas = fusão ~linear (pareamento O(n²) cresceria 4x a cada degrau).
+        print(f"{size}x{size:<6} {len(edges):>10,} {len(unique):>14,} {len(merged):>10,} {elapsed:>10.3f} {elapsed / len(edges) * 1e6:>8.2f}")
+
+    frames = grid_osm_frames(n)
+    osmnx.graph_from_bbox = lambda bbox, **kwargs: object()
+    osmnx.graph_to_gdfs = lambda graph: frames
+    client = TestClient(api.app)
+    radius = n * 100 / 2
+    # Aquece imports e o cache de tiles; as rodadas medidas só refazem o prepare.
+    client.post("/api/v1/prepare/osm", json={"latitude": -22.9 - 1e-5, "longitude": -43.18, "radius": radius})
+
+    print(f"\n{'merge_edges':<12} {'feições':>10} {'bytes':>14} {'backend (s)':>12}")
+    for i, merge in enumerate((False, True)):
+        body = {"latitude": -22.9 + i * 1e-5, "longitude": -43.18, "radius": radius, "merge_edges": merge}
+        t0 = time.perf_counter()
+        r = client.post("/api/v1/prepare/osm", json=body)
+        elapsed = time.perf_counter() - t0
+        print(f"{str(merge):<12} {len(r.json()['features']):>10,} {len(r.content):>14,} {elapsed:>12.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,110 @@
+"""
+Benchmark: pontos OSM → blocos (loop `iterrows()` legado vs regras declarativas).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_osm_points.py            # 10k e 100k nós
+    python benchmarks/bench_osm_points.py 5000 50000
+
+Gera nós sintéticos parecidos com os do OSMnx (a maioria sem tags; ~2% poste/banco, com name NaN
+em parte deles e algumas geometrias que não são Point), aplica as regras padrão
+(`_DEFAULT_OSM_POINT_RULES`) e confere que as duas implementações produzem o mesmo resultado.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import geopandas as gpd  # noqa: E402
+import numpy as np  # noqa: E402
+from pyproj import Transformer  # noqa: E402
+from shapely.geometry import LineString, Point  # noqa: E402
+
+from backend import api  # noqa: E402
+
+# (highway, power, amenity) dos nós que casam; os demais ficam sem tag (NaN), como no OSMnx.
+_MATCHING_TAGS = [("street_light", None, None), (None, "pole", None), (None, None, "bench"), ("crossing", None, "bench")]
+
+
+def _synthetic_nodes(n: int, match_ratio: float = 0.02, seed: int = 42) -> gpd.GeoDataFrame:
+    rng = np.random.default_rng(seed)
+    lon = -43.18 + rng.uniform(-0.02, 0.02, n)
+    lat = -22.90 + rng.uniform(-0.02, 0.02, n)
+    cols = {"highway": [float("nan")] * n, "power": [float("nan")] * n, "amenity": [float("nan")] * n, "name": [float("nan")] * n}
+    for k, i in enumerate(rng.choice(n, size=int(n * match_ratio), replace=False).tolist()):
+        for col, value in zip(("highway", "power", "amenity"), _MATCHING_TAGS[k % len(_MATCHING_TAGS)]):
+            if value is not None:
+                cols[col][i] = value
+        if k % 3:
+            cols["name"][i] = f"Ponto {k}"
+    geometry = [
+        LineString([(x, y), (x + 1e-4, y)]) if i % 997 == 0 else Point(x, y)
+        for i, (x, y) in enumerate(zip(lon.tolist(), lat.tolist()))
+    ]
+    return gpd.GeoDataFrame(cols, geometry=geometry, crs="EPSG:4326")
+
+
+def _legacy_nodes_to_features(nodes, transformer):
+    """Cópia do loop original (por nó, cadeia if/elif) de `_prepare_osm_compute`, usada como referência."""
+    matched_points, matched_attrs = [], []
+    for _, node_row in nodes.iterrows():
+        point_geom = node_row.geometry
+        if point_geom is None or point_geom.geom_type != "Point":
+            continue
+        tags = node_row.to_dict()
+        block_name = None
+        if tags.get("highway") == "street_light":
+            block_name = "POSTE"
+        elif tags.get("power") == "pole":
+            block_name = "POSTE"
+        elif tags.get("amenity") == "bench":
+            block_name = "BANCO"
+        if block_name:
+            matched_points.append(point_geom)
+            matched_attrs.append((api._norm_optional_str(tags.get("name")), block_name))
+
+    features = []
+    for coords, (name, block_name) in zip(api._project_geometries(matched_points, transformer), matched_attrs):
+        if not coords:
+            continue
+        features.append(
+            api.CadFeature(
+                feature_type="Point",
+                layer="SISRUA_OSM_PONTOS",
+                name=name,
+                block_name=block_name,
+                insertion_point_xy=coords[0],
+                rotation=0.0,
+                scale=1.0,
+            )
+        )
+    return features
+
+
+def _timeit(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(a) for a in argv] or [10_000, 100_000]
+    transformer = Transformer.from_crs("EPSG:4326", "EPSG:31983", always_xy=True)
+    rules = api._DEFAULT_OSM_POINT_RULES
+    print(f"{'nós':>8} {'blocos':>8} {'legado (s)':>12} {'regras (s)':>12} {'speedup':>8}")
+    for n in sizes:
+        nodes = _synthetic_nodes(n)
+        legacy, t_legacy = _timeit(_legacy_nodes_to_features, nodes, transformer)
+        ruled, t_ruled = _timeit(api._nodes_to_features, nodes, transformer, rules)
+        assert [f.model_dump() for f in legacy] == ruled, "saídas divergentes"
+        print(f"{n:>8} {len(ruled):>8} {t_legacy:>12.3f} {t_ruled:>12.3f} {t_legacy / t_ruled:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
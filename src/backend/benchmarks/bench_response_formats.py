@@ -0,0 +1,92 @@
+"""
+Benchmark: tamanho do payload e tempo de serialização por formato de resposta do prepare.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_response_formats.py            # 50k features
+    python benchmarks/bench_response_formats.py 10000 100000
+
+Gera um `PrepareResponse` sintético (polylines de vias + alguns blocos) e mede,
+para cada formato, a codificação, a decodificação e o tamanho final em bytes.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import numpy as np  # noqa: E402
+
+from backend import formats  # noqa: E402
+
+_HIGHWAYS = ["residential", "tertiary", "secondary", "primary", "footway", "service"]
+
+
+def synthetic_payload(n: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    features = []
+    for i in range(n):
+        if i % 20 == 0:
+            x, y = rng.uniform(680_000, 690_000), rng.uniform(7_460_000, 7_470_000)
+            features.append({
+                "feature_type": "Point", "layer": "SISRUA_OSM_PONTOS", "name": None, "highway": None,
+                "width_m": None, "coords_xy": None, "insertion_point_xy": [x, y],
+                "block_name": "POSTE", "block_filepath": None, "rotation": 0.0, "scale": 1.0,
+            })
+            continue
+        k = int(rng.integers(2, 12))
+        x0, y0 = rng.uniform(680_000, 690_000), rng.uniform(7_460_000, 7_470_000)
+        coords = np.column_stack([x0 + np.cumsum(rng.normal(0, 15, k)), y0 + np.cumsum(rng.normal(0, 15, k))])
+        features.append({
+            "feature_type": "Polyline", "layer": "SISRUA_OSM_VIAS",
+            "name": None if i % 3 == 0 else f"Rua {i % 800}", "highway": _HIGHWAYS[i % len(_HIGHWAYS)],
+            "width_m": 5.0, "coords_xy": coords.tolist(), "insertion_point_xy": None,
+            "block_name": None, "block_filepath": None, "rotation": None, "scale": None,
+        })
+    return {"crs_out": "EPSG:31983", "features": features, "cache_hit": False}
+
+
+def _encode_features(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _encode_columnar(payload: dict) -> bytes:
+    return json.dumps(formats.to_columnar(payload), ensure_ascii=False).encode("utf-8")
+
+
+ENCODERS = {
+    "features (JSON)": _encode_features,
+    "columnar (JSON)": _encode_columnar,
+    "binary": formats.to_binary,
+}
+
+DECODERS = {
+    "features (JSON)": json.loads,
+    "columnar (JSON)": json.loads,
+    "binary": formats.decode_binary,
+}
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(a) for a in argv] or [50_000]
+    for n in sizes:
+        payload = synthetic_payload(n)
+        print(f"\n{n} features")
+        print(f"{'formato':<20} {'bytes':>14} {'encode (s)':>11} {'decode (s)':>11}")
+        for label, encode in ENCODERS.items():
+            t0 = time.perf_counter()
+            body = encode(payload)
+            t1 = time.perf_counter()
+            DECODERS[label](body)
+            t2 = time.perf_counter()
+            print(f"{label:<20} {len(body):>14,} {t1 - t0:>11.3f} {t2 - t1:>11.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""
+Benchmark: simplificação das polylines no backend (`simplify_tolerance_m`) numa área OSM densa.
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_simplify.py                  # 20k vias; tolerâncias 0 / 0.1 / 0.5 / 1 m
+    python benchmarks/bench_simplify.py 50000 0.2 1.0
+
+Gera edges sintéticos com geometria densa (curvas com um vértice a cada ~1 m, como vias
+desenhadas com muitos nós no OSM), substitui o download do OSMnx por esse grafo e mede, por
+tolerância, o /api/v1/prepare/osm completo: vértices, bytes da resposta, tempo do backend e tempo
+de parse do JSON no cliente (o que o plugin paga antes de desenhar).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import geopandas as gpd  # noqa: E402
+import numpy as np  # noqa: E402
+from shapely.geometry import LineString, Point  # noqa: E402
+
+_HIGHWAYS = ["residential", "tertiary", "secondary", "primary", "footway", "service"]
+
+
+def dense_osm_frames(n: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    lon0, lat0 = -43.18, -22.90
+    geometry, highway, name = [], [], []
+    for i in range(n):
+        # Arco de 60–150 m com ~1 vértice por metro e ruído de GPS de poucos cm.
+        length_deg = rng.uniform(6e-4, 1.5e-3)
+        k = int(length_deg * 1e5)
+        t = np.linspace(0.0, 1.0, k)
+        x0, y0 = lon0 + rng.uniform(-0.02, 0.02), lat0 + rng.uniform(-0.02, 0.02)
+        angle, bend = rng.uniform(0, 2 * np.pi), rng.uniform(-2e-4, 2e-4)
+        xs = x0 + np.cos(angle) * length_deg * t - np.sin(angle) * bend * np.sin(np.pi * t) + rng.normal(0, 3e-7, k)
+        ys = y0 + np.sin(angle) * length_deg * t + np.cos(angle) * bend * np.sin(np.pi * t) + rng.normal(0, 3e-7, k)
+        geometry.append(LineString(np.column_stack((xs, ys))))
+        highway.append(_HIGHWAYS[i % len(_HIGHWAYS)])
+        name.append(f"Rua {i % 700}")
+    edges = gpd.GeoDataFrame({"highway": highway, "name": name}, geometry=geometry, crs="EPSG:4326")
+    nodes = gpd.GeoDataFrame({"highway": ["street_light"] * 10}, geometry=[Point(lon0, lat0)] * 10, crs="EPSG:4326")
+    return nodes, edges
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[0]) if argv else 20_000
+    tolerances = [float(a) for a in argv[1:]] or [0.1, 0.5, 1.0]
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="sisrua-simplify-")
+    os.environ["SISRUA_AUTH_TOKEN"] = ""
+
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    from backend.api import app
+
+    frames = dense_osm_frames(n)
+    osmnx.graph_from_bbox = lambda bbox, **kwargs: object()
+    osmnx.graph_to_gdfs = lambda graph: frames
+    client = TestClient(app)
+
+    # Aquece imports e o cache de tiles da área; as rodadas medidas só refazem o prepare.
+    client.post("/api/v1/prepare/osm", json={"latitude": -22.9 - 1e-5, "longitude": -43.18, "radius": 3000})
+
+    print(f"\n{n} vias densas")
+    print(f"{'tolerância (m)':<15} {'vértices':>12} {'bytes':>14} {'backend (s)':>12} {'parse (s)':>10}")
+    for i, tol in enumerate([0.0, *tolerances]):
+        # Coordenada levemente diferente a cada rodada: nenhuma resposta vem do cache de resultado.
+        body = {"latitude": -22.9 + i * 1e-5, "longitude": -43.18, "radius": 3000, "simplify_tolerance_m": tol or None}
+        t0 = time.perf_counter()
+        r = client.post("/api/v1/prepare/osm", json=body)
+        t1 = time.perf_counter()
+        payload = json.loads(r.content)
+        t2 = time.perf_counter()
+        print(f"{tol:<15g} {payload['vertices_after']:>12,} {len(r.content):>14,} {t1 - t0:>12.3f} {t2 - t1:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Benchmark: prepare OSM completo (JSON) vs streaming (NDJSON).
+
+Uso (a partir de src/backend):
+    python benchmarks/bench_streaming.py            # 100k edges
+    python benchmarks/bench_streaming.py 50000
+
+Cada modo roda em um subprocesso (para o pico de RSS não se misturar), com Uvicorn real e o OSMnx
+substituído por edges sintéticos (sem rede). Mede o tempo até o 1º byte, o tempo total e o
+crescimento do pico de RSS durante a requisição.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+for p in (_ROOT, Path(__file__).resolve().parent):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+
+def _run(mode: str, n: int) -> dict:
+    import socket
+    import threading
+
+    import geopandas as gpd
+    import httpx
+    import osmnx
+    import uvicorn
+
+    from bench_osm_edges import _synthetic_edges
+    from backend import api
+
+    edges = _synthetic_edges(n)
+    nodes = gpd.GeoDataFrame({"highway": []}, geometry=[], crs="EPSG:4326")
+    osmnx.graph_from_bbox = lambda bbox, **kwargs: object()
+    osmnx.graph_to_gdfs = lambda graph: (nodes, edges)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    body = {"latitude": -22.90, "longitude": -43.18, "radius": 2000}
+    url = f"http://127.0.0.1:{port}" + ("/api/v1/prepare/osm/stream" if mode == "stream" else "/api/v1/prepare/osm")
+    t0 = time.perf_counter()
+    first = None
+    size = 0
+    with httpx.stream("POST", url, json=body, timeout=600) as r:
+        for chunk in r.iter_bytes():
+            if first is None:
+                first = time.perf_counter() - t0
+            size += len(chunk)
+    total = time.perf_counter() - t0
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    server.should_exit = True
+    return {"first_s": first, "total_s": total, "bytes": size, "rss_growth_mb": (rss_peak - rss_before) / 1024}
+
+
+def main(argv: list[str]) -> int:
+    if argv and argv[0] == "--run":
+        print(json.dumps(_run(argv[1], int(argv[2]))))
+        return 0
+
+    n = int(argv[0]) if argv else 100_000
+    print(f"{n} edges")
+    print(f"{'modo':<10} {'1º byte (s)':>12} {'total (s)':>10} {'MB':>8} {'pico RSS +MB':>13}")
+    for mode in ("json", "stream"):
+        with tempfile.TemporaryDirectory() as tmp:  # cache vazio em cada modo
+            env = {**os.environ, "LOCALAPPDATA": tmp, "SISRUA_AUTH_TOKEN": ""}
+            out = subprocess.run(
+                [sys.executable, __file__, "--run", mode, str(n)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{mode:<10} {res['first_s']:>12.3f} {res['total_s']:>10.3f} {res['bytes'] / 1e6:>8.1f} {res['rss_growth_mb']:>13.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
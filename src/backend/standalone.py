@@ -9,8 +9,10 @@ from __future__ import annotations
 
 import argparse
 import logging
+import multiprocessing
 import os
 import sys
+import threading
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
@@ -89,11 +91,32 @@ def _configure_proj_data_dir() -> None:
         return
 
 
+def _start_transformer_prewarm(prewarm) -> None:
+    """
+    Pré-carrega os Transformers em thread daemon: o Uvicorn sobe sem esperar o PROJ.
+    """
+    def _run() -> None:
+        try:
+            created = prewarm()
+            logging.getLogger("sisrua").info("Transformers UTM pré-carregados: %s", created)
+        except Exception:
+            # Sem prewarm o backend funciona igual; o Transformer é criado na 1ª requisição.
+            logging.getLogger("sisrua").warning("Falha ao pré-carregar Transformers UTM.", exc_info=True)
+
+    threading.Thread(target=_run, name="sisrua-prewarm-utm", daemon=True).start()
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="sisRUA backend (standalone)")
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--log-level", default="warning")
+    parser.add_argument(
+        "--prewarm-utm",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Pré-carrega (em background) os Transformers SIRGAS 2000 / UTM 18S..25S no startup.",
+    )
     args = parser.parse_args(argv)
 
     log_config = _configure_logging(args.log_level)
@@ -122,12 +145,19 @@ def main(argv: list[str] | None = None) -> int:
         # Se falhar no dev (sem deps), não impede rodar endpoints que não dependem de OSM.
         pass
 
-    from backend.api import app  # noqa: WPS433 (import local intencional para empacotamento)
+    from backend.api import app, prewarm_process_pool, prewarm_transformers  # noqa: WPS433 (import local intencional para empacotamento)
+
+    if args.prewarm_utm:
+        _start_transformer_prewarm(prewarm_transformers)
+    # Com SISRUA_JOB_EXECUTOR=process, sobe os workers (OSMnx/GeoPandas/pyproj já importados) antes do 1º job.
+    prewarm_process_pool()
 
     uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level, log_config=log_config, access_log=False)
     return 0
 
 
 if __name__ == "__main__":
+    # Necessário no EXE (PyInstaller) para os processos workers dos jobs (spawn).
+    multiprocessing.freeze_support()
     raise SystemExit(main())
 
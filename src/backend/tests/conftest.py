@@ -1,8 +1,26 @@
+import importlib
 import sys
 from pathlib import Path
 
+import pytest
+
 # Garante que `backend` (src/backend/backend) seja importável quando pytest roda a partir do repo.
 _ROOT = Path(__file__).resolve().parents[1]
 if str(_ROOT) not in sys.path:
     sys.path.insert(0, str(_ROOT))
 
+
+@pytest.fixture()
+def api_mod(tmp_path, monkeypatch):
+    """
+    `backend.api` recarregado com cache/jobs em `tmp_path` e sem token: lê env e zera os globais
+    (cache, agendador, registro de jobs). Variáveis extras (ex.: SISRUA_JOB_WORKERS) vão num fixture
+    autouse do arquivo de teste, que roda antes deste.
+    """
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    monkeypatch.setenv("SISRUA_AUTH_TOKEN", "")
+    from backend import api as api_mod  # noqa: WPS433 (import local intencional)
+
+    importlib.reload(api_mod)
+    yield api_mod
+    api_mod.shutdown_process_pool()
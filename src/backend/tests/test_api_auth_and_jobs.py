@@ -95,102 +95,26 @@ def test_jobs_require_token(client):
 
 
 def test_create_prepare_job_osm_blocks_completes(client, api_mod, monkeypatch):
-    # Mock osmnx calls since it's not installed in CI
-    # Need to set up mocks before any osmnx calls
+    # Mock osmnx calls (sem rede): graph_to_gdfs devolve GeoDataFrames reais, como o OSMnx.
+    import geopandas as gpd
     from shapely.geometry import Point, LineString
-    
-    class MockNode:
-        def __init__(self, osmid, x, y, tags):
-            self.osmid = osmid
-            self.x = x
-            self.y = y
-            self.geometry = Point(x, y)
-            self.tags = tags
-
-        def to_dict(self):
-            return self.tags
-
-    class MockEdge:
-        def __init__(self, u, v, key, geometry, tags):
-            self.u = u
-            self.v = v
-            self.key = key
-            self.geometry = geometry
-            self.tags = tags
-
-        def to_dict(self):
-            return self.tags
-
-    class MockRow:
-        """Mock para uma linha retornada por iterrows()"""
-        def __init__(self, item):
-            self._item = item
-            self.geometry = item.geometry if hasattr(item, 'geometry') else None
-            # Make tags accessible as attributes for get() method
-            if hasattr(item, 'tags'):
-                self._tags = item.tags
-                for key, value in item.tags.items():
-                    setattr(self, key, value)
-            else:
-                self._tags = {}
-        
-        def get(self, key, default=None):
-            # First try as attribute
-            if hasattr(self, key) and not key.startswith('_'):
-                return getattr(self, key)
-            # Then try tags
-            if hasattr(self, '_tags'):
-                return self._tags.get(key, default)
-            return default
-        
-        def to_dict(self):
-            # Return tags dictionary directly
-            if hasattr(self, '_tags'):
-                return self._tags.copy()
-            if hasattr(self._item, 'to_dict'):
-                return self._item.to_dict()
-            return {}
-    
-    class MockGeometrySeries:
-        """Mock para edges.geometry que retorna uma série com notna()"""
-        def __init__(self, gdf):
-            self._gdf = gdf
-        
-        def notna(self):
-            # Retorna uma lista booleana que pode ser usada para indexação
-            return [True] * len(self._gdf._data)
-    
-    class MockGDF:
-        def __init__(self, data):
-            self._data = data
-            self._geometry_series = MockGeometrySeries(self)
-
-        def iterrows(self):
-            for item in self._data:
-                yield None, MockRow(item) # row_idx, row_series
-
-        @property
-        def geometry(self):
-            return self._geometry_series
-        
-        def __getitem__(self, key):
-            # Quando indexado com lista booleana (resultado de notna()), retorna o próprio objeto
-            # Isso simula edges[edges.geometry.notna()] retornando edges (todos passam)
-            if isinstance(key, list) and len(key) == len(self._data) and all(isinstance(x, bool) for x in key):
-                return self
-            return self
-
-    mock_nodes_data = [
-        MockNode(1, -41.3235, -21.7634, {"highway": "street_light", "name": "Poste A"}),
-        MockNode(2, -41.3230, -21.7630, {"power": "pole", "name": "Poste B"}),
-        MockNode(3, -41.3232, -21.7632, {"amenity": "bench", "name": "Banco C"}),
-    ]
-    mock_edges_data = [
-        MockEdge(1, 2, 0, LineString([[-41.3235, -21.7634], [-41.3230, -21.7630]]), {"highway": "residential", "name": "Rua D"}),
-    ]
-
-    mock_nodes_gdf = MockGDF(mock_nodes_data)
-    mock_edges_gdf = MockGDF(mock_edges_data)
+
+    mock_nodes_gdf = gpd.GeoDataFrame(
+        {
+            "highway": ["street_light", None, None],
+            "power": [None, "pole", None],
+            "amenity": [None, None, "bench"],
+            "name": ["Poste A", "Poste B", "Banco C"],
+        },
+        geometry=[Point(-41.3235, -21.7634), Point(-41.3230, -21.7630), Point(-41.3232, -21.7632)],
+        index=[1, 2, 3],
+        crs="EPSG:4326",
+    )
+    mock_edges_gdf = gpd.GeoDataFrame(
+        {"highway": ["residential"], "name": ["Rua D"]},
+        geometry=[LineString([[-41.3235, -21.7634], [-41.3230, -21.7630]])],
+        crs="EPSG:4326",
+    )
 
     # Create a mock graph object that can be passed to graph_to_gdfs
     class MockGraph:
@@ -198,7 +122,7 @@ def test_create_prepare_job_osm_blocks_completes(client, api_mod, monkeypatch):
     
     mock_graph = MockGraph()
 
-    def mock_graph_from_point(point, dist, network_type):
+    def mock_graph_from_bbox(bbox, **kwargs):
         return mock_graph
 
     def mock_graph_to_gdfs(graph):
@@ -206,7 +130,7 @@ def test_create_prepare_job_osm_blocks_completes(client, api_mod, monkeypatch):
 
     # Mock osmnx module - it's already imported in _import_api_with_token, so we patch it
     import osmnx
-    monkeypatch.setattr(osmnx, "graph_from_point", mock_graph_from_point)
+    monkeypatch.setattr(osmnx, "graph_from_bbox", mock_graph_from_bbox)
     monkeypatch.setattr(osmnx, "graph_to_gdfs", mock_graph_to_gdfs)
 
     # Latitude/Longitude em área que deve conter street_lights/poles
@@ -327,3 +251,470 @@ def test_create_prepare_job_geojson_blocks_completes(client, api_mod):
     assert f_polyline["name"] == "Rua Teste"
     assert "coords_xy" in f_polyline
 
+
+
+def test_transformer_cache_counts_hits_and_misses(client, api_mod):
+    headers = {"X-SisRua-Token": "test-token-123"}
+    for i in range(3):
+        # Nomes diferentes: corpos diferentes, sem cache de resultado (cada POST projeta de novo).
+        feature = {
+            "type": "Feature",
+            "properties": {"name": f"Rua Teste {i}"},
+            "geometry": {"type": "LineString", "coordinates": [[-41.3235, -21.7634], [-41.3234, -21.7633]]},
+        }
+        r = client.post("/api/v1/prepare/geojson", json={"geojson": feature}, headers=headers)
+        assert r.status_code == 200
+        assert r.json()["crs_out"] == "EPSG:31984"
+
+    r = client.get("/api/v1/stats", headers=headers)
+    assert r.status_code == 200
+    stats = r.json()["transformers"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    assert stats["epsg"] == [31984]
+
+    assert api_mod.prewarm_transformers() == len(api_mod.BRAZIL_UTM_ZONES) - 1
+    assert client.get("/api/v1/stats").status_code == 401
+
+
+def test_prepare_geojson_columnar_format(client):
+    from backend.formats import ColumnarPrepareResponse, from_columnar
+
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "V_TEST", "name": "Rua Teste", "highway": "residential"},
+                "geometry": {"type": "LineString", "coordinates": [[-41.3236, -21.7635], [-41.3234, -21.7633], [-41.3232, -21.7631]]},
+            },
+            {
+                "type": "Feature",
+                "properties": {"layer": "V_TEST", "block_name": "POSTE", "rotation": 45.0},
+                "geometry": {"type": "Point", "coordinates": [-41.3235, -21.7634]},
+            },
+            {
+                "type": "Feature",
+                "properties": {"layer": "V_TEST", "highway": "residential"},
+                "geometry": {"type": "LineString", "coordinates": [[-41.3236, -21.7635], [-41.3234, -21.7633]]},
+            },
+        ],
+    }
+    headers = {"X-SisRua-Token": "test-token-123"}
+    plain = client.post("/api/v1/prepare/geojson", json={"geojson": geojson}, headers=headers).json()
+    r = client.post("/api/v1/prepare/geojson?format=columnar", json={"geojson": geojson}, headers=headers)
+    assert r.status_code == 200
+    col = ColumnarPrepareResponse(**r.json())
+
+    assert col.crs_out == plain["crs_out"]
+    assert col.strings["layer"] == ["V_TEST"]
+    assert col.strings["highway"] == ["residential"]
+    assert col.polylines.count == 2 and col.polylines.offsets == [0, 3, 5]
+    assert col.polylines.name == [0, -1]
+    assert col.points.count == 1 and col.strings["block_name"] == ["POSTE"]
+
+    # Mesmo conteúdo lógico: polylines primeiro, depois pontos.
+    def _key(f):
+        return f["feature_type"] == "Point"
+
+    assert from_columnar(r.json())["features"] == sorted(plain["features"], key=_key)
+
+    bad = client.post("/api/v1/prepare/geojson?format=xml", json={"geojson": geojson}, headers=headers)
+    assert bad.status_code == 422
+
+
+def test_prepare_and_job_result_binary_format(client):
+    import numpy as np
+    from backend.formats import BINARY_MEDIA_TYPE, decode_binary
+
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "V_TEST", "name": "Rua Teste", "highway": "residential"},
+                "geometry": {"type": "LineString", "coordinates": [[-41.3236, -21.7635], [-41.3234, -21.7633], [-41.3232, -21.7631]]},
+            },
+            {
+                "type": "Feature",
+                "properties": {"block_name": "POSTE"},
+                "geometry": {"type": "Point", "coordinates": [-41.3235, -21.7634]},
+            },
+        ],
+    }
+    headers = {"X-SisRua-Token": "test-token-123"}
+    plain = client.post("/api/v1/prepare/geojson", json={"geojson": geojson}, headers=headers).json()
+
+    r = client.post("/api/v1/prepare/geojson", json={"geojson": geojson}, headers={**headers, "Accept": BINARY_MEDIA_TYPE})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == BINARY_MEDIA_TYPE
+    decoded = decode_binary(r.content)
+    assert decoded["crs_out"] == plain["crs_out"]
+    assert decoded["polylines"]["coords"].dtype == np.dtype("<f8")
+    assert list(decoded["polylines"]["offsets"]) == [0, 3]
+    assert decoded["polylines"]["coords"].reshape(-1, 2).tolist() == plain["features"][0]["coords_xy"]
+    assert np.isnan(decoded["polylines"]["width_m"][0])
+    assert decoded["points"]["xy"].tolist() == plain["features"][1]["insertion_point_xy"]
+
+    assert np.isnan(decoded["points"]["rotation"][0])
+    assert decoded["strings"]["name"] == ["Rua Teste"]
+    assert decoded["strings"]["block_name"] == ["POSTE"]
+    assert decoded["points"]["block_name"].tolist() == [0]
+
+    # Resultado de job no mesmo formato
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "geojson", "geojson": geojson}, headers=headers).json()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        r = client.get(f"/api/v1/jobs/{job['job_id']}/result?format=binary", headers=headers)
+        if r.status_code != 409:
+            break
+        time.sleep(0.05)
+    assert r.status_code == 200
+    assert decode_binary(r.content)["polylines"]["coords"].tolist() == decoded["polylines"]["coords"].tolist()
+
+    assert client.get("/api/v1/jobs/nope/result", headers=headers).status_code == 404
+
+
+def test_job_status_polling_etag_and_ranged_result(client, api_mod, monkeypatch):
+    import json
+
+    from backend.formats import decode_binary
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "LOTES", "name": f"L{i}"},
+                "geometry": {"type": "LineString", "coordinates": [[-41.3236 + i * 1e-5, -21.7635], [-41.3234 + i * 1e-5, -21.7633]]},
+            }
+            for i in range(25)
+        ],
+    }
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "geojson", "geojson": geojson}, headers=headers).json()
+    deadline = time.time() + 10
+    while True:
+        r = client.get(f"/api/v1/jobs/{job['job_id']}/status", headers=headers)
+        assert r.status_code == 200 and "result" not in r.json()
+        if r.json()["status"] == "completed" or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    assert r.json()["status"] == "completed" and r.json()["progress"] == 1.0
+
+    # Status inalterado: 304 sem corpo; ETag diferente: corpo completo.
+    etag = r.headers["etag"]
+    again = client.get(f"/api/v1/jobs/{job['job_id']}/status", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert client.get(f"/api/v1/jobs/{job['job_id']}/status", headers={**headers, "If-None-Match": '"outro"'}).status_code == 200
+    assert client.get("/api/v1/jobs/nope/status", headers=headers).status_code == 404
+
+    full = client.get(f"/api/v1/jobs/{job['job_id']}/result", headers=headers).json()["features"]
+    loads = []
+    monkeypatch.setattr(api_mod, "_json_loads", lambda data: loads.append(1) or json.loads(data))
+    pieces, offset = [], 0
+    while offset is not None:
+        r = client.get(f"/api/v1/jobs/{job['job_id']}/result?offset={offset}&limit=10", headers=headers)
+        assert r.status_code == 200 and r.headers["x-sisrua-total-features"] == "25"
+        # Metadados do resultado completo (simplificação) vêm em cada pedaço.
+        assert {k: r.json()[k] for k in ("simplify_tolerance_m", "vertices_before", "vertices_after")} == {
+            "simplify_tolerance_m": None, "vertices_before": 50, "vertices_after": 50,
+        }
+        pieces.append(r.json()["features"])
+        offset = int(r.headers["x-sisrua-next-offset"]) if "x-sisrua-next-offset" in r.headers else None
+    assert [len(p) for p in pieces] == [10, 10, 5]
+    assert [f for p in pieces for f in p] == full
+    assert len(loads) == 1  # o resultado é decodificado uma vez para todos os pedaços
+
+    r = client.get(f"/api/v1/jobs/{job['job_id']}/result?format=binary&offset=20", headers=headers)
+    decoded = decode_binary(r.content)
+    assert len(decoded["polylines"]["offsets"]) == 5 + 1 and decoded["vertices_after"] == 50
+    assert client.get(f"/api/v1/jobs/{job['job_id']}/result?offset=-1", headers=headers).status_code == 422
+
+
+def test_prepare_osm_stream_ndjson(client, monkeypatch):
+    import json
+
+    import geopandas as gpd
+    import osmnx
+    from shapely.geometry import LineString, Point
+
+    nodes = gpd.GeoDataFrame(
+        {"highway": ["street_light", None], "name": ["Poste A", None]},
+        geometry=[Point(-41.3235, -21.7634), Point(-41.3230, -21.7630)],
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {"highway": ["residential", "primary"], "name": ["Rua D", None]},
+        geometry=[
+            LineString([[-41.3235, -21.7634], [-41.3230, -21.7630]]),
+            LineString([[-41.3230, -21.7630], [-41.3225, -21.7625]]),
+        ],
+        crs="EPSG:4326",
+    )
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: (nodes, edges))
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    body = {"latitude": -21.7634, "longitude": -41.3235, "radius": 100}
+    with client.stream("POST", "/api/v1/prepare/osm/stream", json=body, headers=headers) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in r.iter_lines() if line]
+
+    *features, trailer = records
+    assert [f["feature_type"] for f in features] == ["Polyline", "Polyline", "Point"]
+    assert trailer == {"type": "trailer", "crs_out": "EPSG:31984", "cache_hit": False, "count": 3,
+                       "simplify_tolerance_m": None, "vertices_before": 4, "vertices_after": 4}
+
+    # O stream grava o cache: a mesma consulta (não streaming) vem do cache com o mesmo conteúdo.
+    cached = client.post("/api/v1/prepare/osm", json=body, headers=headers).json()
+    assert cached["cache_hit"] is True
+    assert cached["features"] == features
+
+
+def test_prepare_geojson_stream_matches_plain(client):
+    import json
+
+    geojson = {
+        "type": "Feature",
+        "properties": {"name": "Rua Teste"},
+        "geometry": {"type": "MultiLineString", "coordinates": [
+            [[-41.3236, -21.7635], [-41.3234, -21.7633]],
+            [[-41.3234, -21.7633], [-41.3232, -21.7631]],
+        ]},
+    }
+    headers = {"X-SisRua-Token": "test-token-123"}
+    plain = client.post("/api/v1/prepare/geojson", json={"geojson": geojson}, headers=headers).json()
+    r = client.post("/api/v1/prepare/geojson/stream", json={"geojson": geojson}, headers=headers)
+    assert r.status_code == 200
+    records = [json.loads(line) for line in r.text.splitlines()]
+    assert records[:-1] == plain["features"]
+    assert records[-1]["type"] == "trailer" and records[-1]["count"] == 2
+
+    bad = client.post("/api/v1/prepare/geojson/stream", json={"geojson": {"type": "Point"}}, headers=headers)
+    assert bad.status_code == 400
+
+
+def test_prepare_osm_cache_hit_serves_compressed_bytes(client, api_mod, monkeypatch):
+    import gzip
+    import json
+
+    import geopandas as gpd
+    import osmnx
+    from shapely.geometry import LineString
+
+    calls = []
+    edges = gpd.GeoDataFrame(
+        {"highway": ["residential"] * 200, "name": ["Rua Longa"] * 200},
+        geometry=[LineString([[-41.3235, -21.7634], [-41.3230 + i * 1e-5, -21.7630]]) for i in range(200)],
+        crs="EPSG:4326",
+    )
+    nodes = gpd.GeoDataFrame({"highway": []}, geometry=[], crs="EPSG:4326")
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: calls.append(1) or object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: (nodes, edges))
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    body = {"latitude": -21.7634, "longitude": -41.3235, "radius": 100}
+    first = client.post("/api/v1/prepare/osm", json=body, headers=headers).json()
+    assert first["cache_hit"] is False
+
+    # Hit: bytes gzip do cache, sem decodificar (o TestClient descomprime de forma transparente).
+    monkeypatch.setattr(api_mod, "_json_loads", lambda data: pytest.fail("cache hit decodificou o JSON"))
+    r = client.post("/api/v1/prepare/osm", json=body, headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json() == {**first, "cache_hit": True}
+    r = client.post("/api/v1/prepare/osm", json=body, headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.json()["features"] == first["features"]
+
+    # Job com cache hit: o resultado é o JSON guardado, também sem recomputar.
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", **body}, headers=headers).json()
+    for _ in range(50):
+        status = client.get(f"/api/v1/jobs/{job['job_id']}", headers=headers).json()
+        if status["status"] == "completed":
+            break
+        time.sleep(0.05)
+    assert status["result"]["features"] == first["features"]
+    assert calls == [1]
+
+    stored = api_mod._cache_store().get(api_mod._osm_cache_key(-21.7634, -41.3235, 100))
+    assert len(stored) < len(json.dumps(first)) / 4
+    assert json.loads(gzip.decompress(stored))["cache_hit"] is True
+
+
+def test_prepare_geojson_cache_hit_by_raw_body_hash(client, api_mod, monkeypatch):
+    import json
+
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": {"name": "Rua R"},
+             "geometry": {"type": "LineString", "coordinates": [[-41.3235, -21.7634], [-41.3230, -21.7630]]}},
+        ],
+    }
+    headers = {"X-SisRua-Token": "test-token-123", "Content-Type": "application/json"}
+    body = json.dumps({"geojson": geojson}).encode("utf-8")
+    first = client.post("/api/v1/prepare/geojson", content=body, headers=headers)
+    assert first.status_code == 200
+    assert first.json()["cache_hit"] is False
+
+    # Mesmo corpo: hit sem parse do JSON nem projeção.
+    with monkeypatch.context() as m:
+        m.setattr(api_mod, "_parse_body", lambda model, body: pytest.fail("hit fez o parse do corpo"))
+        m.setattr(api_mod, "_start_geojson_prepare", lambda *a, **k: pytest.fail("hit recomputou"))
+        again = client.post("/api/v1/prepare/geojson", content=body, headers=headers)
+        assert again.json() == {**first.json(), "cache_hit": True}
+        columnar = client.post("/api/v1/prepare/geojson?format=columnar", content=body, headers=headers).json()
+        assert columnar["cache_hit"] is True and columnar["polylines"]["count"] == 1
+
+    # Job de GeoJSON: hash do próprio corpo do job; a 2ª submissão idêntica sai do cache.
+    job_body = json.dumps({"kind": "geojson", "geojson": geojson}).encode("utf-8")
+    results = []
+    for _ in range(2):
+        job = client.post("/api/v1/jobs/prepare", content=job_body, headers=headers).json()
+        for _ in range(100):
+            status = client.get(f"/api/v1/jobs/{job['job_id']}", headers=headers).json()
+            if status["status"] == "completed":
+                break
+            time.sleep(0.05)
+        results.append(status["result"])
+    assert [r["cache_hit"] for r in results] == [False, True]
+    assert results[0]["features"] == results[1]["features"] == first.json()["features"]
+
+
+def test_raw_body_endpoints_validate_like_fastapi(client):
+    headers = {"X-SisRua-Token": "test-token-123"}
+    r = client.post("/api/v1/jobs/prepare", json={"geojson": {}}, headers=headers)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["body", "kind"]
+    r = client.post("/api/v1/prepare/geojson", content=b"{not json", headers={**headers, "Content-Type": "application/json"})
+    assert r.status_code == 422
+    schema = client.get("/openapi.json").json()["paths"]["/api/v1/prepare/geojson"]["post"]["requestBody"]
+    assert "geojson" in schema["content"]["application/json"]["schema"]["properties"]
+
+
+def test_sync_prepare_endpoints_keep_event_loop_responsive(api_mod, monkeypatch):
+    import threading
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    entered, release = threading.Event(), threading.Event()
+
+    def _blocked(*args, **kwargs):
+        entered.set()
+        assert release.wait(10)  # download/projeção "presos" até o teste liberar
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", _blocked)
+    monkeypatch.setattr(api_mod, "_prepare_geojson_compute", _blocked)
+    geojson = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {}, "geometry": {"type": "LineString", "coordinates": [[-43.2, -22.9], [-43.1, -22.8]]}},
+    ]}
+
+    # `with`: um único event loop (portal) para todas as requisições, como no uvicorn.
+    with TestClient(api_mod.app) as client:
+        for path, body in (
+            ("/api/v1/prepare/osm", {"latitude": -22.9, "longitude": -43.2, "radius": 100}),
+            ("/api/v1/prepare/geojson", {"geojson": geojson}),
+        ):
+            entered.clear()
+            release.clear()
+            results = {}
+            worker = threading.Thread(target=lambda: results.update(r=client.post(path, json=body, headers=headers)))
+            worker.start()
+            try:
+                assert entered.wait(5)
+                # Com o prepare parado dentro do compute, o event loop ainda atende (senão o health ficaria preso).
+                health = {}
+                probe = threading.Thread(target=lambda: health.update(r=client.get("/api/v1/health")))
+                probe.start()
+                probe.join(5)
+                assert not probe.is_alive() and health["r"].status_code == 200, path
+                assert worker.is_alive()
+            finally:
+                release.set()
+            worker.join(5)
+            assert results["r"].status_code == 200
+
+
+def test_prepare_osm_simplify_tolerance_reports_vertex_counts(client, monkeypatch):
+    import geopandas as gpd
+    import numpy as np
+    import osmnx
+    from shapely.geometry import LineString, Point
+
+    # Via curva com um vértice a cada ~1 m (como ruas densas do OSM).
+    t = np.linspace(0, np.pi, 400)
+    curve = LineString(np.column_stack((-41.3240 + 0.004 * t / np.pi, -21.7630 + 0.0005 * np.sin(t))))
+    nodes = gpd.GeoDataFrame({"highway": ["street_light"]}, geometry=[Point(-41.3235, -21.7634)], crs="EPSG:4326")
+    edges = gpd.GeoDataFrame({"highway": ["residential"], "name": ["Rua Curva"]}, geometry=[curve], crs="EPSG:4326")
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: (nodes, edges))
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    body = {"latitude": -21.7634, "longitude": -41.3235, "radius": 300}
+    plain = client.post("/api/v1/prepare/osm", json=body, headers=headers)
+    simple = client.post("/api/v1/prepare/osm", json={**body, "simplify_tolerance_m": 0.5}, headers=headers)
+    p, s = plain.json(), simple.json()
+
+    assert p["simplify_tolerance_m"] is None and p["vertices_before"] == p["vertices_after"] == 400
+    assert s["cache_hit"] is False  # tolerância faz parte da chave do cache
+    assert s["simplify_tolerance_m"] == 0.5 and s["vertices_before"] == 400 and s["vertices_after"] < 40
+    line = next(f for f in s["features"] if f["feature_type"] == "Polyline")
+    assert len(line["coords_xy"]) == s["vertices_after"]
+    assert [f for f in s["features"] if f["feature_type"] == "Point"] == [f for f in p["features"] if f["feature_type"] == "Point"]
+    assert len(simple.content) < len(plain.content) / 5
+
+    col = client.post("/api/v1/prepare/osm?format=columnar", json={**body, "simplify_tolerance_m": 0.5}, headers=headers).json()
+    assert col["cache_hit"] is True and col["vertices_after"] == s["vertices_after"]
+
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", **body, "simplify_tolerance_m": 0.5}, headers=headers).json()
+    deadline = time.monotonic() + 5
+    while job["status"] != "completed":
+        assert time.monotonic() < deadline
+        job = client.get(f"/api/v1/jobs/{job['job_id']}", headers=headers).json()
+    assert job["result"]["vertices_after"] == s["vertices_after"] and job["result"]["cache_hit"] is True
+
+
+def test_prepare_osm_merge_edges_drops_reverse_duplicates_and_joins_blocks(client, monkeypatch):
+    import geopandas as gpd
+    import osmnx
+    import pandas as pd
+    from shapely.geometry import LineString, Point
+
+    # Uma rua de mão dupla com 6 quadras (12 edges, como o OSMnx devolve) e uma transversal no meio.
+    pts = [(-41.3240 + i * 2e-4, -21.7634) for i in range(7)]
+    rows, index = [], []
+    for i in range(6):
+        for u, v in ((i, i + 1), (i + 1, i)):
+            rows.append({"highway": "residential", "name": "Rua Longa", "geometry": LineString([pts[u], pts[v]])})
+            index.append((u, v, 0))
+    rows.append({"highway": "service", "name": None, "geometry": LineString([pts[3], (pts[3][0], -21.7630)])})
+    index.append((3, 99, 0))
+    edges = gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:4326")
+    edges.index = pd.MultiIndex.from_tuples(index, names=["u", "v", "key"])
+    # Nós com índice osmid: o recorte por tiles só mantém edges com u/v presentes.
+    nodes = gpd.GeoDataFrame(
+        {"highway": [None] * 8}, geometry=[Point(p) for p in pts] + [Point(pts[3][0], -21.7630)],
+        index=pd.Index([*range(7), 99], name="osmid"), crs="EPSG:4326",
+    )
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: (nodes, edges))
+
+    headers = {"X-SisRua-Token": "test-token-123"}
+    body = {"latitude": -21.7634, "longitude": -41.3235, "radius": 300}
+    plain = client.post("/api/v1/prepare/osm", json=body, headers=headers).json()
+    merged = client.post("/api/v1/prepare/osm", json={**body, "merge_edges": True}, headers=headers).json()
+
+    plain_lines = [f for f in plain["features"] if f["feature_type"] == "Polyline"]
+    lines = [f for f in merged["features"] if f["feature_type"] == "Polyline"]
+    assert len(plain_lines) == 13 and merged["cache_hit"] is False  # a opção faz parte da chave do cache
+    assert [(f["name"], f["highway"], len(f["coords_xy"])) for f in lines] == [("Rua Longa", "residential", 7), (None, "service", 2)]
+    assert lines[0]["coords_xy"][0] == plain_lines[0]["coords_xy"][0] and lines[0]["width_m"] == plain_lines[0]["width_m"]
+
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", **body, "merge_edges": True}, headers=headers).json()
+    deadline = time.monotonic() + 5
+    while job["status"] != "completed":
+        assert time.monotonic() < deadline
+        job = client.get(f"/api/v1/jobs/{job['job_id']}", headers=headers).json()
+    assert job["result"]["cache_hit"] is True and job["result"]["features"] == merged["features"]
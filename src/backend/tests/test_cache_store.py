@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from backend.cache_store import CacheStore
+
+
+@pytest.fixture()
+def store(tmp_path):
+    s = CacheStore(tmp_path / "cache.sqlite3", max_bytes=1000, ttl_s=None)
+    yield s
+    s.close()
+
+
+def test_lru_eviction_respects_byte_budget(store, monkeypatch):
+    clock = iter(range(1, 100))
+    monkeypatch.setattr("backend.cache_store.time.time", lambda: float(next(clock)))
+
+    store.put("a", b"x" * 400)
+    store.put("b", b"y" * 400)
+    assert store.get("a") == b"x" * 400  # "a" passa a ser o mais recente
+    store.put("c", b"z" * 400)  # estoura o orçamento: sai "b" (LRU)
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    st = store.stats()
+    assert st["bytes"] == 800 and st["entries"] == 2 and st["evictions"] == 1
+    assert store.put("grande", b"g" * 1001) is False
+
+
+def test_ttl_expires_entries(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("backend.cache_store.time.time", lambda: now[0])
+
+    store.put("k", b"v", ttl_s=10)
+    assert store.get("k") == b"v"
+    now[0] += 11
+    assert store.get("k") is None
+    st = store.stats()
+    assert st["expired"] == 1 and st["entries"] == 0 and st["hits"] == 1 and st["misses"] == 1
+
+
+def test_concurrent_writes_do_not_corrupt(tmp_path):
+    store = CacheStore(tmp_path / "cache.sqlite3", max_bytes=10_000_000, ttl_s=None)
+
+    def _writer(t):
+        for i in range(50):
+            store.put(f"k{i % 10}", bytes([t]) * 1000)
+
+    threads = [threading.Thread(target=_writer, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i in range(10):
+        value = store.get(f"k{i}")
+        assert len(value) == 1000 and len(set(value)) == 1  # sempre a gravação inteira de uma thread
+    assert store.stats()["bytes"] == 10_000
+    store.close()
+
+    reopened = CacheStore(tmp_path / "cache.sqlite3", ttl_s=None)
+    assert reopened.stats()["entries"] == 10 and reopened.stats()["bytes"] == 10_000
+    reopened.close()
+
+
+def test_byte_budget_holds_across_stores_sharing_the_file(tmp_path):
+    # Dois stores no mesmo arquivo = API + worker do modo processo: cada um só via as próprias gravações.
+    path = tmp_path / "cache.sqlite3"
+    api_side = CacheStore(path, max_bytes=1000, ttl_s=None)
+    worker_side = CacheStore(path, max_bytes=1000, ttl_s=None)
+    for i in range(6):
+        (api_side if i % 2 else worker_side).put(f"k{i}", bytes([i]) * 300)
+
+    for s in (api_side, worker_side):
+        st = s.stats()
+        assert st["bytes"] <= 1000 and st["entries"] == 3
+    assert [k for k in (f"k{i}" for i in range(6)) if api_side.get(k) is not None] == ["k3", "k4", "k5"]
+    api_side.close()
+    worker_side.close()
+
+
+def test_api_cache_purges_legacy_json_files(api_mod):
+    # `api_mod` (conftest) aponta LOCALAPPDATA para o tmp_path do teste.
+    # Formato antigo (um JSON por chave, sem versão do pipeline na chave): inalcançável, é apagado ao abrir o store.
+    legacy = api_mod._cache_dir() / "abc.json"
+    legacy.write_text('{"crs_out": "EPSG:31984", "features": [], "cache_hit": null}', encoding="utf-8")
+
+    assert api_mod._read_cache("abc") is None
+    assert not legacy.exists()
+    api_mod._write_cache("abc", {"crs_out": "EPSG:31984", "features": [], "cache_hit": True})
+    assert api_mod._read_cache("abc")["cache_hit"] is True
+
+    from fastapi.testclient import TestClient
+
+    stats = TestClient(api_mod.app).get("/api/v1/stats").json()["cache"]
+    assert stats["entries"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
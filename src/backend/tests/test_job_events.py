@@ -0,0 +1,81 @@
+import json
+import time
+
+
+def _sse_events(response):
+    event, data = None, []
+    for line in response.iter_lines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+
+def test_osm_pipeline_reports_real_stages(api_mod, monkeypatch):
+    import geopandas as gpd
+    import osmnx
+    from shapely.geometry import LineString, Point
+
+    pts = [Point(-41.3235 + i * 1e-4, -21.7634) for i in range(6)]
+    nodes = gpd.GeoDataFrame({"highway": ["street_light"] + [None] * 5}, geometry=pts, crs="EPSG:4326")
+    edges = gpd.GeoDataFrame(
+        {"highway": ["residential"] * 5, "name": [f"Rua {i}" for i in range(5)]},
+        geometry=[LineString([pts[i], pts[i + 1]]) for i in range(5)],
+        crs="EPSG:4326",
+    )
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: (nodes, edges))
+    monkeypatch.setattr(api_mod, "_FEATURE_CHUNK", 2)
+
+    calls = []
+    result = api_mod._prepare_osm_compute(-21.7634, -41.3235, 100, progress=lambda p, msg: calls.append((p, msg)))
+    assert len(result["features"]) == 6
+
+    messages = [m for _, m in calls]
+    assert messages[0].startswith("Baixando dados do OSM")
+    assert "Convertendo grafo em GeoDataFrames..." in messages
+    assert [m for m in messages if m.startswith("Processando vias")] == [
+        "Processando vias 0/5...", "Processando vias 2/5...", "Processando vias 4/5...",
+    ]
+    assert [m for m in messages if m.startswith("Processando pontos")] == [
+        "Processando pontos 0/6...", "Processando pontos 2/6...", "Processando pontos 4/6...",
+    ]
+    progress = [p for p, _ in calls]
+    assert progress == sorted(progress) and 0 < progress[0] and progress[-1] < 0.95
+
+
+def test_job_events_stream_pushes_progress_until_done(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    def _compute(latitude, longitude, radius, progress=None, **kwargs):
+        for i in range(3):
+            time.sleep(0.1)
+            progress(0.4 + 0.1 * i, f"Processando vias {i}/3...")
+        time.sleep(0.1)
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", _compute)
+    client = TestClient(api_mod.app)
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9, "longitude": -43.2, "radius": 100}).json()
+
+    with client.stream("GET", f"/api/v1/jobs/{job['job_id']}/events") as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = list(_sse_events(r))
+
+    assert all(name == "status" and "result" not in data for name, data in events)
+    statuses = [data for _, data in events]
+    assert statuses[-1]["status"] == "completed" and statuses[-1]["progress"] == 1.0
+    assert [d["message"] for d in statuses if d["message"].startswith("Processando vias")] == [
+        "Processando vias 0/3...", "Processando vias 1/3...", "Processando vias 2/3...",
+    ]
+    assert [d["progress"] for d in statuses] == sorted(d["progress"] for d in statuses)
+    assert api_mod._job_watchers == {}
+
+    # Job já encerrado: um único evento final; job inexistente: 404.
+    with client.stream("GET", f"/api/v1/jobs/{job['job_id']}/events") as r:
+        assert [d["status"] for _, d in _sse_events(r)] == ["completed"]
+    assert client.get("/api/v1/jobs/nope/events").status_code == 404
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from backend.job_registry import JobRegistry
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("backend.job_registry.time.time", lambda: now[0])
+    return now
+
+
+def _meta(job_id, status="queued"):
+    return {"job_id": job_id, "kind": "osm", "status": status, "progress": 0.0, "message": None, "error": None}
+
+
+def test_small_results_inline_large_results_spilled(tmp_path, clock):
+    (tmp_path / "jobs").mkdir()
+    (tmp_path / "jobs" / "restart-antigo.json").write_bytes(b"{}")
+    reg = JobRegistry(tmp_path / "jobs", ttl_s=60, max_jobs=10, inline_max_bytes=100)
+    assert list((tmp_path / "jobs").iterdir()) == []  # sobra de um processo anterior
+
+    reg.create("a", _meta("a"))
+    reg.create("b", _meta("b"))
+    reg.finish("a", b'{"features": []}', status="completed")
+    big = b'{"features": [' + b",".join([b'{"x": 1}'] * 5000) + b"]}"
+    reg.finish("b", big, status="completed")
+
+    assert reg.result("a") == b'{"features": []}'
+    assert reg.result("b") == big
+    assert (tmp_path / "jobs" / "b.json").read_bytes() == big
+    fp = reg.footprint()
+    assert fp["inline_results"] == 1 and fp["spilled_results"] == 1 and fp["spilled_bytes"] == len(big)
+    assert fp["memory_bytes"] < len(big)  # o resultado grande não conta na memória
+    assert "result" not in reg.get("b")
+
+
+def test_ttl_and_count_eviction_keep_active_jobs(tmp_path, clock):
+    reg = JobRegistry(tmp_path / "jobs", ttl_s=60, max_jobs=3, inline_max_bytes=0)
+    reg.create("ativo", _meta("ativo", "processing"))
+    for job_id in ("j1", "j2"):
+        reg.create(job_id, _meta(job_id))
+        reg.finish(job_id, b"{}", status="completed")
+        clock[0] += 1
+
+    # Acima do limite: sai o encerrado mais antigo, nunca o ativo.
+    reg.create("j3", _meta("j3"))
+    assert reg.get("j1") is None and reg.get("j2") is not None and reg.get("ativo") is not None
+    assert not (tmp_path / "jobs" / "j1.json").exists()
+
+    clock[0] += 61
+    assert reg.get("j2") is None
+    assert reg.get("ativo") is not None and reg.get("j3") is not None
+    assert reg.footprint()["evicted"] == 2
+    assert sorted(p.name for p in (tmp_path / "jobs").iterdir()) == []
+
+
+@pytest.fixture()
+def small_registry(monkeypatch):
+    # Antes do `api_mod` (conftest): o registro lê os limites no 1º uso depois do reload.
+    monkeypatch.setenv("SISRUA_JOB_TTL_S", "600")
+    monkeypatch.setenv("SISRUA_JOB_MAX", "5")
+
+
+def test_job_store_memory_stays_flat_over_simulated_soak(tmp_path, small_registry, api_mod, monkeypatch, clock):
+    from fastapi.testclient import TestClient
+
+    feature = api_mod._polyline_record(layer="L", name="Rua", highway="residential", width_m=6.0,
+                                       coords_xy=[[680_000.0 + k, 7_460_000.0] for k in range(20)])
+    # ~200 KB por resultado: sem despejo, a memória cresceria a cada job (soak longo: benchmarks/bench_job_soak.py).
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute",
+                        lambda *a, **k: {"crs_out": "EPSG:31983", "features": [feature] * 400, "cache_hit": False})
+    client = TestClient(api_mod.app)
+
+    footprints = []
+    for i in range(24):
+        job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9, "longitude": -43.2 + i * 1e-4, "radius": 100}).json()
+        deadline = time.monotonic() + 5
+        while job["status"] != "completed":
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+            job = client.get(f"/api/v1/jobs/{job['job_id']}/status").json()
+        assert len(client.get(f"/api/v1/jobs/{job['job_id']}").json()["result"]["features"]) == 400
+        clock[0] += 5  # um job a cada 5 s
+        if i % 6 == 5:
+            footprints.append(client.get("/api/v1/stats").json()["jobs"]["registry"])
+
+    assert all(f["jobs"] <= 5 and f["inline_results"] == 0 for f in footprints)
+    assert max(f["memory_bytes"] for f in footprints) < 1.2 * min(f["memory_bytes"] for f in footprints)
+    assert len(list((tmp_path / "sisRUA" / "cache" / "jobs").glob("*.json"))) <= 5
+    assert footprints[-1]["evicted"] >= 19
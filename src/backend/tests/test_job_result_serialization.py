@@ -0,0 +1,54 @@
+"""
+Caminho de resultado dos jobs: antes, cada feature virava CadFeature, passava por
+model_dump → _sanitize_jsonable → PrepareResponse(**...) → model_dump e ainda era serializada
+pelo FastAPI a cada polling; agora os registros saem prontos do pipeline e são serializados uma
+única vez (`_json_bytes`). Aqui só a equivalência; o custo por feature fica em
+benchmarks/bench_job_result.py.
+"""
+
+import json
+
+
+N_FEATURES = 2_000
+
+
+def _coords(i):
+    x, y = 680_000.0 + i, 7_460_000.0 + i
+    return [[x, y], [x + 10.5, y + 3.25], [x + 21.0, y + 6.5]]
+
+
+def _legacy_result_bytes(api_mod):
+    features = [
+        api_mod.CadFeature(feature_type="Polyline", layer="SISRUA_OSM_VIAS", name=f"Rua {i % 500}",
+                           highway="residential", width_m=5.0, coords_xy=_coords(i))
+        for i in range(N_FEATURES)
+    ]
+    result = api_mod.PrepareResponse(crs_out="EPSG:31983", features=features).model_dump()
+    safe = api_mod.PrepareResponse(**api_mod._sanitize_jsonable(result)).model_dump()
+    return json.dumps(safe).encode("utf-8")
+
+
+def _fast_result_bytes(api_mod):
+    features = [
+        api_mod._polyline_record(layer="SISRUA_OSM_VIAS", name=f"Rua {i % 500}",
+                                 highway="residential", width_m=5.0, coords_xy=_coords(i))
+        for i in range(N_FEATURES)
+    ]
+    return api_mod._json_bytes({"crs_out": "EPSG:31983", "features": features, "cache_hit": None})
+
+
+def test_records_match_cad_feature_schema(api_mod):
+    rec = api_mod._polyline_record(layer="L", name=None, highway="primary", width_m=12.0, coords_xy=[[1.0, 2.0], [3.0, 4.0]])
+    assert api_mod.CadFeature(**rec).model_dump() == rec
+    rec = api_mod._point_record(layer="L", name="P", block_name="POSTE", block_filepath=None,
+                                insertion_point_xy=[1.0, 2.0], rotation=0.0, scale=1.0)
+    assert api_mod.CadFeature(**rec).model_dump() == rec
+
+
+def test_fast_job_result_matches_legacy_serialization(api_mod):
+    legacy = json.loads(_legacy_result_bytes(api_mod))
+    fast = json.loads(_fast_result_bytes(api_mod))
+
+    assert len(fast["features"]) == N_FEATURES
+    assert fast["features"] == legacy["features"]
+    assert {k: fast[k] for k in ("crs_out", "cache_hit")} == {k: legacy[k] for k in ("crs_out", "cache_hit")}
@@ -0,0 +1,360 @@
+import threading
+import time
+
+import pytest
+
+from backend.job_scheduler import JobScheduler, QueueFull
+
+
+@pytest.fixture(autouse=True)
+def _small_scheduler(monkeypatch):
+    # Roda antes do `api_mod` (conftest): o agendador é criado no reload com estes limites.
+    monkeypatch.setenv("SISRUA_JOB_WORKERS", "2")
+    monkeypatch.setenv("SISRUA_JOB_QUEUE_MAX", "6")
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.005)
+
+
+def test_priority_fifo_and_queue_position():
+    sched = JobScheduler(workers=1, max_queue=10)
+    gate = threading.Event()
+    ran = []
+
+    def _job(name):
+        def _run():
+            if name == "bloqueio":
+                gate.wait(5)
+            ran.append(name)
+        return _run
+
+    sched.submit("bloqueio", _job("bloqueio"))
+    _wait(lambda: sched.stats()["running"] == 1)
+    assert sched.submit("osm1", _job("osm1"), priority=1) == 1
+    assert sched.submit("osm2", _job("osm2"), priority=1) == 2
+    # GeoJSON passa na frente dos OSM já enfileirados.
+    assert sched.submit("geo", _job("geo"), priority=0) == 1
+    assert [sched.position(j) for j in ("geo", "osm1", "osm2", "bloqueio")] == [1, 2, 3, None]
+
+    gate.set()
+    _wait(lambda: len(ran) == 4)
+    assert ran == ["bloqueio", "geo", "osm1", "osm2"]
+
+
+def test_full_queue_rejects_and_idle_workers_exit():
+    sched = JobScheduler(workers=1, max_queue=2, idle_timeout_s=0.05)
+    gate = threading.Event()
+    sched.submit("a", lambda: gate.wait(5))
+    _wait(lambda: sched.stats()["running"] == 1)
+    sched.submit("b", lambda: None)
+    sched.submit("c", lambda: None)
+    with pytest.raises(QueueFull) as exc:
+        sched.submit("d", lambda: None)
+    assert exc.value.retry_after_s >= 1
+
+    gate.set()
+    _wait(lambda: sched.stats()["threads"] == 0)
+    stats = sched.stats()
+    assert stats["completed"] == 3 and stats["rejected"] == 1 and stats["queued"] == 0
+
+
+def test_job_burst_backpressure_bounds_concurrency(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+    gate = threading.Event()
+
+    def _compute(latitude, longitude, radius, **kwargs):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        gate.wait(5)  # nenhum job termina durante a rajada: a contagem de 429 é exata
+        with lock:
+            active["now"] -= 1
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", _compute)
+    client = TestClient(api_mod.app)
+    post = lambda i: client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9 + i * 1e-3, "longitude": -43.2, "radius": 100})  # noqa: E731
+
+    accepted, rejected = [], []
+    try:
+        accepted = [post(i).json() for i in range(2)]
+        _wait(lambda: active["now"] == 2)  # os 2 workers ocupados; a fila (6) está vazia
+        for i in range(2, 40):
+            r = post(i)
+            if r.status_code == 429:
+                assert int(r.headers["Retry-After"]) >= 1
+                rejected.append(r)
+            else:
+                assert r.status_code == 200
+                accepted.append(r.json())
+
+        assert len(accepted) == 8 and len(rejected) == 32
+        queued = accepted[-1]
+        assert queued["status"] == "queued" and queued["queue_position"] == 6 and queued["message"].startswith("Na fila")
+    finally:
+        gate.set()
+
+    for job in accepted:
+        _wait(lambda: client.get(f"/api/v1/jobs/{job['job_id']}/status").json()["status"] == "completed")
+    assert active["max"] == 2
+    stats = client.get("/api/v1/stats").json()["jobs"]
+    assert stats["completed"] == 8 and stats["rejected"] == 32
+
+
+def _grid_geojson(n):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"layer": "LOTES", "name": f"L{i}"},
+                "geometry": {"type": "LineString", "coordinates": [[-43.2 + i * 1e-5 + k * 1e-6, -22.9 + k * 1e-6] for k in range(20)]},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def test_process_executor_runs_jobs_in_warm_workers(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("SISRUA_JOB_EXECUTOR", "process")
+    try:
+        # `with`: o lifespan roda; ao sair (como no encerramento do uvicorn), o pool e o Manager são desligados.
+        with TestClient(api_mod.app) as client:
+            assert api_mod.prewarm_process_pool(wait=True) >= 1
+            workers = list(api_mod._process_pool_instance._processes.values())
+
+            def _run(body):
+                job = client.post("/api/v1/jobs/prepare", json=body).json()
+                _wait(lambda: client.get(f"/api/v1/jobs/{job['job_id']}/status").json()["status"] not in ("queued", "processing"), timeout=20)
+                return client.get(f"/api/v1/jobs/{job['job_id']}").json()
+
+            # Latência do health durante jobs em processo x thread: benchmarks/bench_job_executor.py.
+            geojson = _grid_geojson(2_000)
+            job = _run({"kind": "geojson", "geojson": geojson})
+            assert job["status"] == "completed", job
+            expected = api_mod._prepare_geojson_compute(geojson)
+            assert job["result"]["features"] == expected["features"]
+            assert job["result"]["crs_out"] == expected["crs_out"] and job["result"]["cache_hit"] is False
+
+            # O worker gravou o cache (mesmo SQLite): o 2º job é hit.
+            again = _run({"kind": "geojson", "geojson": geojson})
+            assert again["result"]["cache_hit"] is True
+
+            failed = _run({"kind": "osm"})
+            assert failed["status"] == "failed" and "obrigatórios" in failed["error"]
+            assert client.get("/api/v1/stats").json()["jobs"]["executor"] == "process"
+
+        assert api_mod._process_pool_instance is None and api_mod._process_manager is None
+        assert not any(p.is_alive() for p in workers)
+    finally:
+        api_mod.shutdown_process_pool()
+
+
+@pytest.mark.slow
+@pytest.mark.timeout(120)
+def test_process_executor_cancel_releases_worker(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("SISRUA_JOB_EXECUTOR", "process")
+    client = TestClient(api_mod.app)
+    try:
+        # Job grande o bastante para o DELETE chegar durante a projeção (~10 s com o spawn do pool: `slow`).
+        big = client.post("/api/v1/jobs/prepare", json={"kind": "geojson", "geojson": _grid_geojson(30_000)}).json()
+        _wait(lambda: client.get(f"/api/v1/jobs/{big['job_id']}/status").json()["message"].startswith("Projetando"), timeout=20)
+        assert client.delete(f"/api/v1/jobs/{big['job_id']}").status_code == 202
+        # O worker do agendador é liberado na hora; o processo para no próximo lote de projeção.
+        _wait(lambda: client.get(f"/api/v1/jobs/{big['job_id']}/status").json()["status"] == "cancelled", timeout=1.0)
+        assert api_mod._job_scheduler.stats()["running"] == 0
+
+        small = client.post("/api/v1/jobs/prepare", json={"kind": "geojson", "geojson": _grid_geojson(10)}).json()
+        _wait(lambda: client.get(f"/api/v1/jobs/{small['job_id']}/status").json()["status"] == "completed", timeout=10)
+    finally:
+        api_mod.shutdown_process_pool()
+
+
+def test_identical_inflight_submissions_share_one_compute(api_mod, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fastapi.testclient import TestClient
+
+    gate = threading.Event()
+    calls = []
+
+    def _compute(latitude, longitude, radius, **kwargs):
+        calls.append((latitude, longitude, radius))
+        gate.wait(5)
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", _compute)
+    client = TestClient(api_mod.app)
+    body = {"kind": "osm", "latitude": -22.9, "longitude": -43.2, "radius": 250}
+
+    with ThreadPoolExecutor(8) as pool:
+        jobs = list(pool.map(lambda _: client.post("/api/v1/jobs/prepare", json=body).json(), range(8)))
+    other = client.post("/api/v1/jobs/prepare", json={**body, "radius": 300}).json()
+    assert len({j["job_id"] for j in jobs}) == 1
+    assert other["job_id"] != jobs[0]["job_id"]
+
+    gate.set()
+    for job_id in (jobs[0]["job_id"], other["job_id"]):
+        _wait(lambda: client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "completed")
+    assert len(calls) == 2  # um compute por pedido distinto, não por submissão
+    assert client.get("/api/v1/stats").json()["jobs"]["coalesced"] == 7
+
+    # Depois de concluído, o mesmo pedido abre um job novo.
+    again = client.post("/api/v1/jobs/prepare", json=body).json()
+    assert again["job_id"] != jobs[0]["job_id"]
+
+
+def test_osm_single_flight_key_matches_result_cache_normalization(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    gate = threading.Event()
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", lambda *a, **k: gate.wait(5) and {"crs_out": "EPSG:31983", "features": [], "cache_hit": False})
+    client = TestClient(api_mod.app)
+    body = {"kind": "osm", "latitude": -23.5, "longitude": -46.6, "radius": 250}
+
+    first = client.post("/api/v1/jobs/prepare", json=body).json()
+    # Mesma chave de cache (6 casas, raio inteiro, simplify None == 0): mesmo job.
+    for same in ({"latitude": -23.500000001}, {"longitude": -46.6000000004, "radius": 250.4}, {"simplify_tolerance_m": 0}):
+        assert client.post("/api/v1/jobs/prepare", json={**body, **same}).json()["job_id"] == first["job_id"]
+    for other in ({"latitude": -23.50001}, {"radius": 251}, {"merge_edges": True}):
+        assert client.post("/api/v1/jobs/prepare", json={**body, **other}).json()["job_id"] != first["job_id"]
+    gate.set()
+
+
+def _osm_frames(n_edges):
+    import geopandas as gpd
+    from shapely.geometry import LineString, Point
+
+    pts = [Point(-43.2 + i * 1e-5, -22.9) for i in range(n_edges + 1)]
+    nodes = gpd.GeoDataFrame({"highway": [None] * len(pts)}, geometry=pts, crs="EPSG:4326")
+    edges = gpd.GeoDataFrame(
+        {"highway": ["residential"] * n_edges, "name": [f"Rua {i}" for i in range(n_edges)]},
+        geometry=[LineString([pts[i], pts[i + 1]]) for i in range(n_edges)],
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+def test_cancel_running_job_stops_edge_loop_and_frees_worker(api_mod, monkeypatch):
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    frames = _osm_frames(200)
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda bbox, **kwargs: object())
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: frames)
+    monkeypatch.setattr(api_mod, "_FEATURE_CHUNK", 1)
+    processed = []
+    edges_to_features = api_mod._edges_to_features
+
+    def _slow_edges(edges, *args):
+        time.sleep(0.05)  # 200 lotes ≈ 10 s se ninguém cancelar
+        processed.append(len(edges))
+        return edges_to_features(edges, *args)
+
+    monkeypatch.setattr(api_mod, "_edges_to_features", _slow_edges)
+    client = TestClient(api_mod.app)
+    job = client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9, "longitude": -43.2, "radius": 100}).json()
+    _wait(lambda: len(processed) >= 5)
+
+    r = client.delete(f"/api/v1/jobs/{job['job_id']}")
+    assert r.status_code == 202
+    _wait(lambda: client.get(f"/api/v1/jobs/{job['job_id']}/status").json()["status"] == "cancelled", timeout=1.0)
+    _wait(lambda: api_mod._job_scheduler.stats()["running"] == 0, timeout=1.0)
+    assert len(processed) < 200 and api_mod._cancelled_jobs == set()
+    assert client.get(f"/api/v1/jobs/{job['job_id']}").json()["result"] is None
+    assert client.delete(f"/api/v1/jobs/{job['job_id']}").status_code == 200  # idempotente
+
+    # O mesmo pedido abre job novo (o cancelado saiu do single-flight), que conclui normalmente.
+    monkeypatch.setattr(api_mod, "_edges_to_features", edges_to_features)
+    again = client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9, "longitude": -43.2, "radius": 100}).json()
+    assert again["job_id"] != job["job_id"]
+    _wait(lambda: client.get(f"/api/v1/jobs/{again['job_id']}/status").json()["status"] == "completed")
+    assert client.delete(f"/api/v1/jobs/{again['job_id']}").status_code == 409
+    assert client.delete("/api/v1/jobs/nope").status_code == 404
+
+
+def test_cancel_aborts_download_wait_and_queued_jobs(api_mod, monkeypatch):
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    gate = threading.Event()
+    frames = _osm_frames(3)
+
+    def _download(bbox, **kwargs):
+        gate.wait(10)  # Overpass lento
+        return object()
+
+    monkeypatch.setattr(osmnx, "graph_from_bbox", _download)
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda graph: frames)
+    client = TestClient(api_mod.app)
+    try:
+        # 2 workers: dois jobs baixando, o terceiro na fila.
+        jobs = [
+            client.post("/api/v1/jobs/prepare", json={"kind": "osm", "latitude": -22.9, "longitude": -43.2 + i * 0.05, "radius": 100}).json()
+            for i in range(3)
+        ]
+        _wait(lambda: all(client.get(f"/api/v1/jobs/{j['job_id']}/status").json()["message"].startswith("Baixando") for j in jobs[:2]))
+        assert client.get(f"/api/v1/jobs/{jobs[2]['job_id']}/status").json()["queue_position"] == 1
+
+        r = client.delete(f"/api/v1/jobs/{jobs[2]['job_id']}")
+        assert r.status_code == 200 and r.json()["status"] == "cancelled"
+        assert api_mod._job_scheduler.stats()["queued"] == 0
+        assert jobs[2]["job_id"] not in api_mod._job_requesters  # o `_run` dele nunca vai rodar
+
+        t0 = time.perf_counter()
+        assert client.delete(f"/api/v1/jobs/{jobs[0]['job_id']}").status_code == 202
+        _wait(lambda: client.get(f"/api/v1/jobs/{jobs[0]['job_id']}/status").json()["status"] == "cancelled", timeout=1.0)
+        assert time.perf_counter() - t0 < 1.0 and not gate.is_set()
+        _wait(lambda: api_mod._job_scheduler.stats()["running"] == 1, timeout=1.0)  # o worker voltou ao pool
+    finally:
+        gate.set()
+    _wait(lambda: client.get(f"/api/v1/jobs/{jobs[1]['job_id']}/status").json()["status"] == "completed")
+    stats = client.get("/api/v1/stats").json()["jobs"]
+    assert stats["cancelled"] == 1 and stats["registry"]["active"] == 0
+
+
+def test_cancel_shared_job_only_when_last_requester_detaches(api_mod, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    started, gate = threading.Event(), threading.Event()
+
+    def _compute(latitude, longitude, radius, progress=None, **kwargs):
+        started.set()
+        while not gate.wait(0.01):
+            progress(0.5, "Processando vias...")  # ponto de verificação do cancelamento
+        return {"crs_out": "EPSG:31983", "features": [], "cache_hit": False}
+
+    monkeypatch.setattr(api_mod, "_prepare_osm_compute", _compute)
+    client = TestClient(api_mod.app)
+    body = {"kind": "osm", "latitude": -22.9, "longitude": -43.2, "radius": 250}
+    try:
+        jobs = [client.post("/api/v1/jobs/prepare", json=body).json() for _ in range(2)]
+        job_id = jobs[0]["job_id"]
+        assert jobs[1]["job_id"] == job_id
+        started.wait(5)
+
+        # O 1º DELETE só desliga um dos pedidos: o job segue para o outro.
+        r = client.delete(f"/api/v1/jobs/{job_id}")
+        assert r.status_code == 200 and r.json()["status"] == "processing" and r.headers["x-sisrua-requesters"] == "1"
+        time.sleep(0.05)
+        assert client.get(f"/api/v1/jobs/{job_id}/status").json()["status"] == "processing"
+        # Um novo pedido idêntico ainda se junta ao mesmo job.
+        assert client.post("/api/v1/jobs/prepare", json=body).json()["job_id"] == job_id
+
+        assert client.delete(f"/api/v1/jobs/{job_id}").status_code == 200
+        assert client.delete(f"/api/v1/jobs/{job_id}").status_code == 202  # o último: cancela de fato
+        _wait(lambda: client.get(f"/api/v1/jobs/{job_id}/status").json()["status"] == "cancelled")
+    finally:
+        gate.set()
+    assert api_mod._job_requesters == {} and api_mod._inflight_jobs == {}
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+
+_PAYLOAD = {
+    "crs_out": "EPSG:31984",
+    "features": [{"width_m": float("nan"), "coords_xy": [[1.0, float("inf")], [2.5, -float("inf")]]}],
+    "meta": {1: "chave int"},
+}
+_EXPECTED = {
+    "crs_out": "EPSG:31984",
+    "features": [{"width_m": None, "coords_xy": [[1.0, None], [2.5, None]]}],
+    "meta": {"1": "chave int"},
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_bytes_nulls_non_finite_in_one_pass(api_mod, monkeypatch, use_orjson):
+    if use_orjson and api_mod.orjson is None:
+        pytest.skip("orjson não instalado")
+    if not use_orjson:
+        monkeypatch.setattr(api_mod, "orjson", None)
+
+    # json.loads estrito: NaN/Infinity no texto fariam o parse falhar
+    out = json.loads(api_mod._json_bytes(_PAYLOAD), parse_constant=lambda c: pytest.fail(f"constante {c} no JSON"))
+    assert out == _EXPECTED
+
+
+def test_stdlib_fallback_skips_sanitize_when_finite(api_mod, monkeypatch):
+    monkeypatch.setattr(api_mod, "orjson", None)
+    monkeypatch.setattr(api_mod, "_sanitize_jsonable", lambda obj: pytest.fail("sanitize no caminho finito"))
+    assert json.loads(api_mod._json_bytes({"a": [1.5, "ç"]})) == {"a": [1.5, "ç"]}
+
+
+def test_cache_roundtrip_without_sanitize(api_mod, monkeypatch):
+    api_mod._write_cache("k", {"crs_out": "EPSG:31984", "features": [{"width_m": float("nan")}], "cache_hit": None})
+    monkeypatch.setattr(api_mod, "_sanitize_jsonable", lambda obj: pytest.fail("sanitize na leitura do cache"))
+    assert api_mod._read_cache("k") == {"crs_out": "EPSG:31984", "features": [{"width_m": None}], "cache_hit": None}
+
+
+def test_default_response_class_accepts_nan(api_mod):
+    from fastapi.testclient import TestClient
+
+    @api_mod.app.get("/_test/nan")
+    def _nan():
+        return {"v": float("nan"), "ok": True}
+
+    r = TestClient(api_mod.app).get("/_test/nan")
+    assert r.status_code == 200
+    assert r.json() == {"v": None, "ok": True}
@@ -0,0 +1,124 @@
+from pathlib import Path
+
+import pytest
+
+from backend.osm_extract import OsmExtract, bbox_from_point, ingest
+
+EXTRACT = Path(__file__).parent / "data" / "campos_small.osm"
+CENTER = (-21.7634, -41.3235)
+
+
+def test_bbox_matches_osmnx():
+    import osmnx
+
+    expected = osmnx.utils_geo.bbox_from_point(CENTER, dist=250)
+    assert bbox_from_point(*CENTER, 250) == pytest.approx(tuple(float(v) for v in expected))
+
+
+def test_ingest_and_query_bbox(tmp_path):
+    meta = ingest(EXTRACT, tmp_path / "campos.sqlite3")
+    # construction fica de fora; a way com nó ausente (999) fica com os nós que existem
+    assert meta["ways"] == 5
+    assert meta["points"] == 4  # nó só com created_by não vira ponto
+    assert meta["bounds"] == [-41.33, -21.77, -41.315, -21.755]  # <bounds> do arquivo
+    assert not (tmp_path / "campos.sqlite3.tmp").exists()
+
+    extract = OsmExtract(tmp_path / "campos.sqlite3")
+    left, bottom, right, top = bbox_from_point(*CENTER, 100)
+    assert extract.covers((left, bottom, right, top))
+    assert not extract.covers(bbox_from_point(*CENTER, 5000))
+
+    nodes, edges = extract.query(*CENTER, 100)
+    assert sorted(edges["name"].dropna()) == ["Avenida Beta", "Rua Alfa"]
+    assert sorted(edges["highway"]) == ["footway", "primary", "residential", "service"]
+    assert list(edges.index.names) == ["u", "v", "key"]
+    # Vias que cruzam a borda são recortadas no bbox da consulta.
+    minx, miny, maxx, maxy = edges.total_bounds
+    assert minx >= left - 1e-9 and maxx <= right + 1e-9 and miny >= bottom - 1e-9 and maxy <= top + 1e-9
+    assert sorted(nodes.index) == [9, 10, 11]
+    assert nodes.loc[11, "name"] == "Banco da Praça"
+
+
+def test_xml_parse_releases_every_top_level_element(tmp_path, monkeypatch):
+    import xml.etree.ElementTree as ET
+
+    from backend import osm_extract
+
+    relations = "".join(
+        f'<relation id="{i}"><member type="way" ref="1" role="outer"/><tag k="type" v="multipolygon"/></relation>'
+        for i in range(50)
+    )
+    path = tmp_path / "rel.osm"
+    path.write_text(
+        '<osm><node id="1" lon="-41.3" lat="-21.7"><tag k="power" v="pole"/></node>'
+        f'{relations}<node id="2" lon="-41.31" lat="-21.71"/>'
+        '<way id="3"><nd ref="1"/><nd ref="2"/><tag k="highway" v="service"/></way></osm>',
+        encoding="utf-8",
+    )
+    roots, relations, seen = [], [], []
+    iterparse = ET.iterparse
+
+    def _iterparse(*args, **kwargs):
+        for event, elem in iterparse(*args, **kwargs):
+            if not roots:
+                roots.append(elem)
+            elif event == "end" and elem.tag == "relation":
+                relations.append(elem)
+            yield event, elem
+
+    class _Recorder:
+        def node(self, node_id, lon, lat, tags):
+            seen.append(("node", node_id, tags))
+
+        def way(self, way_id, refs, tags):
+            seen.append(("way", way_id, refs, tags))
+
+    monkeypatch.setattr(ET, "iterparse", _iterparse)
+    osm_extract._parse_osm_xml(path, _Recorder())
+    assert seen == [("node", 1, {"power": "pole"}), ("node", 2, {}), ("way", 3, [1, 2], {"highway": "service"})]
+    # Relations são ignoradas, mas liberadas como nodes/ways: sem <member>/<tag> nem vínculo com a raiz.
+    assert len(relations) == 50 and all(len(r) == 0 and not r.attrib for r in relations)
+    assert len(roots[0]) == 0
+
+
+def test_prepare_osm_served_offline_from_extract(api_mod, monkeypatch):
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("SISRUA_OSM_EXTRACT", str(EXTRACT))
+    monkeypatch.setattr(osmnx, "graph_from_bbox", lambda *a, **k: pytest.fail("consulta com extrato foi à rede"))
+    client = TestClient(api_mod.app)
+
+    r = client.post("/api/v1/prepare/osm", json={"latitude": CENTER[0], "longitude": CENTER[1], "radius": 100})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["crs_out"] == "EPSG:31984" and body["cache_hit"] is False
+
+    lines = [f for f in body["features"] if f["feature_type"] == "Polyline"]
+    points = [f for f in body["features"] if f["feature_type"] == "Point"]
+    assert {f["name"] for f in lines} == {"Rua Alfa", "Avenida Beta", None}
+    assert next(f for f in lines if f["name"] == "Avenida Beta")["width_m"] == 12.0
+    assert sorted(f["block_name"] for f in points) == ["BANCO", "POSTE", "POSTE"]
+    assert all(f["layer"] == "SISRUA_OSM_PONTOS" for f in points)
+
+    # Ingestão única (em cache/extracts); consultas seguintes só usam o índice.
+    stores = list((api_mod._cache_dir() / "extracts").glob("*.sqlite3"))
+    assert len(stores) == 1
+    mtime = stores[0].stat().st_mtime_ns
+    r = client.post("/api/v1/prepare/osm", json={"latitude": CENTER[0] + 0.0002, "longitude": CENTER[1], "radius": 150})
+    assert r.status_code == 200 and r.json()["cache_hit"] is False
+    assert stores[0].stat().st_mtime_ns == mtime
+
+    # Fora da área do extrato: volta para o Overpass/tiles.
+    assert api_mod._osm_extract_for(-22.90, -43.18, 100) is None
+
+
+def test_unusable_extract_is_logged_and_falls_back(api_mod, monkeypatch, tmp_path, caplog, capsys):
+    broken = tmp_path / "quebrado.osm"
+    broken.write_text("<osm><node", encoding="utf-8")
+    monkeypatch.setenv("SISRUA_OSM_EXTRACT", str(broken))
+
+    with caplog.at_level("WARNING", logger="sisrua"):
+        assert api_mod._osm_extract_for(*CENTER, 100) is None
+    assert any("Extrato OSM indisponível" in r.getMessage() for r in caplog.records)
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,258 @@
+def _transformer():
+    from pyproj import Transformer
+
+    return Transformer.from_crs("EPSG:4326", "EPSG:31984", always_xy=True)
+
+
+def test_edges_to_features_columnar_normalization(api_mod):
+    import geopandas as gpd
+    import numpy as np
+    from shapely.geometry import LineString, MultiLineString, Point
+
+    line_a = LineString([(-41.3235, -21.7634), (-41.3230, -21.7630)])
+    line_b = LineString([(-41.3230, -21.7630), (-41.3225, -21.7625)])
+    edges = gpd.GeoDataFrame(
+        {
+            "highway": [["primary", "secondary"], "footway", float("nan"), "unknown_type", [], "service"],
+            "name": ["Av. Brasil", float("nan"), "nan", ["Rua A", "Rua B"], "Rua E", "Ponto"],
+        },
+        geometry=[line_a, MultiLineString([line_a, line_b]), line_b, line_a, line_b, Point(-41.32, -21.76)],
+        crs="EPSG:4326",
+    )
+
+    feats = api_mod._edges_to_features(edges, _transformer())
+
+    # MultiLineString explode em 2 polylines; Point é ignorado; listas viram o 1º item (highway) ou str (name).
+    assert [(f["highway"], f["name"], f["width_m"]) for f in feats] == [
+        ("primary", "Av. Brasil", 12.0),
+        ("footway", None, 2.0),
+        ("footway", None, 2.0),
+        (None, None, None),
+        ("unknown_type", "['Rua A', 'Rua B']", 6.0),
+        ("[]", "Rua E", 6.0),
+    ]
+    assert all(f["layer"] == "SISRUA_OSM_VIAS" and len(f["coords_xy"]) == 2 for f in feats)
+    lonlat = np.asarray(line_a.coords)
+    assert api_mod._project_vertices(lonlat, np.array([0, len(lonlat)]), _transformer()) == [feats[0]["coords_xy"]]
+    xs, ys = _transformer().transform(lonlat[:, 0], lonlat[:, 1])
+    np.testing.assert_allclose(feats[0]["coords_xy"], np.column_stack([xs, ys]))
+
+
+def test_edges_to_features_empty_frame(api_mod):
+    import geopandas as gpd
+
+    edges = gpd.GeoDataFrame({"highway": []}, geometry=[], crs="EPSG:4326")
+    assert api_mod._edges_to_features(edges, _transformer()) == []
+
+
+def test_project_vertices_single_call_drops_non_finite(api_mod):
+    import numpy as np
+
+    calls = []
+
+    class CountingTransformer:
+        def __init__(self, inner):
+            self._inner = inner
+
+        def transform(self, xs, ys):
+            calls.append(len(xs))
+            return self._inner.transform(xs, ys)
+
+    lonlat = np.array([
+        [-41.3235, -21.7634], [float("nan"), -21.7630], [-41.3230, -21.7630],  # parte 0: 1 NaN
+        [-41.3230, -21.7630],                                                   # parte 1: ponto
+        [float("inf"), 0.0], [-41.3225, -21.7625],                             # parte 2: sobra 1
+    ])
+    out = api_mod._project_vertices(lonlat, [0, 3, 4, 6], CountingTransformer(_transformer()))
+
+    assert calls == [6]
+    assert [len(p) for p in out] == [2, 1, 1]
+    assert out[1] == [out[0][1]]
+    assert all(np.isfinite(v) for part in out for xy in part for v in xy)
+
+
+def test_nodes_to_features_rules_from_json(api_mod, tmp_path, monkeypatch):
+    import json
+
+    import geopandas as gpd
+    from shapely.geometry import LineString, Point
+
+    rules_path = tmp_path / "osm_point_rules.json"
+    rules_path.write_text(json.dumps({
+        "layer": "SISRUA_OSM_PONTOS",
+        "rules": [
+            {"block_name": "POSTE", "tags": {"power": ["pole", "tower"]}},
+            {"block_name": "ARVORE", "tags": {"natural": "tree"}, "layer": "SISRUA_OSM_ARVORES", "scale": 2.0},
+            {"block_name": "MEDIDOR", "tags": {"power": ["pole"], "man_made": ["meter"]}},
+        ],
+    }), encoding="utf-8")
+    monkeypatch.setenv("SISRUA_OSM_POINT_RULES", str(rules_path))
+
+    nodes = gpd.GeoDataFrame(
+        {
+            "power": ["tower", None, None, "pole", None],
+            "natural": [None, "tree", None, "tree", "tree"],
+            "man_made": [None, None, None, "meter", None],
+            "name": ["Torre", None, "Nada", "Poste", "Arvore sem geometria valida"],
+        },
+        geometry=[
+            Point(-41.3235, -21.7634),
+            Point(-41.3230, -21.7630),
+            Point(-41.3232, -21.7632),
+            Point(-41.3231, -21.7631),
+            LineString([(-41.3231, -21.7631), (-41.3230, -21.7630)]),
+        ],
+        crs="EPSG:4326",
+    )
+
+    rules = api_mod._load_osm_point_rules()
+    feats = api_mod._nodes_to_features(nodes, _transformer(), rules)
+
+    # Nó 3 casa POSTE e MEDIDOR: vale o primeiro rule. Nó 2 não casa; nó 4 não é Point.
+    assert [(f["name"], f["block_name"], f["layer"], f["scale"]) for f in feats] == [
+        ("Torre", "POSTE", "SISRUA_OSM_PONTOS", 1.0),
+        (None, "ARVORE", "SISRUA_OSM_ARVORES", 2.0),
+        ("Poste", "POSTE", "SISRUA_OSM_PONTOS", 1.0),
+    ]
+    assert all(len(f["insertion_point_xy"]) == 2 for f in feats)
+
+    class _Settings:
+        useful_tags_node = ["highway", "ref"]
+
+    class _Ox:
+        settings = _Settings()
+
+    api_mod._ensure_osm_node_tags(_Ox, rules)
+    assert _Ox.settings.useful_tags_node == ["highway", "ref", "power", "natural", "man_made"]
+
+
+def test_invalid_rules_file_falls_back_to_defaults(api_mod, tmp_path, monkeypatch):
+    rules_path = tmp_path / "osm_point_rules.json"
+    rules_path.write_text("{ not json", encoding="utf-8")
+    monkeypatch.setenv("SISRUA_OSM_POINT_RULES", str(rules_path))
+    assert api_mod._load_osm_point_rules() == api_mod._DEFAULT_OSM_POINT_RULES
+
+
+def test_project_vertices_simplifies_lines_in_meters(api_mod):
+    import numpy as np
+
+    transformer = _transformer()
+    # Linha reta de ~110 m com 101 vértices e desvios de ~1 cm; um ponto isolado; outra linha de 2 vértices.
+    xs = np.linspace(-41.3240, -41.3230, 101)
+    ys = -21.7630 + np.where(np.arange(101) % 2, 1e-7, 0.0)
+    lonlat = np.vstack([np.column_stack((xs, ys)), [[-41.3235, -21.7634]], [[-41.3235, -21.7634], [-41.3230, -21.7630]]])
+    offsets = [0, 101, 102, 104]
+
+    plain = api_mod._project_vertices(lonlat, offsets, transformer)
+    stats = {}
+    simplified = api_mod._project_vertices(lonlat, offsets, transformer, simplify_m=0.1, stats=stats)
+
+    assert [len(p) for p in plain] == [101, 1, 2]
+    assert [len(p) for p in simplified] == [2, 1, 2]
+    assert simplified[0] == [plain[0][0], plain[0][-1]]  # extremidades preservadas
+    assert simplified[1:] == plain[1:]
+    assert stats == {"vertices_before": 103, "vertices_after": 4}
+    # Tolerância menor que o desvio: nada muda.
+    assert api_mod._project_vertices(lonlat, offsets, transformer, simplify_m=0.001) == plain
+
+
+def _street_edges(streets):
+    """Edges no formato do OSMnx (índice u, v, key) a partir de [(highway, name, [nós]), ...], com as duas mãos."""
+    import geopandas as gpd
+    import pandas as pd
+    from shapely.geometry import LineString
+
+    rows, index = [], []
+    for highway, name, path in streets:
+        for a, b in zip(path, path[1:]):
+            for u, v in ((a, b), (b, a)):
+                rows.append({"highway": highway, "name": name, "geometry": LineString([(u[0] * 1e-4, u[1] * 1e-4), (v[0] * 1e-4, v[1] * 1e-4)])})
+                index.append((hash(u), hash(v), 0))
+    edges = gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:4326")
+    edges.index = pd.MultiIndex.from_tuples(index, names=["u", "v", "key"])
+    return edges
+
+
+def test_merge_contiguous_edges_joins_same_street_through_degree_two_nodes(api_mod):
+    # "Rua A" cruza a "Rua B" em (2, 0); "Rua A" se bifurca em (4, 0) (T da mesma via: não funde).
+    edges = _street_edges([
+        ("residential", "Rua A", [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 0)]),
+        ("residential", "Rua A", [(4, 0), (4, 1)]),
+        ("residential", "Rua B", [(2, -1), (2, 0), (2, 1)]),
+    ])
+    assert len(edges) == 16
+
+    unique = api_mod._drop_reverse_edges(edges)
+    assert len(unique) == 8
+    plain = edges.reset_index(drop=True)
+    assert api_mod._drop_reverse_edges(plain) is plain  # sem índice (u, v): passa intacto
+
+    merged = api_mod._merge_contiguous_edges(unique)
+    coords = [[(round(x * 1e4), round(y * 1e4)) for x, y in g.coords] for g in merged.geometry]
+    assert list(merged["name"]) == ["Rua A", "Rua A", "Rua A", "Rua B"]
+    assert coords == [
+        [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)],  # atravessa o cruzamento com a Rua B
+        [(4, 0), (5, 0)],
+        [(4, 0), (4, 1)],
+        [(2, -1), (2, 0), (2, 1)],
+    ]
+    assert list(merged["highway"]) == ["residential"] * 4 and merged.crs == edges.crs
+
+
+def test_merge_contiguous_edges_orients_reversed_segments_and_keeps_other_geometries(api_mod):
+    import geopandas as gpd
+    from shapely.geometry import LineString, MultiLineString
+
+    edges = gpd.GeoDataFrame(
+        {"highway": ["primary", "primary", "primary", "primary"], "name": ["Av", "Av", None, "Av"]},
+        geometry=[
+            LineString([(1, 0), (2, 0)]),
+            LineString([(1, 0), (0, 0)]),  # invertido em relação ao vizinho
+            MultiLineString([[(5, 5), (6, 6)]]),
+            LineString([(3, 0), (2, 0)]),
+        ],
+        crs="EPSG:4326",
+    )
+    merged = api_mod._merge_contiguous_edges(edges)
+    assert [g.geom_type for g in merged.geometry] == ["LineString", "MultiLineString"]
+    assert list(merged.geometry.iloc[0].coords) == [(0, 0), (1, 0), (2, 0), (3, 0)]
+    assert merged["name"].tolist() == ["Av", None]
+
+
+def test_drop_reverse_edges_keeps_distinct_ways_between_same_nodes(api_mod):
+    import geopandas as gpd
+    import pandas as pd
+    from shapely.geometry import LineString
+
+    # Rotatória em dois arcos de mão única entre os nós 1 e 2 (geometrias diferentes) + uma rua de mão dupla 2–3
+    # cuja cópia invertida difere só pela orientação; a 2–3 também vem como o OSMnx marca (osmid + reversed).
+    edges = gpd.GeoDataFrame(
+        {"osmid": [10, 10, 20, 20], "reversed": [False, False, False, True]},
+        geometry=[
+            LineString([(0, 0), (1, 1), (2, 0)]),
+            LineString([(2, 0), (1, -1), (0, 0)]),
+            LineString([(2, 0), (3, 0)]),
+            LineString([(3, 0), (2.5, 0.0001), (2, 0)]),  # mesma via, vértices não idênticos
+        ],
+        crs="EPSG:4326",
+    )
+    edges.index = pd.MultiIndex.from_tuples([(1, 2, 0), (2, 1, 0), (2, 3, 0), (3, 2, 0)], names=["u", "v", "key"])
+
+    kept = api_mod._drop_reverse_edges(edges)
+    assert list(kept.index) == [(1, 2, 0), (2, 1, 0), (2, 3, 0)]
+    # Sem osmid/reversed, só a geometria exatamente invertida conta como duplicata.
+    assert len(api_mod._drop_reverse_edges(edges.drop(columns=["osmid", "reversed"]))) == 4
+
+
+def test_merge_contiguous_edges_grid_counts(api_mod):
+    # n ruas de 10 quadras, cruzadas por 11 transversais (cruzamentos de grau 4): cada rua vira uma linha.
+    n = 50
+    streets = [("residential", f"Rua {i}", [(j, i) for j in range(11)]) for i in range(n)]
+    streets += [("tertiary", f"Travessa {j}", [(j, i) for i in range(n)]) for j in range(11)]
+    edges = _street_edges(streets)
+    unique = api_mod._drop_reverse_edges(edges)
+    merged = api_mod._merge_contiguous_edges(unique)
+
+    assert len(edges) == 2 * len(unique) == 2 * (n * 10 + 11 * (n - 1))
+    assert len(merged) == n + 11
+    assert sorted(len(g.coords) for g in merged.geometry) == [11] * n + [n] * 11
@@ -0,0 +1,135 @@
+from backend.osm_tiles import tile_bounds, tiles_for_bbox
+
+
+def _world():
+    """
+    "OSM" sintético: grade de nós a cada 0.001° em volta do Rio, com edges horizontais e verticais
+    indexadas por (u, v, key) como no `ox.graph_to_gdfs`.
+    """
+    import geopandas as gpd
+    import pandas as pd
+    from shapely.geometry import LineString, Point
+
+    n = 41
+    lon0, lat0 = -43.20, -22.92
+    ids, pts = [], []
+    for i in range(n):
+        for j in range(n):
+            ids.append(i * n + j)
+            pts.append(Point(lon0 + j * 0.001, lat0 + i * 0.001))
+    nodes = gpd.GeoDataFrame({"highway": [None] * len(ids)}, geometry=pts, index=pd.Index(ids, name="osmid"), crs="EPSG:4326")
+
+    keys, geoms = [], []
+    for i in range(n):
+        for j in range(n):
+            a = i * n + j
+            for b in ([a + 1] if j + 1 < n else []) + ([a + n] if i + 1 < n else []):
+                keys.append((a, b, 0))
+                geoms.append(LineString([pts[a], pts[b]]))
+    edges = gpd.GeoDataFrame(
+        {"highway": ["residential"] * len(keys), "name": [None] * len(keys)},
+        geometry=geoms,
+        index=pd.MultiIndex.from_tuples(keys, names=["u", "v", "key"]),
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+def _truncate(nodes, edges, bbox, by_edge):
+    left, bottom, right, top = bbox
+    inside = (nodes.geometry.x >= left) & (nodes.geometry.x <= right) & (nodes.geometry.y >= bottom) & (nodes.geometry.y <= top)
+    keep = nodes.index[inside]
+    u = edges.index.get_level_values("u").isin(keep)
+    v = edges.index.get_level_values("v").isin(keep)
+    kept_edges = edges[(u | v) if by_edge else (u & v)]
+    if by_edge:
+        keep = keep.union(kept_edges.index.get_level_values("u")).union(kept_edges.index.get_level_values("v"))
+    return nodes[nodes.index.isin(keep)], kept_edges
+
+
+def test_tiles_cover_bbox():
+    bbox = (-43.19, -22.91, -43.17, -22.89)
+    tiles = tiles_for_bbox(bbox, 15)
+    left = min(tile_bounds(t)[0] for t in tiles)
+    bottom = min(tile_bounds(t)[1] for t in tiles)
+    right = max(tile_bounds(t)[2] for t in tiles)
+    top = max(tile_bounds(t)[3] for t in tiles)
+    assert left <= bbox[0] and bottom <= bbox[1] and right >= bbox[2] and top >= bbox[3]
+    assert all(z == 15 for z, _, _ in tiles)
+
+
+def test_overlapping_queries_fetch_only_missing_tiles(api_mod, monkeypatch):
+    import osmnx
+
+    world_nodes, world_edges = _world()
+    fetched = []
+
+    def _graph_from_bbox(bbox, **kwargs):
+        assert kwargs["truncate_by_edge"] is True
+        fetched.append(tiles_for_bbox(bbox, 15))
+        return bbox
+
+    monkeypatch.setattr(osmnx, "graph_from_bbox", _graph_from_bbox)
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda bbox: _truncate(world_nodes, world_edges, bbox, by_edge=True))
+
+    def _query(lat, lon, radius):
+        nodes, edges = api_mod._osm_frames_from_tiles(osmnx, lat, lon, radius)
+        bbox = osmnx.utils_geo.bbox_from_point((lat, lon), dist=radius)
+        exp_nodes, exp_edges = _truncate(world_nodes, world_edges, bbox, by_edge=False)
+        assert set(nodes.index) == set(exp_nodes.index)
+        assert set(edges.index) == set(exp_edges.index)
+        return len(edges)
+
+    assert _query(-22.900, -43.180, 500) > 0
+    assert len(fetched) == 1
+    first_tiles = set(fetched[0])
+
+    # Mesmo bairro, clique 1 m ao lado: nenhum download.
+    _query(-22.90001, -43.18001, 500)
+    assert len(fetched) == 1
+
+    # Raio maior: um único download, só com os tiles que faltavam (o retângulo deles pode encostar nos já em cache).
+    _query(-22.900, -43.180, 1200)
+    assert len(fetched) == 2
+    big_tiles = set(tiles_for_bbox(osmnx.utils_geo.bbox_from_point((-22.900, -43.180), dist=1200), 15))
+    assert len(big_tiles - first_tiles) > 0
+    assert big_tiles - first_tiles <= set(fetched[1])
+
+
+def test_rules_or_pipeline_change_rederives_from_raw_tiles(api_mod, tmp_path, monkeypatch):
+    import json
+
+    import osmnx
+    from fastapi.testclient import TestClient
+
+    world_nodes, world_edges = _world()
+    world_nodes.loc[world_nodes.index[:5], "highway"] = "street_light"
+    fetched = []
+
+    def _graph_from_bbox(bbox, **kwargs):
+        fetched.append(bbox)
+        return bbox
+
+    monkeypatch.setattr(osmnx, "graph_from_bbox", _graph_from_bbox)
+    monkeypatch.setattr(osmnx, "graph_to_gdfs", lambda bbox: _truncate(world_nodes, world_edges, bbox, by_edge=True))
+    monkeypatch.setenv("SISRUA_OSM_POINT_RULES", str(tmp_path / "rules.json"))  # ainda não existe: regras padrão
+
+    client = TestClient(api_mod.app)
+    body = {"latitude": -22.9195, "longitude": -43.1995, "radius": 300}
+
+    def _blocks():
+        r = client.post("/api/v1/prepare/osm", json=body).json()
+        return r["cache_hit"], sorted({f["block_name"] for f in r["features"] if f["feature_type"] == "Point"})
+
+    assert _blocks() == (False, ["POSTE"])
+    assert _blocks() == (True, ["POSTE"])
+    assert len(fetched) == 1
+
+    # Regras novas (mesmas tags): o resultado derivado é invalidado, os tiles brutos não.
+    (tmp_path / "rules.json").write_text(
+        json.dumps({"rules": [{"block_name": "LUMINARIA", "tags": {"highway": ["street_light"]}}]}), encoding="utf-8"
+    )
+    assert _blocks() == (False, ["LUMINARIA"])
+    monkeypatch.setattr(api_mod, "PREPARE_PIPELINE_VERSION", api_mod.PREPARE_PIPELINE_VERSION + 1)
+    assert _blocks() == (False, ["LUMINARIA"])
+    assert len(fetched) == 1
@@ -83,7 +83,7 @@ export default function App() {
   const [previewGeoJson, setPreviewGeoJson] = useState(null); // ** NOVO ESTADO PARA PREVIEW **
   const [hostJob, setHostJob] = useState(null);
   const uiJob = hostJob;
-  const loading = uiJob && !['completed', 'failed'].includes(uiJob.status);
+  const loading = uiJob && !['completed', 'failed', 'cancelled'].includes(uiJob.status);
   const error = uiJob?.status === 'failed' ? (uiJob.error || uiJob.message || 'Falhou.') : null;
 
   // State para desenho manual
@@ -273,6 +273,12 @@ export default function App() {
       }
   }
 
+  const handleCancelJob = () => {
+    if (window.chrome && window.chrome.webview) {
+      window.chrome.webview.postMessage({ action: 'CANCEL_JOB' });
+    }
+  };
+
   const handleGenerate = () => {
     if (window.chrome && window.chrome.webview) {
       const message = {
@@ -416,15 +422,20 @@ export default function App() {
                         </div>
                         <div className="flex flex-col">
                           <span className={`text-xs font-black uppercase tracking-wide ${uiJob.status === 'failed' ? 'text-red-600' : 'text-slate-700'}`}>
-                            {uiJob.status === 'queued' ? 'Aguardando' : uiJob.status === 'processing' ? 'Processando' : 'Concluído'}
+                            {uiJob.status === 'queued' ? 'Aguardando' : uiJob.status === 'processing' ? 'Processando' : uiJob.status === 'cancelled' ? 'Cancelado' : 'Concluído'}
                           </span>
-                          {uiJob.message && uiJob.status !== 'completed' && uiJob.status !== 'failed' && (
+                          {uiJob.message && loading && (
                             <span className="text-[10px] text-slate-500 font-medium animate-pulse">{uiJob.message}</span>
                           )}
                         </div>
                       </div>
-                      <div className="text-[10px] font-mono text-slate-500">
-                        {typeof uiJob.progress === 'number' ? `${Math.round(uiJob.progress * 100)}%` : ''}
+                      <div className="flex flex-col items-end gap-1">
+                        <div className="text-[10px] font-mono text-slate-500">
+                          {typeof uiJob.progress === 'number' ? `${Math.round(uiJob.progress * 100)}%` : ''}
+                        </div>
+                        {loading && (
+                          <button onClick={handleCancelJob} className="text-[10px] font-bold text-slate-500 hover:text-red-600 transition-colors">CANCELAR</button>
+                        )}
                       </div>
                     </div>
 
@@ -349,8 +349,18 @@ namespace sisRUA
 
             [JsonPropertyName("features")]
             public List<CadFeature> Features { get; set; }
+
+            [JsonPropertyName("vertices_before")]
+            public int? VerticesBefore { get; set; }
+
+            [JsonPropertyName("vertices_after")]
+            public int? VerticesAfter { get; set; }
         }
 
+        // Tolerância (m) da simplificação das vias OSM no backend: menos vértices trafegam e são parseados.
+        // É a mesma usada depois em GeometryCleaner.SimplifyPolylines (após a fusão), que passa a ter pouco a fazer.
+        private const double OsmSimplifyToleranceMeters = 0.1;
+
         private sealed class PrepareJobRequest
         {
             [JsonPropertyName("kind")]
@@ -367,6 +377,12 @@ namespace sisRUA
 
             [JsonPropertyName("geojson")]
             public string GeoJson { get; set; }
+
+            [JsonPropertyName("simplify_tolerance_m")]
+            public double? SimplifyToleranceM { get; set; }
+
+            [JsonPropertyName("merge_edges")]
+            public bool? MergeEdges { get; set; }
         }
 
         private sealed class JobStatusResponse
@@ -611,6 +627,151 @@ namespace sisRUA
             }
         }
 
+        private static bool IsJobFinished(JobStatusResponse job)
+        {
+            return string.Equals(job.Status, "completed", StringComparison.OrdinalIgnoreCase) ||
+                   string.Equals(job.Status, "failed", StringComparison.OrdinalIgnoreCase) ||
+                   string.Equals(job.Status, "cancelled", StringComparison.OrdinalIgnoreCase);
+        }
+
+        // Cancelamentos do usuário para os jobs em andamento (Esc no AutoCAD, botão da paleta, saída do AutoCAD).
+        private static readonly object _activeJobsLock = new object();
+        private static readonly HashSet<CancellationTokenSource> _activeJobs = new HashSet<CancellationTokenSource>();
+
+        /// <summary>
+        /// Cancela os jobs em andamento (ação CANCEL_JOB da paleta). Cada um envia o DELETE ao backend.
+        /// </summary>
+        public static void CancelActiveJobs()
+        {
+            List<CancellationTokenSource> active;
+            lock (_activeJobsLock)
+            {
+                active = _activeJobs.ToList();
+            }
+            foreach (var cts in active)
+            {
+                try { cts.Cancel(); } catch (ObjectDisposedException) { }
+            }
+        }
+
+        /// <summary>
+        /// Token de cancelamento de um job disparado pelo usuário: Esc no AutoCAD, CANCEL_JOB da paleta
+        /// (ver <see cref="CancelActiveJobs"/>) ou o fechamento do AutoCAD. Descartar desliga os eventos.
+        /// </summary>
+        private sealed class UserCancellation : IDisposable
+        {
+            private const int WM_KEYDOWN = 0x0100;
+            private const int VK_ESCAPE = 0x1B;
+            private readonly CancellationTokenSource _cts = new CancellationTokenSource();
+
+            public UserCancellation()
+            {
+                lock (_activeJobsLock)
+                {
+                    _activeJobs.Add(_cts);
+                }
+                Application.PreTranslateMessage += OnPreTranslateMessage;
+                Application.BeginQuit += OnBeginQuit;
+            }
+
+            public CancellationToken Token => _cts.Token;
+
+            private void OnPreTranslateMessage(object sender, PreTranslateMessageEventArgs e)
+            {
+                if (e.Message.message == WM_KEYDOWN && e.Message.wParam.ToInt64() == VK_ESCAPE && !_cts.IsCancellationRequested)
+                {
+                    Log("INFO: Esc pressionado: cancelando o job em andamento.");
+                    _cts.Cancel();
+                }
+            }
+
+            private void OnBeginQuit(object sender, EventArgs e) => _cts.Cancel();
+
+            public void Dispose()
+            {
+                Application.PreTranslateMessage -= OnPreTranslateMessage;
+                Application.BeginQuit -= OnBeginQuit;
+                lock (_activeJobsLock)
+                {
+                    _activeJobs.Remove(_cts);
+                }
+                _cts.Dispose();
+            }
+        }
+
+        /// <summary>
+        /// Pede ao backend que cancele o job (DELETE); o worker para no próximo lote. Falhas são só registradas.
+        /// Job compartilhado com outro pedido idêntico (single-flight): o backend só desliga este pedido.
+        /// </summary>
+        private static async Task CancelJobAsync(string baseUrl, string jobId)
+        {
+            try
+            {
+                using (var req = CreateAuthedJsonRequest(HttpMethod.Delete, $"{baseUrl}/api/v1/jobs/{jobId}", jsonBody: null))
+                using (var cts = new CancellationTokenSource(TimeSpan.FromSeconds(5)))
+                {
+                    var resp = await _httpClient.SendAsync(req, cts.Token);
+                    Log($"INFO: Cancelamento do job {jobId} solicitado: HTTP {(int)resp.StatusCode}.");
+                }
+            }
+            catch (Exception ex)
+            {
+                Log($"WARN: Falha ao cancelar o job {jobId}: {ex.Message}");
+            }
+        }
+
+        /// <summary>
+        /// Acompanha o job pelos eventos do backend (SSE em /jobs/{id}/events): cada mudança de etapa chega
+        /// sem polling. Retorna o último status recebido (encerrado, ou não se o stream cair antes).
+        /// </summary>
+        private static async Task<JobStatusResponse> WaitForJobEventsAsync(string baseUrl, JobStatusResponse job, Action<JobStatusResponse> onStatus, CancellationToken ct)
+        {
+            using (var req = CreateAuthedJsonRequest(HttpMethod.Get, $"{baseUrl}/api/v1/jobs/{job.JobId}/events", jsonBody: null))
+            {
+                req.Headers.Accept.ParseAdd("text/event-stream");
+                using (var resp = await _httpClient.SendAsync(req, HttpCompletionOption.ResponseHeadersRead, ct))
+                {
+                    resp.EnsureSuccessStatusCode();
+                    // ReadLineAsync não aceita CancellationToken no net48: cancelar fecha a resposta.
+                    using (ct.Register(() => resp.Dispose()))
+                    using (var stream = await resp.Content.ReadAsStreamAsync())
+                    using (var reader = new StreamReader(stream, Encoding.UTF8))
+                    {
+                        var data = new StringBuilder();
+                        string line;
+                        while ((line = await reader.ReadLineAsync()) != null)
+                        {
+                            ct.ThrowIfCancellationRequested();
+                            if (line.StartsWith("data:", StringComparison.Ordinal))
+                            {
+                                data.Append(line.Substring(5).TrimStart());
+                                continue;
+                            }
+                            if (line.Length > 0 || data.Length == 0)
+                            {
+                                continue; // "event:", comentários de keepalive
+                            }
+
+                            var status = JsonSerializer.Deserialize<JobStatusResponse>(data.ToString(), _jsonOptions);
+                            data.Clear();
+                            if (status == null || string.IsNullOrWhiteSpace(status.JobId))
+                            {
+                                continue;
+                            }
+                            job = status;
+                            onStatus(job);
+                            if (IsJobFinished(job))
+                            {
+                                return job;
+                            }
+                        }
+                    }
+                }
+            }
+            ct.ThrowIfCancellationRequested();
+            return job;
+        }
+
         private static async Task<PrepareResponse> RunPrepareJobAsync(Editor ed, string baseUrl, PrepareJobRequest payload, CancellationToken ct)
         {
             Log($"INFO: Running prepare job for kind: {payload.Kind}");
@@ -629,56 +790,111 @@ namespace sisRUA
                 NotifyUiJob(job);
 
                 var sw = Stopwatch.StartNew();
+                var timeout = TimeSpan.FromMinutes(10);
                 double lastProgress = -1;
                 string lastMessage = null;
                 string lastStatus = null;
 
-                while (sw.Elapsed < TimeSpan.FromMinutes(10))
+                void ReportJob(JobStatusResponse status)
                 {
-                    ct.ThrowIfCancellationRequested();
+                    if (!string.Equals(lastStatus, status.Status, StringComparison.OrdinalIgnoreCase) ||
+                        Math.Abs(lastProgress - status.Progress) > 0.0001 ||
+                        !string.Equals(lastMessage, status.Message, StringComparison.Ordinal))
+                    {
+                        lastStatus = status.Status;
+                        lastProgress = status.Progress;
+                        lastMessage = status.Message;
 
-                    using (var pollReq = CreateAuthedJsonRequest(HttpMethod.Get, $"{baseUrl}/api/v1/jobs/{job.JobId}", jsonBody: null))
+                        ed?.WriteMessage($"\n[sisRUA] Job {status.JobId}: {status.Status} {status.Progress:P0} - {status.Message}");
+                        NotifyUiJob(status);
+                    }
+                }
+
+                // Cancelar a operação no AutoCAD também cancela o job no backend, liberando o worker.
+                string jobId = job.JobId;
+                using (ct.Register(() => { var _ = CancelJobAsync(baseUrl, jobId); }))
+                {
+                    // 1) Eventos (SSE): o backend avisa cada etapa; sem requisições enquanto o job roda.
+                    try
                     {
-                        var pollResp = await _httpClient.SendAsync(pollReq, ct);
-                        pollResp.EnsureSuccessStatusCode();
-                        string pollText = await pollResp.Content.ReadAsStringAsync();
-                        job = JsonSerializer.Deserialize<JobStatusResponse>(pollText, _jsonOptions);
-                        if (job == null)
+                        using (var timeoutCts = CancellationTokenSource.CreateLinkedTokenSource(ct))
                         {
-                            throw new InvalidOperationException("Backend retornou resposta inválida no polling do job.");
+                            timeoutCts.CancelAfter(timeout);
+                            job = await WaitForJobEventsAsync(baseUrl, job, ReportJob, timeoutCts.Token);
                         }
+                    }
+                    catch (OperationCanceledException) when (!ct.IsCancellationRequested)
+                    {
+                        // Tempo limite: o laço abaixo não roda e caímos no TimeoutException.
+                    }
+                    catch (Exception ex) when (!(ex is OperationCanceledException))
+                    {
+                        Log($"WARN: Eventos do job indisponíveis, usando polling: {ex.Message}");
+                    }
 
-                        if (!string.Equals(lastStatus, job.Status, StringComparison.OrdinalIgnoreCase) ||
-                            Math.Abs(lastProgress - job.Progress) > 0.0001 ||
-                            !string.Equals(lastMessage, job.Message, StringComparison.Ordinal))
-                        {
-                            lastStatus = job.Status;
-                            lastProgress = job.Progress;
-                            lastMessage = job.Message;
-
-                            ed?.WriteMessage($"\n[sisRUA] Job {job.JobId}: {job.Status} {job.Progress:P0} - {job.Message}");
-                            NotifyUiJob(job);
-                        }
+                    // 2) Fallback: polling leve (só o status; com o ETag anterior, o backend responde 304 se nada mudou).
+                    System.Net.Http.Headers.EntityTagHeaderValue lastEtag = null;
+                    while (!IsJobFinished(job) && sw.Elapsed < timeout)
+                    {
+                        ct.ThrowIfCancellationRequested();
 
-                        if (string.Equals(job.Status, "completed", StringComparison.OrdinalIgnoreCase))
+                        using (var pollReq = CreateAuthedJsonRequest(HttpMethod.Get, $"{baseUrl}/api/v1/jobs/{job.JobId}/status", jsonBody: null))
                         {
-                            if (job.Result.ValueKind == JsonValueKind.Undefined || job.Result.ValueKind == JsonValueKind.Null)
+                            if (lastEtag != null)
                             {
-                                throw new InvalidOperationException("Job concluído sem result.");
+                                pollReq.Headers.IfNoneMatch.Add(lastEtag);
+                            }
+                            var pollResp = await _httpClient.SendAsync(pollReq, ct);
+                            if (pollResp.StatusCode != System.Net.HttpStatusCode.NotModified)
+                            {
+                                pollResp.EnsureSuccessStatusCode();
+                                lastEtag = pollResp.Headers.ETag;
+                                string pollText = await pollResp.Content.ReadAsStringAsync();
+                                job = JsonSerializer.Deserialize<JobStatusResponse>(pollText, _jsonOptions);
+                                if (job == null)
+                                {
+                                    throw new InvalidOperationException("Backend retornou resposta inválida no polling do job.");
+                                }
+                                ReportJob(job);
+                                if (IsJobFinished(job))
+                                {
+                                    break;
+                                }
                             }
-                            var result = job.Result.Deserialize<PrepareResponse>(_jsonOptions);
-                            Log($"INFO: Job {job.JobId} completed successfully.");
-                            return result;
                         }
 
-                        if (string.Equals(job.Status, "failed", StringComparison.OrdinalIgnoreCase))
+                        await Task.Delay(500, ct);
+                    }
+                }
+
+                if (string.Equals(job.Status, "completed", StringComparison.OrdinalIgnoreCase))
+                {
+                    // O resultado é buscado uma única vez, no endpoint próprio.
+                    using (var resultReq = CreateAuthedJsonRequest(HttpMethod.Get, $"{baseUrl}/api/v1/jobs/{job.JobId}/result", jsonBody: null))
+                    {
+                        var resultResp = await _httpClient.SendAsync(resultReq, ct);
+                        resultResp.EnsureSuccessStatusCode();
+                        string resultText = await resultResp.Content.ReadAsStringAsync();
+                        var result = JsonSerializer.Deserialize<PrepareResponse>(resultText, _jsonOptions);
+                        if (result == null)
                         {
-                            Log($"ERROR: Job {job.JobId} failed. Error: {job.Error ?? job.Message}");
-                            throw new InvalidOperationException(job.Error ?? job.Message ?? "Job falhou no backend.");
+                            throw new InvalidOperationException("Job concluído sem result.");
                         }
+                        Log($"INFO: Job {job.JobId} completed successfully.");
+                        return result;
                     }
+                }
 
-                    await Task.Delay(500, ct);
+                if (string.Equals(job.Status, "cancelled", StringComparison.OrdinalIgnoreCase))
+                {
+                    Log($"INFO: Job {job.JobId} cancelled.");
+                    throw new OperationCanceledException("Job cancelado no backend.");
+                }
+
+                if (string.Equals(job.Status, "failed", StringComparison.OrdinalIgnoreCase))
+                {
+                    Log($"ERROR: Job {job.JobId} failed. Error: {job.Error ?? job.Message}");
+                    throw new InvalidOperationException(job.Error ?? job.Message ?? "Job falhou no backend.");
                 }
 
                 Log($"ERROR: Job {job.JobId} timed out after {sw.Elapsed.TotalMinutes} minutes.");
@@ -697,9 +913,13 @@ namespace sisRUA
                 string baseUrl = GetBackendBaseUrlOrAlert(ed);
                 if (string.IsNullOrWhiteSpace(baseUrl)) return;
 
-                ed.WriteMessage("\n[sisRUA] Criando job de importação (GeoJSON) no backend...");
+                ed.WriteMessage("\n[sisRUA] Criando job de importação (GeoJSON) no backend... (Esc cancela)");
                 var jobPayload = new PrepareJobRequest { Kind = "geojson", GeoJson = geojsonData };
-                var prepareResponse = await RunPrepareJobAsync(ed, baseUrl, jobPayload, CancellationToken.None);
+                PrepareResponse prepareResponse;
+                using (var cancellation = new UserCancellation())
+                {
+                    prepareResponse = await RunPrepareJobAsync(ed, baseUrl, jobPayload, cancellation.Token);
+                }
 
                 if (prepareResponse?.Features == null || prepareResponse.Features.Count == 0)
                 {
@@ -721,6 +941,11 @@ namespace sisRUA
                 Application.ShowAlertDialog($"Erro de comunicação com o backend do sisRUA.\nVerifique se o plugin foi iniciado corretamente.\n\nDetalhes: {httpEx.Message}");
                 Log($"ERROR: HttpRequestException in ImportarDadosCampo: {httpEx.Message}");
             }
+            catch (OperationCanceledException)
+            {
+                ed.WriteMessage("\n[sisRUA] Operação cancelada.");
+                Log("INFO: ImportarDadosCampo cancelled by user.");
+            }
             catch (System.Exception ex)
             {
                 ed.WriteMessage($"\n[sisRUA] ERRO: Ocorreu um erro inesperado durante a importação. Detalhes: {ex.Message}");
@@ -748,9 +973,22 @@ namespace sisRUA
                     Kind = "osm",
                     Latitude = latitude,
                     Longitude = longitude,
-                    Radius = radius
+                    Radius = radius,
+                    SimplifyToleranceM = OsmSimplifyToleranceMeters,
+                    // Backend remove as mãos duplas e funde os trechos contíguos de mesma via (name/highway):
+                    // chegam bem menos feições para desenhar; os limpadores de geometria abaixo seguem como rede de segurança.
+                    MergeEdges = true
                 };
-                var prepareResponse = await RunPrepareJobAsync(ed, baseUrl, jobPayload, CancellationToken.None);
+                ed.WriteMessage("\n[sisRUA] Esc cancela o job.");
+                PrepareResponse prepareResponse;
+                using (var cancellation = new UserCancellation())
+                {
+                    prepareResponse = await RunPrepareJobAsync(ed, baseUrl, jobPayload, cancellation.Token);
+                }
+                if (prepareResponse?.VerticesBefore != null && prepareResponse.VerticesAfter != null)
+                {
+                    Log($"INFO: Backend simplification: {prepareResponse.VerticesBefore} -> {prepareResponse.VerticesAfter} polyline vertices.");
+                }
 
                 if (prepareResponse?.Features == null || prepareResponse.Features.Count == 0)
                 {
@@ -773,6 +1011,11 @@ namespace sisRUA
                 Application.ShowAlertDialog($"Erro de comunicação com o backend do sisRUA.\nVerifique se o plugin foi iniciado corretamente.\n\nDetalhes: {httpEx.Message}");
                 Log($"ERROR: HttpRequestException in GerarProjetoOsm: {httpEx.Message}");
             }
+            catch (OperationCanceledException)
+            {
+                ed.WriteMessage("\n[sisRUA] Operação cancelada.");
+                Log("INFO: GerarProjetoOsm cancelled by user.");
+            }
             catch (System.Exception ex)
             {
                 ed.WriteMessage($"\n[sisRUA] ERRO: Ocorreu um erro inesperado durante a geração do OSM. Detalhes: {ex.Message}");
@@ -409,6 +409,11 @@ namespace sisRUA
                             }
                             break;
 
+                        case "CANCEL_JOB":
+                            // Só sinaliza o token; o DELETE ao backend sai do próprio RunPrepareJobAsync.
+                            SisRuaCommands.CancelActiveJobs();
+                            break;
+
                         default:
                             Debug.WriteLine($"[sisRUA] Ação desconhecida recebida da WebView: {action}");
                             break;